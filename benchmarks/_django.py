@@ -0,0 +1,31 @@
+"""Общая настройка Django для скриптов в benchmarks/.
+
+Бенчмарки работают с отдельной тестовой базой (для SQLite — в памяти),
+поэтому не трогают db.sqlite3 разработчика. Многопоточным бенчмаркам
+нужна тестовая база в файле: с общей базой в памяти параллельные
+записи падают с «database table is locked».
+"""
+import os
+import sys
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent / 'blogicum'
+
+
+def setup(settings_module='blogicum.settings', test_database=None):
+    sys.path.insert(0, str(PROJECT_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+
+    import django
+    django.setup()
+
+    from django.db import connections
+    from django.test.runner import DiscoverRunner
+    from django.test.utils import setup_test_environment
+
+    if test_database is not None:
+        connections['default'].settings_dict['TEST']['NAME'] = test_database
+    setup_test_environment()
+    runner = DiscoverRunner(verbosity=0, interactive=False)
+    old_config = runner.setup_databases()
+    return lambda: runner.teardown_databases(old_config)
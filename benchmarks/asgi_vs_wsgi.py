@@ -0,0 +1,227 @@
+"""Синхронные представления под gunicorn против асинхронных под uvicorn.
+
+Наполняет временную базу тем же набором данных, что и load_test.py,
+и по очереди запускает оба сервера с одинаковым числом процессов:
+gunicorn (sync-воркеры с потоками, BLOG_ASYNC_VIEWS = False) и uvicorn
+(BLOG_ASYNC_VIEWS = True). Для каждого уровня параллельности
+asyncio-клиент держит столько одновременных соединений и запрашивает
+ленту, категорию, профиль и страницу поста от имени вошедшего
+пользователя, минуя кэш страниц. Печатает JSON с задержками p50/p95/p99
+и числом запросов в секунду.
+
+Нужны gunicorn и uvicorn: pip install gunicorn uvicorn
+
+Запуск: python benchmarks/asgi_vs_wsgi.py --concurrency 1 16 64 256
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import _django
+from load_test import make_request, populate, summarize
+
+ENDPOINTS = ('index', 'category_posts', 'profile', 'post_detail')
+
+SETTINGS_TEMPLATE = '''\
+from blogicum.settings import *  # noqa
+
+DEBUG = False
+DATABASES = {{'default': {{
+    'ENGINE': 'django.db.backends.sqlite3', 'NAME': {database!r},
+}}}}
+BLOG_ASYNC_VIEWS = {async_views!r}
+LOGGING = {{'version': 1, 'disable_existing_loggers': False}}
+'''
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def server_command(server, port, workers, threads):
+    address = f'127.0.0.1:{port}'
+    if server == 'gunicorn':
+        return [
+            'gunicorn', 'blogicum.wsgi:application', '--bind', address,
+            '--workers', str(workers), '--threads', str(threads),
+        ]
+    return [
+        'uvicorn', 'blogicum.asgi:application', '--port', str(port),
+        '--workers', str(workers), '--no-access-log',
+        '--log-level', 'warning',
+    ]
+
+
+def start_server(server, directory, database, args):
+    """Запускает сервер с настройками поверх blogicum.settings."""
+    module = f'bench_{server}_settings'
+    with open(os.path.join(directory, f'{module}.py'), 'w') as f:
+        f.write(SETTINGS_TEMPLATE.format(
+            database=database, async_views=server == 'uvicorn',
+        ))
+    port = free_port()
+    env = dict(
+        os.environ,
+        DJANGO_SETTINGS_MODULE=module,
+        PYTHONPATH=os.pathsep.join((str(_django.PROJECT_DIR), directory)),
+    )
+    process = subprocess.Popen(
+        server_command(server, port, args.workers, args.threads),
+        cwd=_django.PROJECT_DIR, env=env,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            sys.exit(f'{server} завершился с кодом {process.returncode}')
+        try:
+            socket.create_connection(('127.0.0.1', port), 0.1).close()
+            return process, port
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    sys.exit(f'{server} не начал принимать соединения за 30 секунд')
+
+
+async def fetch(port, url, cookie):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        writer.write((
+            f'GET {url} HTTP/1.1\r\nHost: localhost\r\n'
+            f'Cookie: {cookie}\r\nConnection: close\r\n\r\n'
+        ).encode())
+        await writer.drain()
+        status_line = await reader.readline()
+        await reader.read()
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def load(port, data, cookie, concurrency, n_requests):
+    queue = asyncio.Queue()
+    for i in range(n_requests):
+        queue.put_nowait(ENDPOINTS[i % len(ENDPOINTS)])
+    results = defaultdict(list)
+
+    async def worker():
+        while not queue.empty():
+            endpoint = queue.get_nowait()
+            _, url, _ = make_request(endpoint, data)
+            start = time.perf_counter()
+            try:
+                status = await fetch(port, url, cookie)
+            except OSError:
+                status = None
+            results[endpoint].append(
+                ((time.perf_counter() - start) * 1000, status == 200)
+            )
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return results, time.perf_counter() - start
+
+
+def session_cookie(data):
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.test import Client
+
+    client = Client()
+    client.force_login(get_user_model().objects.get(
+        username=data['users'][0]
+    ))
+    session = client.cookies[settings.SESSION_COOKIE_NAME].value
+    return f'{settings.SESSION_COOKIE_NAME}={session}'
+
+
+def benchmark(server, directory, database, data, cookie, args):
+    process, port = start_server(server, directory, database, args)
+    try:
+        asyncio.run(load(port, data, cookie, 4, args.warmup))
+        report = {}
+        for concurrency in args.concurrency:
+            results, duration = asyncio.run(load(
+                port, data, cookie, concurrency, args.requests
+            ))
+            every = [sample for samples in results.values()
+                     for sample in samples]
+            report[concurrency] = {
+                'total': summarize(every, duration),
+                'endpoints': {
+                    endpoint: summarize(results[endpoint], duration)
+                    for endpoint in ENDPOINTS
+                },
+            }
+        return report
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--categories', type=int, default=10)
+    parser.add_argument('--locations', type=int, default=20)
+    parser.add_argument('--posts', type=int, default=2000)
+    parser.add_argument('--comments', type=int, default=10_000)
+    parser.add_argument('--concurrency', type=int, nargs='+',
+                        default=[1, 16, 64])
+    parser.add_argument('--requests', type=int, default=1000,
+                        help='Запросов на каждый уровень параллельности.')
+    parser.add_argument('--warmup', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=4,
+                        help='Потоков на воркер gunicorn.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Файл для JSON вместо stdout.')
+    args = parser.parse_args()
+
+    missing = [name for name in ('gunicorn', 'uvicorn')
+               if shutil.which(name) is None]
+    if missing:
+        sys.exit(f'Не найдены {", ".join(missing)}:'
+                 f' pip install {" ".join(missing)}')
+
+    random.seed(args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        database = os.path.join(directory, 'asgi_vs_wsgi.sqlite3')
+        teardown = _django.setup(test_database=database)
+        try:
+            data = populate(args)
+            cookie = session_cookie(data)
+            report = {
+                'workers': args.workers,
+                'gunicorn_threads': args.threads,
+                'servers': {
+                    server: benchmark(
+                        server, directory, database, data, cookie, args
+                    )
+                    for server in ('gunicorn', 'uvicorn')
+                },
+            }
+        finally:
+            teardown()
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
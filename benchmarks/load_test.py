@@ -0,0 +1,345 @@
+"""Нагрузочный тест публичных страниц блога.
+
+Создаёт синтетический набор данных (пользователи, категории, места,
+посты, комментарии) и параллельно запрашивает index, category_posts,
+profile, post_detail и add_comment: тестовым клиентом Django
+в потоках (--server client) или по HTTP через локальный WSGI-сервер
+(--server wsgi). Печатает JSON с задержками p50/p95/p99 и числом
+запросов в секунду, чтобы CI мог сравнивать прогоны.
+
+Запуск: python benchmarks/load_test.py --posts 5000 --concurrency 8
+"""
+import argparse
+import http.client
+import json
+import logging
+import os
+import random
+import secrets
+import statistics
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from socketserver import ThreadingMixIn
+from urllib.parse import urlencode
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+import _django
+
+ENDPOINTS = (
+    'index', 'category_posts', 'profile', 'post_detail', 'add_comment',
+)
+# Лента категории и комментарии доступны только после входа
+AUTHENTICATED = {'category_posts', 'add_comment'}
+EXPECTED_STATUS = {'add_comment': 302}
+
+
+def populate(args):
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+    from django.utils import timezone
+    from mixer.backend.django import Mixer
+
+    from blog.models import Category, Comment, Location, Post
+
+    mixer = Mixer(commit=False, locale='ru_RU')
+    fake = mixer.faker
+    User = get_user_model()
+    users = User.objects.bulk_create(mixer.cycle(args.users).blend(
+        User, username=mixer.sequence('user{0}'),
+    ))
+    categories = Category.objects.bulk_create(mixer.cycle(
+        args.categories
+    ).blend(
+        Category, slug=mixer.sequence('category-{0}'), is_published=True,
+    ))
+    locations = Location.objects.bulk_create(mixer.cycle(
+        args.locations
+    ).blend(Location, is_published=True))
+
+    now = timezone.now()
+    posts = Post.objects.bulk_create(
+        mixer.cycle(args.posts).blend(
+            Post,
+            title=(fake.sentence(nb_words=5) for _ in range(args.posts)),
+            text=(fake.text(max_nb_chars=800) for _ in range(args.posts)),
+            image='',
+            pub_date=(
+                now - timedelta(minutes=random.randint(1, 10**6))
+                for _ in range(args.posts)
+            ),
+            author=(random.choice(users) for _ in range(args.posts)),
+            category=(random.choice(categories) for _ in range(args.posts)),
+            location=(random.choice(locations) for _ in range(args.posts)),
+            is_published=True,
+        ),
+        batch_size=1000,
+    )
+    Comment.objects.bulk_create(
+        mixer.cycle(args.comments).blend(
+            Comment,
+            text=(fake.sentence() for _ in range(args.comments)),
+            post=(random.choice(posts) for _ in range(args.comments)),
+            author=(random.choice(users) for _ in range(args.comments)),
+        ),
+        batch_size=1000,
+    )
+    call_command('recount_comments', verbosity=0)
+    call_command('publish_scheduled', once=True, verbosity=0)
+    return {
+        'users': [user.username for user in users],
+        'categories': [category.slug for category in categories],
+        'posts': [post.pk for post in posts],
+    }
+
+
+def make_request(endpoint, data):
+    """(метод, URL, данные формы) случайного запроса к endpoint."""
+    post_id = random.choice(data['posts'])
+    if endpoint == 'index':
+        return 'GET', f'/?page={random.randint(1, 5)}', None
+    if endpoint == 'category_posts':
+        return 'GET', f'/category/{random.choice(data["categories"])}/', None
+    if endpoint == 'profile':
+        return 'GET', f'/profile/{random.choice(data["users"])}/', None
+    if endpoint == 'post_detail':
+        return 'GET', f'/posts/{post_id}/', None
+    return (
+        'POST', f'/posts/{post_id}/comments/create/',
+        {'text': 'Комментарий из нагрузочного теста'},
+    )
+
+
+class ClientTransport:
+    """Тестовый клиент Django, по паре клиентов на поток."""
+
+    def __init__(self, data):
+        self.data = data
+        self.local = threading.local()
+
+    def _clients(self):
+        if not hasattr(self.local, 'anonymous'):
+            from django.contrib.auth import get_user_model
+            from django.test import Client
+
+            self.local.anonymous = Client()
+            self.local.user = Client()
+            self.local.user.force_login(get_user_model().objects.get(
+                username=random.choice(self.data['users'])
+            ))
+        return self.local.anonymous, self.local.user
+
+    def __call__(self, endpoint, method, url, form):
+        anonymous, user = self._clients()
+        client = user if endpoint in AUTHENTICATED else anonymous
+        if method == 'POST':
+            return client.post(url, form).status_code
+        return client.get(url).status_code
+
+    def close(self):
+        pass
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class WSGITransport:
+    """Настоящие HTTP-запросы к wsgiref-серверу в соседнем потоке."""
+
+    def __init__(self, data):
+        from django.conf import settings
+        from django.contrib.auth import get_user_model
+        from django.core.wsgi import get_wsgi_application
+        from django.test import Client
+
+        self.server = self.make_server()
+        self.server.set_app(get_wsgi_application())
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, daemon=True
+        )
+        self.thread.start()
+
+        client = Client()
+        client.force_login(get_user_model().objects.get(
+            username=data['users'][0]
+        ))
+        session = client.cookies[settings.SESSION_COOKIE_NAME].value
+        self.csrf_token = secrets.token_hex(16)
+        self.cookie = (
+            f'{settings.SESSION_COOKIE_NAME}={session}; '
+            f'{settings.CSRF_COOKIE_NAME}={self.csrf_token}'
+        )
+
+    def make_server(self):
+        return ThreadingWSGIServer(('127.0.0.1', 0), QuietHandler)
+
+    def __call__(self, endpoint, method, url, form):
+        headers = {'Host': 'localhost'}
+        body = None
+        if endpoint in AUTHENTICATED:
+            headers['Cookie'] = self.cookie
+        if method == 'POST':
+            body = urlencode(form)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+            headers['X-CSRFToken'] = self.csrf_token
+        connection = http.client.HTTPConnection(*self.server.server_address)
+        try:
+            connection.request(method, url, body, headers)
+            response = connection.getresponse()
+            response.read()
+            return response.status
+        finally:
+            connection.close()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+TRANSPORTS = {'client': ClientTransport, 'wsgi': WSGITransport}
+
+
+def make_plan(n_requests):
+    """Поровну запросов к каждой странице в случайном порядке."""
+    plan = [ENDPOINTS[i % len(ENDPOINTS)] for i in range(n_requests)]
+    random.shuffle(plan)
+    return plan
+
+
+def run(transport, data, plan, concurrency):
+    """Выполняет запросы и возвращает {endpoint: [(мс, ok), ...]}, время."""
+    from django.db import connections
+
+    results = defaultdict(list)
+
+    def send(endpoint):
+        request = make_request(endpoint, data)
+        start = time.perf_counter()
+        try:
+            status = transport(endpoint, *request)
+        except Exception:
+            status = None
+        elapsed = (time.perf_counter() - start) * 1000
+        # list.append атомарен, отдельная блокировка не нужна
+        results[endpoint].append(
+            (elapsed, status == EXPECTED_STATUS.get(endpoint, 200))
+        )
+
+    def worker(chunk):
+        try:
+            for endpoint in chunk:
+                send(endpoint)
+        finally:
+            connections.close_all()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        for future in [
+            pool.submit(worker, plan[i::concurrency])
+            for i in range(concurrency)
+        ]:
+            future.result()
+    return results, time.perf_counter() - start
+
+
+def summarize(samples, duration):
+    latencies = sorted(elapsed for elapsed, _ in samples)
+    if len(latencies) > 1:
+        cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    else:
+        p50 = p95 = p99 = latencies[0] if latencies else None
+    return {
+        'requests': len(samples),
+        'errors': sum(not ok for _, ok in samples),
+        'rps': round(len(samples) / duration, 2),
+        'mean_ms': latencies and round(statistics.fmean(latencies), 2),
+        'p50_ms': p50 and round(p50, 2),
+        'p95_ms': p95 and round(p95, 2),
+        'p99_ms': p99 and round(p99, 2),
+    }
+
+
+def report(args, results, duration):
+    every = [sample for samples in results.values() for sample in samples]
+    return {
+        'server': args.server,
+        'concurrency': args.concurrency,
+        'dataset': {
+            name: getattr(args, name) for name in (
+                'users', 'categories', 'locations', 'posts', 'comments',
+            )
+        },
+        'duration_s': round(duration, 3),
+        'total': summarize(every, duration),
+        'endpoints': {
+            endpoint: summarize(results[endpoint], duration)
+            for endpoint in ENDPOINTS
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--categories', type=int, default=10)
+    parser.add_argument('--locations', type=int, default=20)
+    parser.add_argument('--posts', type=int, default=2000)
+    parser.add_argument('--comments', type=int, default=10_000)
+    parser.add_argument('--requests', type=int, default=1000,
+                        help='Всего запросов, поровну на каждую страницу.')
+    parser.add_argument('--warmup', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--server', choices=TRANSPORTS, default='client')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Файл для JSON вместо stdout.')
+    parser.add_argument('--log-requests', action='store_true',
+                        help='Не отключать журнал запросов blog.requests.')
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        teardown = _django.setup(
+            test_database=os.path.join(directory, 'load_test.sqlite3')
+        )
+        try:
+            data = populate(args)
+            transport = TRANSPORTS[args.server](data)
+            # После настройки транспорта: get_wsgi_application() заново
+            # применяет LOGGING
+            logging.getLogger('blog.requests').disabled = (
+                not args.log_requests
+            )
+            try:
+                run(transport, data, make_plan(args.warmup),
+                    args.concurrency)
+                results, duration = run(
+                    transport, data, make_plan(args.requests),
+                    args.concurrency,
+                )
+            finally:
+                transport.close()
+        finally:
+            teardown()
+
+    output = json.dumps(
+        report(args, results, duration), ensure_ascii=False, indent=2
+    )
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
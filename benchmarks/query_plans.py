@@ -0,0 +1,112 @@
+"""Планы запросов лент публикаций с индексами из Post.Meta и без них.
+
+Запуск: python benchmarks/query_plans.py --posts 50000
+"""
+import argparse
+import random
+import time
+from datetime import timedelta
+
+import _django
+
+
+def populate(n_posts, n_comments):
+    from django.contrib.auth import get_user_model
+    from django.utils import timezone
+
+    from blog.models import Category, Comment, Location, Post
+    from blog.publishing import publish_due_posts
+
+    User = get_user_model()
+    users = User.objects.bulk_create(
+        User(username=f'user{i}') for i in range(50)
+    )
+    categories = Category.objects.bulk_create(
+        Category(title=f'Категория {i}', description='', slug=f'cat-{i}',
+                 is_published=i % 5 != 0)
+        for i in range(20)
+    )
+    locations = Location.objects.bulk_create(
+        Location(name=f'Место {i}') for i in range(20)
+    )
+    now = timezone.now()
+    posts = Post.objects.bulk_create(
+        (Post(
+            title=f'Пост {i}',
+            text='текст ' * 20,
+            pub_date=now - timedelta(minutes=random.randint(-10_000, 10**6)),
+            author=random.choice(users),
+            category=random.choice(categories),
+            location=random.choice(locations),
+            is_published=random.random() > 0.1,
+        ) for i in range(n_posts)),
+        batch_size=1000,
+    )
+    Comment.objects.bulk_create(
+        (Comment(
+            text='комментарий',
+            post=random.choice(posts),
+            author=random.choice(users),
+        ) for _ in range(n_comments)),
+        batch_size=1000,
+    )
+    publish_due_posts()
+    return posts[0], categories[1], users[0]
+
+
+def queries(post, category, author):
+    from blog.models import Post
+
+    return {
+        'index': Post.objects.published_with_comments()[:10],
+        'category_posts': Post.objects.published(category=category)[:10],
+        'profile': Post.objects.published().filter(author=author)[:10],
+        'comments': post.comment.order_by('created_at')[:10],
+    }
+
+
+def report(title, named_queries, repeat):
+    print(f'\n=== {title}')
+    for name, queryset in named_queries.items():
+        start = time.perf_counter()
+        for _ in range(repeat):
+            list(queryset.all())
+        elapsed = (time.perf_counter() - start) / repeat * 1000
+        print(f'--- {name}: {elapsed:.2f} ms')
+        print(queryset.explain())
+
+
+def drop_indexes():
+    from django.db import connection
+
+    from blog.models import Comment, Post
+
+    with connection.schema_editor() as editor:
+        for model in (Post, Comment):
+            for index in model._meta.indexes:
+                editor.remove_index(model, index)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=20_000)
+    parser.add_argument('--comments', type=int, default=50_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    teardown = _django.setup()
+    try:
+        from django.db import connection
+
+        sample = populate(args.posts, args.comments)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        report('С индексами', queries(*sample), args.repeat)
+        drop_indexes()
+        report('Без индексов', queries(*sample), args.repeat)
+    finally:
+        teardown()
+
+
+if __name__ == '__main__':
+    main()
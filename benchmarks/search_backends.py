@@ -0,0 +1,104 @@
+"""Скорость поиска постов разными движками blog.search.
+
+Сравнивает LIKE (IContainsBackend), собственный инвертированный индекс
+(InvertedIndexBackend) и SQLite FTS5 (SQLiteFTSBackend) на одних
+и тех же постах.
+
+Запуск: python benchmarks/search_backends.py --posts 50000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import timedelta
+
+import _django
+
+BACKENDS = {
+    'icontains': 'blog.search.simple.IContainsBackend',
+    'inverted': 'blog.search.inverted.InvertedIndexBackend',
+    'fts5': 'blog.search.fts5.SQLiteFTSBackend',
+}
+
+
+def populate(n_posts):
+    from django.contrib.auth import get_user_model
+    from django.utils import timezone
+    from faker import Faker
+
+    from blog.models import Category, Post
+
+    fake = Faker('ru_RU')
+    author = get_user_model().objects.create(username='author')
+    category = Category.objects.create(
+        title='Категория', description='', slug='category'
+    )
+    now = timezone.now()
+    Post.objects.bulk_create(
+        (Post(
+            title=fake.sentence(nb_words=5),
+            text=fake.text(max_nb_chars=1500),
+            pub_date=now - timedelta(minutes=random.randint(0, 10**6)),
+            published_at=now,
+            author=author,
+            category=category,
+            is_published=True,
+        ) for _ in range(n_posts)),
+        batch_size=1000,
+    )
+    words = fake.words(nb=20)
+    return words[:10] + [' '.join(pair) for pair in zip(words, words[10:])]
+
+
+def measure(backend_path, queries, repeat, index_path):
+    from django.test import override_settings
+
+    from blog.models import Post
+    from blog.search import get_backend
+
+    with override_settings(
+        BLOG_SEARCH_BACKEND=backend_path, BLOG_SEARCH_INDEX_PATH=index_path
+    ):
+        backend = get_backend()
+        start = time.perf_counter()
+        backend.setup()
+        backend.rebuild()
+        build = time.perf_counter() - start
+
+        found = 0
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for query in queries:
+                results = backend.search(Post.objects.published(), query)
+                found += len(results)
+                list(results[:10])
+        per_query = (time.perf_counter() - start) / repeat / len(queries)
+    return build, per_query, found // repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=20_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    teardown = _django.setup()
+    try:
+        queries = populate(args.posts)
+        with tempfile.TemporaryDirectory() as directory:
+            index_path = os.path.join(directory, 'index.bin')
+            print(f'{"движок":<10} {"индекс, с":>10} {"запрос, мс":>11} '
+                  f'{"найдено":>8}')
+            for name, path in BACKENDS.items():
+                build, per_query, found = measure(
+                    path, queries, args.repeat, index_path
+                )
+                print(f'{name:<10} {build:>10.2f} {per_query * 1000:>11.2f} '
+                      f'{found:>8}')
+    finally:
+        teardown()
+
+
+if __name__ == '__main__':
+    main()
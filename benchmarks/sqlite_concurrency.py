@@ -0,0 +1,177 @@
+"""Конкурентные чтения и записи комментариев на SQLite.
+
+Наполняет базу в файле тем же набором данных, что и load_test.py,
+и поднимает WSGI-сервер с постоянным пулом потоков (как gunicorn
+--threads): соединение с базой живёт в потоке между запросами, если
+позволяет CONN_MAX_AGE. Клиенты смешивают чтения лент, профилей
+и страниц постов с добавлением комментариев (доля --write-ratio).
+Прогон повторяется с настройками базы из blogicum.settings (журнал
+отката, соединение на каждый запрос) и из blogicum.settings_production
+(WAL, прагмы, CONN_MAX_AGE). Печатает JSON с задержками p50/p95/p99,
+числом запросов в секунду и ошибок отдельно для чтений и записей.
+
+Запуск: python benchmarks/sqlite_concurrency.py --concurrency 1 8 32
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.simple_server import WSGIServer
+
+import _django
+from load_test import (
+    QuietHandler, WSGITransport, populate, run, summarize
+)
+
+READS = ('index', 'category_posts', 'profile', 'post_detail')
+WRITE = 'add_comment'
+
+
+class PooledWSGIServer(WSGIServer):
+    """wsgiref-сервер, обрабатывающий запросы в пуле из threads потоков."""
+
+    def __init__(self, address, handler, threads):
+        super().__init__(address, handler)
+        self.pool = ThreadPoolExecutor(threads)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown()
+
+
+class PooledTransport(WSGITransport):
+    threads = 8
+
+    def make_server(self):
+        return PooledWSGIServer(
+            ('127.0.0.1', 0), QuietHandler, self.threads
+        )
+
+
+def database_profiles():
+    """{профиль: настройки базы}; порядок важен, см. apply_profile()."""
+    # Боевые настройки требуют ключ из окружения; бенчмарку нужна
+    # только конфигурация базы
+    os.environ.setdefault('DJANGO_SECRET_KEY', 'sqlite-concurrency')
+    from blogicum import settings_production as production
+
+    production_db = production.DATABASES['default']
+    return {
+        'settings': {
+            'CONN_MAX_AGE': 0,
+            'CONN_HEALTH_CHECKS': False,
+            'OPTIONS': {},
+        },
+        'production': {
+            key: production_db[key]
+            for key in ('CONN_MAX_AGE', 'CONN_HEALTH_CHECKS', 'OPTIONS')
+        },
+    }
+
+
+def apply_profile(profile):
+    """Переключает настройки базы для новых соединений.
+
+    Режим WAL сохраняется в файле базы, поэтому профиль settings
+    прогоняется первым, пока база ещё в режиме журнала отката.
+    """
+    from django.db import connections
+
+    connections['default'].settings_dict.update(profile)
+    connections.close_all()
+
+
+def make_plan(n_requests, write_ratio):
+    return [
+        WRITE if random.random() < write_ratio else random.choice(READS)
+        for _ in range(n_requests)
+    ]
+
+
+def measure(data, args):
+    transport = PooledTransport(data)
+    logging.getLogger('blog.requests').disabled = True
+    try:
+        run(transport, data, make_plan(args.warmup, args.write_ratio), 4)
+        report = {}
+        for concurrency in args.concurrency:
+            results, duration = run(
+                transport, data,
+                make_plan(args.requests, args.write_ratio), concurrency,
+            )
+            reads = [sample for endpoint in READS
+                     for sample in results[endpoint]]
+            every = reads + results[WRITE]
+            report[concurrency] = {
+                'total': summarize(every, duration),
+                'reads': summarize(reads, duration),
+                'writes': summarize(results[WRITE], duration),
+            }
+        return report
+    finally:
+        transport.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--categories', type=int, default=10)
+    parser.add_argument('--locations', type=int, default=20)
+    parser.add_argument('--posts', type=int, default=2000)
+    parser.add_argument('--comments', type=int, default=10_000)
+    parser.add_argument('--concurrency', type=int, nargs='+',
+                        default=[1, 8, 32])
+    parser.add_argument('--requests', type=int, default=1000,
+                        help='Запросов на каждый уровень параллельности.')
+    parser.add_argument('--write-ratio', type=float, default=0.2,
+                        help='Доля запросов, добавляющих комментарий.')
+    parser.add_argument('--warmup', type=int, default=50)
+    parser.add_argument('--threads', type=int, default=8,
+                        help='Потоков в пуле WSGI-сервера.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Файл для JSON вместо stdout.')
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    PooledTransport.threads = args.threads
+    with tempfile.TemporaryDirectory() as directory:
+        teardown = _django.setup(
+            test_database=os.path.join(directory, 'concurrency.sqlite3')
+        )
+        try:
+            data = populate(args)
+            report = {
+                'write_ratio': args.write_ratio,
+                'server_threads': args.threads,
+                'profiles': {},
+            }
+            for name, profile in database_profiles().items():
+                apply_profile(profile)
+                report['profiles'][name] = measure(data, args)
+        finally:
+            teardown()
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""Время рендеринга шаблонов ленты, поста и профиля без ORM.
+
+Контекст собирается из несохранённых объектов моделей, поэтому
+замер не включает SQL. Каждый шаблон рендерится тремя движками:
+без кэша загрузчиков (шаблон и все include заново читаются
+и компилируются), с настройками blogicum.settings и с профилем
+blogicum.settings_production (cached.Loader, DEBUG = False).
+
+Запуск: python benchmarks/template_rendering.py --comments 500
+"""
+import argparse
+import os
+import time
+from datetime import timedelta
+
+import _django
+
+
+def engines():
+    # Боевые настройки требуют ключ из окружения; шаблонам он не нужен
+    os.environ.setdefault('DJANGO_SECRET_KEY', 'template-rendering')
+
+    from django.template.backends.django import DjangoTemplates
+
+    from blogicum import settings as development
+    from blogicum import settings_production as production
+
+    uncached = dict(production.TEMPLATES[0])
+    uncached['OPTIONS'] = dict(
+        uncached['OPTIONS'], loaders=production.TEMPLATES[0]['OPTIONS'][
+            'loaders'
+        ][0][1],
+    )
+    configs = {
+        'uncached': (uncached, False),
+        'settings': (development.TEMPLATES[0], development.DEBUG),
+        'production': (production.TEMPLATES[0], production.DEBUG),
+    }
+    return {
+        name: DjangoTemplates({
+            **{key: value for key, value in config.items()
+               if key != 'BACKEND'},
+            'NAME': name,
+            'OPTIONS': {**config['OPTIONS'], 'debug': debug},
+        })
+        for name, (config, debug) in configs.items()
+    }
+
+
+def make_objects(n_posts, n_comments):
+    from django.contrib.auth import get_user_model
+    from django.utils import timezone
+    from faker import Faker
+
+    from blog.models import Category, Comment, Location, Post
+
+    fake = Faker('ru_RU')
+    now = timezone.now()
+    author = get_user_model()(
+        pk=1, username='author', first_name=fake.first_name(),
+        last_name=fake.last_name(), date_joined=now,
+    )
+    category = Category(
+        pk=1, title='Путешествия', slug='travel', is_published=True
+    )
+    location = Location(pk=1, name=fake.city(), is_published=True)
+    posts = [
+        Post(
+            pk=i, title=fake.sentence(nb_words=5), text=fake.text(),
+            pub_date=now - timedelta(hours=i), author=author,
+            category=category, location=location, is_published=True,
+            comment_count=n_comments,
+        )
+        for i in range(1, n_posts + 1)
+    ]
+    comments = [
+        Comment(
+            pk=i, text=fake.sentence(), post=posts[0], author=author,
+            created_at=now + timedelta(minutes=i),
+        )
+        for i in range(1, n_comments + 1)
+    ]
+    return author, posts, comments
+
+
+def cases(n_posts, n_comments):
+    """{имя: (шаблон, контекст, запрос)} для каждой страницы."""
+    from django.core.paginator import Paginator
+    from django.test import RequestFactory
+
+    from blog.forms import CommentForm
+
+    author, posts, comments = make_objects(n_posts, n_comments)
+    page = Paginator(posts, 10).page(1)
+    factory = RequestFactory()
+
+    def request(path):
+        request = factory.get(path)
+        request.user = author
+        return request
+
+    return {
+        'index': (
+            'blog/index.html', {'page_obj': page}, request('/'),
+        ),
+        'detail': (
+            'blog/detail.html',
+            {
+                'post': posts[0], 'form': CommentForm(),
+                'comments': comments, 'comments_page': None,
+            },
+            request(f'/posts/{posts[0].pk}/'),
+        ),
+        'profile': (
+            'blog/profile.html', {'profile': author, 'page_obj': page},
+            request(f'/profile/{author.username}/'),
+        ),
+    }
+
+
+def measure(engine, template_name, context, request, repeat):
+    # Шаблон берётся из движка на каждый рендер, как это делает
+    # TemplateResponse, поэтому в замер входит работа загрузчиков
+    for _ in range(3):
+        engine.get_template(template_name).render(context, request)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        engine.get_template(template_name).render(context, request)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=10)
+    parser.add_argument('--comments', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    teardown = _django.setup()
+    from django.test.utils import teardown_test_environment
+
+    # Тестовое окружение подменяет Template._render обёрткой
+    # с сигналом template_rendered, которая искажает замеры
+    teardown_test_environment()
+    try:
+        backends = engines()
+        print(f'{"шаблон":<10}'
+              + ''.join(f'{name + ", мс":>16}' for name in backends)
+              + f'{"ускорение":>11}')
+        for name, (template, context, request) in cases(
+            args.posts, args.comments
+        ).items():
+            timings = {
+                backend: measure(engine, template, context, request,
+                                 args.repeat)
+                for backend, engine in backends.items()
+            }
+            speedup = timings['uncached'] / timings['production']
+            print(f'{name:<10}'
+                  + ''.join(f'{t * 1000:>16.3f}' for t in timings.values())
+                  + f'{speedup:>10.1f}x')
+    finally:
+        teardown()
+
+
+if __name__ == '__main__':
+    main()
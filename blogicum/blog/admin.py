@@ -1,7 +1,10 @@
 from django.contrib import admin
 from django.contrib.auth import get_user_model
 
-from .models import Category, Location, Post, Comment
+from .models import Category, ImageJob, Location, Post, Comment
+from .paginators import EstimatedCountPaginator
+from .search import get_backend
+from .search.base import WORD_RE
 
 User = get_user_model()
 
@@ -44,7 +47,13 @@ class PostAdmin(admin.ModelAdmin):
         'is_published',
         'created_at',
         'get_comment_count',
+        'image_status',
     )
+    # Автор, место и категория выводятся в каждой строке списка
+    list_select_related = ('author', 'location', 'category')
+    paginator = EstimatedCountPaginator
+    # Без второго COUNT(*) по всей таблице ради подписи «всего N»
+    show_full_result_count = False
     list_editable = ('is_published',)
     list_filter = (
         'is_published',
@@ -52,19 +61,23 @@ class PostAdmin(admin.ModelAdmin):
         'location',
         'pub_date',
         'created_at',
+        'image_status',
     )
     search_fields = ('title', 'text')
     filter_horizontal = ()
     date_hierarchy = 'pub_date'
     raw_id_fields = ('author',)
-    readonly_fields = ('created_at', 'get_comment_count')
+    readonly_fields = (
+        'created_at', 'published_at', 'get_comment_count', 'image_status'
+    )
     fieldsets = (
         (None, {
-            'fields': ('title', 'text', 'image', 'author')
+            'fields': ('title', 'text', 'image', 'image_status', 'author')
         }),
         ('Дополнительные опции', {
             'fields': (
                 'pub_date',
+                'published_at',
                 'location',
                 'category',
                 'is_published',
@@ -80,9 +93,19 @@ class PostAdmin(admin.ModelAdmin):
             return qs
         return qs.filter(author=request.user)
 
+    def get_search_results(self, request, queryset, search_term):
+        # Ищем по индексу поискового движка вместо LIKE '%...%'
+        if WORD_RE.search(search_term):
+            backend = get_backend(queryset.db)
+            return backend.filter(queryset, search_term), False
+        return super().get_search_results(request, queryset, search_term)
+
+    @admin.display(
+        description='Количество комментариев', ordering='comment_count'
+    )
     def get_comment_count(self, obj):
-        return obj.comment.count()
-    get_comment_count.short_description = 'Количество комментариев'
+        # Счётчик хранится в Post.comment_count: COUNT по строкам не нужен
+        return obj.comment_count
 
 
 @admin.register(Comment)
@@ -95,4 +118,24 @@ class CommentAdmin(admin.ModelAdmin):
     )
     list_filter = ('created_at', 'author')
     search_fields = ('text', 'post__title', 'author__username')
+    list_select_related = ('post', 'author')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     readonly_fields = ('created_at',)
+
+
+@admin.register(ImageJob)
+class ImageJobAdmin(admin.ModelAdmin):
+    list_display = (
+        'image',
+        'post',
+        'status',
+        'attempts',
+        'run_after',
+        'created_at',
+    )
+    list_filter = ('status',)
+    raw_id_fields = ('post',)
+    readonly_fields = (
+        'created_at', 'locked_at', 'last_error', 'release_after'
+    )
@@ -0,0 +1,202 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+
+from .timing import record_cache
+
+PAGE_CACHE_PREFIX = 'blog:page'
+POST_CARD_CACHE_PREFIX = 'blog:card'
+POST_CARD_TEMPLATE = 'includes/post_card.html'
+
+
+def _generation_key(scope):
+    return f'{PAGE_CACHE_PREFIX}:gen:{scope}'
+
+
+def get_generation(scope):
+    key = _generation_key(scope)
+    generation = cache.get(key)
+    if generation is None:
+        # Начальное значение растёт со временем, поэтому после вытеснения
+        # ключа поколения старые страницы не станут снова актуальными
+        cache.add(key, time.time_ns(), None)
+        generation = cache.get(key)
+    return generation
+
+
+async def aget_generation(scope):
+    key = _generation_key(scope)
+    generation = await cache.aget(key)
+    if generation is None:
+        await cache.aadd(key, time.time_ns(), None)
+        generation = await cache.aget(key)
+    return generation
+
+
+def _page_key(scope, generation, query_string):
+    query_hash = hashlib.md5(query_string.encode()).hexdigest()
+    return f'{PAGE_CACHE_PREFIX}:{scope}:{generation}:{query_hash}'
+
+
+def page_cache_key(scope, query_string):
+    return _page_key(scope, get_generation(scope), query_string)
+
+
+async def apage_cache_key(scope, query_string):
+    return _page_key(scope, await aget_generation(scope), query_string)
+
+
+def is_process_local():
+    """Кэш виден только своему процессу.
+
+    Сброс кэша сигналами тогда не доходит до остальных воркеров,
+    и страница в них живёт до истечения таймаута.
+    """
+    return isinstance(caches[DEFAULT_CACHE_ALIAS], LocMemCache)
+
+
+def page_cache_timeout():
+    """Время жизни страницы.
+
+    Бессрочные страницы в кэше отдельного процесса никогда бы не
+    сбросились в других воркерах, поэтому такие страницы не кэшируются
+    (см. также blog.checks). По той же причине сброс кэша командой
+    publish_scheduled не доходит до веб-воркеров: в таком кэше страница
+    живёт не дольше, чем до ближайшей отложенной публикации.
+    """
+    from .models import Post
+
+    timeout = getattr(settings, 'BLOG_PAGE_CACHE_TIMEOUT', None)
+    if not is_process_local():
+        return timeout
+    if timeout is None:
+        return 0
+    # Пост с наступившей, но ещё не отмеченной датой publish_scheduled
+    # выпустит с минуты на минуту: страница живёт секунду
+    next_pub_date = Post.objects.filter(
+        published_at__isnull=True
+    ).order_by('pub_date').values_list('pub_date', flat=True).first()
+    if next_pub_date is not None:
+        seconds = (next_pub_date - timezone.now()).total_seconds()
+        timeout = min(timeout, max(int(seconds), 1))
+    return timeout
+
+
+def stale_page_lifetime():
+    """Сколько секунд страница в кэше может пережить свой сброс.
+
+    Общий кэш сбрасывается сразу для всех процессов. В кэше процесса
+    страница живёт до таймаута, который проверка blog.E001 требует
+    задать.
+    """
+    if not is_process_local():
+        return 0
+    return getattr(settings, 'BLOG_PAGE_CACHE_TIMEOUT', None) or 0
+
+
+def invalidate_pages(*scopes):
+    for scope in set(scopes):
+        try:
+            cache.incr(_generation_key(scope))
+        except ValueError:
+            # Поколения нет - значит, и страниц этой области в кэше нет
+            pass
+
+
+def scopes_for_posts(posts):
+    """Области кэша страниц, на которых видны посты из posts."""
+    scopes = {index_scope()}
+    for slug, username in posts.values_list(
+        'category__slug', 'author__username'
+    ).distinct():
+        if slug:
+            scopes.add(category_scope(slug))
+        scopes.add(profile_scope(username))
+    return scopes
+
+
+def index_scope():
+    return 'index'
+
+
+def category_scope(slug):
+    return f'category:{slug}'
+
+
+def profile_scope(username):
+    return f'profile:{username}'
+
+
+def post_card_version(post):
+    """Версия карточки: меняется вместе с любыми данными, которые в ней видны.
+
+    Связанные объекты должны быть загружены через select_related.
+    """
+    category = post.category
+    location = post.location
+    state = (
+        post.title,
+        post.text,
+        post.image.name,
+        post.pub_date.isoformat(),
+        post.is_published,
+        post.comment_count,
+        post.author.username,
+        category and (category.slug, category.title, category.is_published),
+        location and (location.name, location.is_published),
+    )
+    return hashlib.md5(repr(state).encode()).hexdigest()
+
+
+def _card_keys(posts):
+    # Карточки, уже отрендеренные асинхронным представлением, пропускаются
+    return {
+        f'{POST_CARD_CACHE_PREFIX}:{post.pk}:{post_card_version(post)}': post
+        for post in posts
+        if not hasattr(post, 'card_html')
+    }
+
+
+def _fill_cards(keyed_posts, cached):
+    """Проставляет card_html и возвращает заново отрендеренные карточки."""
+    record_cache(
+        'card', hits=len(cached), misses=len(keyed_posts) - len(cached)
+    )
+    rendered = {}
+    for key, post in keyed_posts.items():
+        html = cached.get(key)
+        if html is None:
+            html = rendered[key] = render_to_string(
+                POST_CARD_TEMPLATE, {'post': post}
+            )
+        post.card_html = mark_safe(html)
+    return rendered
+
+
+def _card_timeout():
+    return getattr(settings, 'BLOG_POST_CARD_CACHE_TIMEOUT', None)
+
+
+def render_post_cards(posts):
+    """Проставляет post.card_html, рендеря только карточки не из кэша."""
+    keyed_posts = _card_keys(posts)
+    if not keyed_posts:
+        return
+    rendered = _fill_cards(keyed_posts, cache.get_many(keyed_posts))
+    if rendered:
+        cache.set_many(rendered, _card_timeout())
+
+
+async def arender_post_cards(posts):
+    keyed_posts = _card_keys(posts)
+    if not keyed_posts:
+        return
+    rendered = _fill_cards(keyed_posts, await cache.aget_many(keyed_posts))
+    if rendered:
+        await cache.aset_many(rendered, _card_timeout())
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+from .cache import is_process_local
+
+
+@register(Tags.caches)
+def check_page_cache(app_configs, **kwargs):
+    """Бессрочный кэш страниц требует общего для процессов кэша."""
+    if settings.BLOG_PAGE_CACHE_TIMEOUT is None and is_process_local():
+        return [Error(
+            'BLOG_PAGE_CACHE_TIMEOUT = None требует общего для всех '
+            'процессов кэша: LocMemCache сбрасывается только в том '
+            'процессе, где изменили пост.',
+            hint='Настройте в CACHES["default"] Redis, Memcached, '
+                 'файловый или табличный кэш либо задайте конечный '
+                 'BLOG_PAGE_CACHE_TIMEOUT.',
+            id='blog.E001',
+        )]
+    return []
@@ -0,0 +1,155 @@
+import posixpath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from .storage import post_image_storage, remove_empty_parents
+
+# Уменьшенные копии лежат рядом с оригиналами:
+# MEDIA_ROOT/variants/images/photo.jpg/640.webp
+VARIANTS_DIR = 'variants'
+VARIANT_FORMATS = {
+    'webp': ('WEBP', 'image/webp'),
+    'jpg': ('JPEG', 'image/jpeg'),
+}
+VARIANT_QUALITY = 80
+
+# Форматы, которые сохраняются как есть, если фото не нужно
+# уменьшать и в нём нет EXIF
+KEPT_FORMATS = {'JPEG', 'PNG', 'WEBP', 'GIF'}
+
+
+def image_widths():
+    return tuple(settings.BLOG_IMAGE_WIDTHS)
+
+
+def variant_name(name, width, extension):
+    return f'{VARIANTS_DIR}/{name}/{width}.{extension}'
+
+
+def parse_variant_name(variant):
+    """Возвращает (name, width, extension) или None для чужого пути."""
+    directory, filename = posixpath.split(variant)
+    width, _, extension = filename.partition('.')
+    if (
+        not width.isdigit()
+        or int(width) not in image_widths()
+        or extension not in VARIANT_FORMATS
+        or not directory
+    ):
+        return None
+    return directory, int(width), extension
+
+
+def srcset(name, extension):
+    return ', '.join(
+        f'{default_storage.url(variant_name(name, width, extension))} {width}w'
+        for width in image_widths()
+    )
+
+
+def _encode(image, width, extension):
+    if image.width > width:
+        height = round(image.height * width / image.width)
+        image = image.resize((width, height), Image.Resampling.LANCZOS)
+    if extension == 'jpg' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    content = ContentFile(b'')
+    image.save(
+        content, VARIANT_FORMATS[extension][0], quality=VARIANT_QUALITY
+    )
+    return content
+
+
+def generate_variant(name, width, extension, image=None):
+    """Сохраняет одну копию, если её ещё нет, и возвращает её имя."""
+    variant = variant_name(name, width, extension)
+    if default_storage.exists(variant):
+        return variant
+    if image is None:
+        image = open_image(name)
+    # Хранилище не перезаписывает файлы, поэтому при гонке двух
+    # процессов лишняя копия получит суффикс и будет удалена
+    saved = default_storage.save(variant, _encode(image, width, extension))
+    if saved != variant:
+        default_storage.delete(saved)
+    return variant
+
+
+def open_image(name):
+    with post_image_storage().open(name) as f:
+        image = Image.open(f)
+        image.load()
+    # Фото с телефонов часто повёрнуты только тегом EXIF
+    return ImageOps.exif_transpose(image)
+
+
+def generate_variants(name):
+    """Создаёт все недостающие копии изображения."""
+    missing = [
+        (width, extension)
+        for width in image_widths()
+        for extension in VARIANT_FORMATS
+        if not default_storage.exists(variant_name(name, width, extension))
+    ]
+    if not missing:
+        return
+    image = open_image(name)
+    for width, extension in missing:
+        generate_variant(name, width, extension, image)
+
+
+def _needs_normalizing(image, max_size):
+    return (
+        image.format not in KEPT_FORMATS
+        or max(image.size) > max_size
+        or bool(image.getexif())
+    )
+
+
+def normalize_image(name):
+    """Приводит загруженное фото к виду, в котором его можно отдавать.
+
+    Поворачивает по EXIF, уменьшает до BLOG_IMAGE_MAX_SIZE и сохраняет
+    без метаданных: EXIF может содержать координаты съёмки.
+    Возвращает имя нового файла или name, если фото уже в порядке.
+    """
+    max_size = settings.BLOG_IMAGE_MAX_SIZE
+    storage = post_image_storage()
+    with storage.open(name) as f:
+        image = Image.open(f)
+        if not _needs_normalizing(image, max_size):
+            return name
+        image.load()
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image_format, extension = 'PNG', 'png'
+    else:
+        image_format, extension = 'JPEG', 'jpg'
+        image = image.convert('RGB')
+    content = ContentFile(b'')
+    image.save(content, image_format, quality=90)
+    stem = posixpath.splitext(name)[0]
+    return storage.save(f'{stem}.{extension}', content)
+
+
+def delete_variants(name):
+    directory = f'{VARIANTS_DIR}/{name}'
+    if not default_storage.exists(directory):
+        return
+    for filename in default_storage.listdir(directory)[1]:
+        default_storage.delete(f'{directory}/{filename}')
+    remove_empty_parents(default_storage, f'{directory}/', VARIANTS_DIR)
+
+
+def process_image(name):
+    """Полная обработка загруженного фото; выполняется в process_media.
+
+    Не обращается к базе, поэтому годится для ProcessPoolExecutor.
+    """
+    name = normalize_image(name)
+    generate_variants(name)
+    return name
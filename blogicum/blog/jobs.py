@@ -0,0 +1,124 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .cache import stale_page_lifetime
+from .models import ImageJob, ImageStatus, Post
+from .storage import acquire_image, delete_image_file, release_image
+
+
+def enqueue_image(post):
+    return ImageJob.objects.create(post=post, image=post.image.name)
+
+
+def claim_jobs(limit):
+    """Берёт в работу до limit задач, чей срок подошёл.
+
+    Задача захватывается условным UPDATE, поэтому несколько
+    процессов process_media не возьмут одну и ту же задачу.
+    """
+    now = timezone.now()
+    candidates = ImageJob.objects.filter(
+        status=ImageJob.Status.PENDING, run_after__lte=now
+    ).values_list('pk', flat=True)[:limit]
+    claimed = [
+        pk for pk in candidates
+        if ImageJob.objects.filter(
+            pk=pk, status=ImageJob.Status.PENDING
+        ).update(
+            status=ImageJob.Status.RUNNING,
+            locked_at=now,
+            attempts=F('attempts') + 1,
+        )
+    ]
+    return list(ImageJob.objects.filter(pk__in=claimed))
+
+
+def requeue_stale_jobs(timeout):
+    """Возвращает в очередь задачи упавших воркеров."""
+    return ImageJob.objects.filter(
+        status=ImageJob.Status.RUNNING,
+        locked_at__lt=timezone.now() - timedelta(seconds=timeout),
+    ).update(status=ImageJob.Status.PENDING, locked_at=None)
+
+
+def _update_post(job, **fields):
+    # Пока задача ждала, фото могли заменить: тогда результат
+    # устарел, и пост обновит уже следующая задача
+    post = Post.objects.filter(pk=job.post_id, image=job.image).first()
+    if post is None:
+        return False
+    for field, value in fields.items():
+        setattr(post, field, value)
+    # save(), а не update(): сигналы сбрасывают кэш страниц с постом
+    post.save(update_fields=[*fields, 'updated_at'])
+    return True
+
+
+@transaction.atomic
+def complete_job(job, name):
+    job.status = ImageJob.Status.DONE
+    job.last_error = ''
+    job.save(update_fields=['status', 'last_error'])
+    if name == job.image:
+        _update_post(job, image_status=ImageStatus.READY)
+        return
+    # Ссылки на старый и новый файлы пересчитают сигналы Post
+    if not _update_post(job, image=name, image_status=ImageStatus.READY):
+        # Фото успели заменить: результат нужен, только если такой же
+        # файл уже есть у другого поста
+        delete_image_file(name)
+        return
+    lifetime = stale_page_lifetime()
+    if lifetime:
+        # Сигналы сбросили кэш страниц только в этом процессе: пока
+        # страницы веб-воркеров ссылаются на исходный файл, задача
+        # держит на него ссылку. Удаление, запланированное сигналом,
+        # увидит её и файл не тронет.
+        acquire_image(job.image)
+        job.release_after = timezone.now() + timedelta(seconds=lifetime)
+        job.save(update_fields=['release_after'])
+
+
+def release_replaced_images():
+    """Освобождает исходные файлы, которые задачи держали для кэша."""
+    due = ImageJob.objects.filter(
+        release_after__lte=timezone.now()
+    ).values_list('pk', 'image')
+    released = 0
+    for pk, image in due:
+        with transaction.atomic():
+            # Условный UPDATE: ссылку снимает только один процесс
+            if ImageJob.objects.filter(
+                pk=pk, release_after__isnull=False
+            ).update(release_after=None):
+                release_image(image)
+                released += 1
+    return released
+
+
+@transaction.atomic
+def fail_job(job, error):
+    """Откладывает задачу с экспоненциальной задержкой или бросает её."""
+    job.last_error = f'{type(error).__name__}: {error}'
+    replaced = not Post.objects.filter(
+        pk=job.post_id, image=job.image
+    ).exists()
+    # Повторять обработку заменённого фото незачем: его файл
+    # могли уже удалить
+    if replaced or job.attempts >= settings.BLOG_IMAGE_JOB_ATTEMPTS:
+        job.status = ImageJob.Status.FAILED
+        _update_post(job, image_status=ImageStatus.FAILED)
+    else:
+        job.status = ImageJob.Status.PENDING
+        job.run_after = timezone.now() + timedelta(
+            seconds=settings.BLOG_IMAGE_JOB_RETRY_DELAY
+            * 2 ** (job.attempts - 1)
+        )
+    job.locked_at = None
+    job.save(
+        update_fields=['status', 'run_after', 'locked_at', 'last_error']
+    )
@@ -0,0 +1,267 @@
+import gzip
+import json
+import re
+import time
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.core.serializers.base import DeserializationError
+from django.core.serializers.python import Deserializer
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models.constants import OnConflict
+
+from blog.models import Comment, Post
+
+User = get_user_model()
+
+CHUNK_SIZE = 1 << 16
+SEPARATORS = re.compile(r'[\s,]*')
+
+
+class JsonArrayReader:
+    """По одному отдаёт элементы JSON-массива, не читая файл целиком."""
+
+    def __init__(self, stream, chunk_size=CHUNK_SIZE):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.position = 0
+        self.eof = False
+
+    def _fill(self):
+        chunk = self.stream.read(self.chunk_size)
+        self.eof = not chunk
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+
+    def _next_char(self):
+        """Пропускает пробелы и запятые, подчитывая файл при необходимости."""
+        while True:
+            self.position = SEPARATORS.match(
+                self.buffer, self.position
+            ).end()
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if self.eof:
+                raise CommandError('Неожиданный конец фикстуры.')
+            self._fill()
+
+    def __iter__(self):
+        if self._next_char() != '[':
+            raise CommandError('Фикстура должна быть JSON-массивом.')
+        self.position += 1
+        while self._next_char() != ']':
+            try:
+                obj, self.position = self.decoder.raw_decode(
+                    self.buffer, self.position
+                )
+            except json.JSONDecodeError as error:
+                if self.eof:
+                    raise CommandError(f'Некорректный JSON: {error}')
+                self._fill()
+                continue
+            yield obj
+
+
+def iter_json_array(stream, chunk_size=CHUNK_SIZE):
+    return iter(JsonArrayReader(stream, chunk_size))
+
+
+def iter_json_lines(stream):
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as error:
+            raise CommandError(f'Некорректный JSON в строке {number}: {error}')
+
+
+def open_fixture(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, encoding='utf-8')
+
+
+class BulkLoader:
+    """Копит объекты по моделям и вставляет их пачками.
+
+    Вставка идёт с raw=True, как в loaddata: auto_now_add и auto_now
+    не перезаписывают значения из фикстуры, сигналы не отправляются.
+    Уже существующие строки с тем же pk обновляются, кроме
+    пользователей: их export_blog выгружает без паролей.
+    """
+
+    def __init__(self, using, batch_size, on_flush=None):
+        self.using = using
+        self.batch_size = batch_size
+        self.on_flush = on_flush
+        self.pending = defaultdict(dict)
+        self.loaded = defaultdict(int)
+
+    def add(self, deserialized):
+        obj = deserialized.object
+        if obj.pk is None:
+            raise CommandError(
+                f'У объекта {obj._meta.label} нет pk: натуральные первичные '
+                'ключи не поддерживаются.'
+            )
+        # Повтор pk в одной пачке ломает ON CONFLICT в PostgreSQL
+        self.pending[type(obj)][obj.pk] = deserialized
+        if len(self.pending[type(obj)]) >= self.batch_size:
+            self.flush(type(obj))
+
+    def flush_all(self):
+        for model in list(self.pending):
+            self.flush(model)
+
+    def flush(self, model):
+        items = list(self.pending.pop(model, {}).values())
+        if not items:
+            return
+        opts = model._meta
+        fields = opts.concrete_fields
+        objs = [item.object for item in items]
+        # Старые фикстуры могут не содержать полей auto_now/auto_now_add
+        auto_fields = [
+            field for field in fields
+            if getattr(field, 'auto_now', False)
+            or getattr(field, 'auto_now_add', False)
+        ]
+        for obj in objs:
+            for field in auto_fields:
+                if getattr(obj, field.attname) is None:
+                    field.pre_save(obj, add=True)
+        connection = connections[self.using]
+        max_batch = max(connection.ops.bulk_batch_size(fields, objs), 1)
+        if model is User:
+            # export_blog выгружает пользователей без паролей: уже
+            # существующие учётные записи не перезаписываются
+            conflict = {'on_conflict': OnConflict.IGNORE}
+        else:
+            conflict = {
+                'on_conflict': OnConflict.UPDATE,
+                'update_fields': [f for f in fields if not f.primary_key],
+                'unique_fields': [opts.pk],
+            }
+        for start in range(0, len(objs), max_batch):
+            model._base_manager.using(self.using)._insert(
+                objs[start:start + max_batch],
+                fields=fields,
+                raw=True,
+                using=self.using,
+                **conflict,
+            )
+        self._insert_m2m(items)
+        self.loaded[model] += len(objs)
+        if self.on_flush:
+            self.on_flush(self)
+
+    def _insert_m2m(self, items):
+        rows = defaultdict(list)
+        for item in items:
+            for field_name, values in (item.m2m_data or {}).items():
+                field = item.object._meta.get_field(field_name)
+                through = field.remote_field.through
+                if not through._meta.auto_created:
+                    continue
+                source = f'{field.m2m_field_name()}_id'
+                target = f'{field.m2m_reverse_field_name()}_id'
+                rows[through].extend(
+                    through(**{source: item.object.pk, target: value})
+                    for value in values
+                )
+        for through, objs in rows.items():
+            through._base_manager.using(self.using).bulk_create(
+                objs, batch_size=self.batch_size, ignore_conflicts=True
+            )
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково загружает фикстуру в формате dumpdata (JSON или JSON Lines '
+        'из export_blog, можно .gz) пачками через bulk insert. В отличие '
+        'от loaddata не держит файл в памяти и не сохраняет объекты '
+        'по одному.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('fixture', help='Путь к файлу фикстуры.')
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько объектов одной модели вставлять за раз.',
+        )
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='База данных для загрузки.',
+        )
+
+    def handle(self, *args, **options):
+        using = options['database']
+        connection = connections[using]
+        started = time.monotonic()
+
+        def progress(loader):
+            if options['verbosity'] >= 2:
+                total = sum(loader.loaded.values())
+                rate = total / max(time.monotonic() - started, 1e-9)
+                self.stdout.write(f'{total} объектов, {rate:.0f} в секунду')
+
+        loader = BulkLoader(using, options['batch_size'], on_flush=progress)
+
+        fixture = options['fixture']
+        reader = iter_json_lines if fixture.removesuffix('.gz').endswith(
+            '.jsonl'
+        ) else iter_json_array
+
+        with open_fixture(fixture) as stream:
+            with transaction.atomic(using=using):
+                # Внешние ключи проверяются один раз в конце, поэтому
+                # порядок объектов в фикстуре не важен
+                with connection.constraint_checks_disabled():
+                    try:
+                        for deserialized in Deserializer(
+                            reader(stream), using=using
+                        ):
+                            loader.add(deserialized)
+                    except DeserializationError as error:
+                        raise CommandError(error)
+                    loader.flush_all()
+                models = list(loader.loaded)
+                connection.check_constraints(
+                    table_names=[model._meta.db_table for model in models]
+                )
+                self._reset_sequences(connection, models)
+
+        # bulk insert идёт в обход сигналов, поэтому производные данные
+        # пересчитываются отдельно
+        if Comment in loader.loaded:
+            call_command('recount_comments', database=using, verbosity=0)
+        if Post in loader.loaded:
+            call_command('recount_images', database=using, verbosity=0)
+            call_command(
+                'publish_scheduled', once=True, database=using, verbosity=0
+            )
+            call_command('rebuild_search_index', database=using, verbosity=0)
+        self._report(loader, time.monotonic() - started)
+
+    def _reset_sequences(self, connection, models):
+        statements = connection.ops.sequence_reset_sql(no_style(), models)
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
+
+    def _report(self, loader, elapsed):
+        elapsed = max(elapsed, 1e-9)
+        for model, count in loader.loaded.items():
+            self.stdout.write(f'{model._meta.label}: {count}')
+        total = sum(loader.loaded.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено объектов: {total} за {elapsed:.2f} с '
+            f'({total / elapsed:.0f} в секунду)'
+        ))
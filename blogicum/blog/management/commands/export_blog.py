@@ -0,0 +1,153 @@
+import base64
+import gzip
+import json
+import os
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core import serializers
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Exists, OuterRef
+
+from blog.models import Category, Comment, Location, Post
+
+User = get_user_model()
+
+# Порядок важен: сначала модели, на которые ссылаются остальные
+EXPORT_MODELS = (User, Category, Location, Post, Comment)
+
+# Пользователи выгружаются без паролей, прав и почты: только то,
+# что видно на страницах блога
+USER_FIELDS = ('username', 'first_name', 'last_name', 'date_joined')
+
+
+def export_queryset(model):
+    """Объекты модели, попадающие в выгрузку."""
+    queryset = model._default_manager.order_by('pk')
+    if model is User:
+        # Только авторы постов и комментариев
+        queryset = queryset.filter(
+            Exists(Post.objects.filter(author=OuterRef('pk')))
+            | Exists(Comment.objects.filter(author=OuterRef('pk')))
+        )
+    return queryset
+
+
+def serialize(model, chunk):
+    if model is not User:
+        return serializers.serialize('python', chunk)
+    items = serializers.serialize('python', chunk, fields=USER_FIELDS)
+    for item in items:
+        # Войти под выгруженной учётной записью нельзя, пока ей
+        # не зададут пароль
+        item['fields']['password'] = make_password(None)
+    return items
+
+
+def encode_token(model, pk, offset):
+    raw = json.dumps({'model': model._meta.label, 'pk': pk, 'offset': offset})
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_token(token):
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token.encode()))
+        labels = [model._meta.label for model in EXPORT_MODELS]
+        return labels.index(data['model']), data['pk'], int(data['offset'])
+    except (ValueError, KeyError, TypeError):
+        raise CommandError('Некорректный токен продолжения.')
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково выгружает категории, местоположения, посты, комментарии '
+        'и их авторов (без паролей) в JSON Lines. Каждая строка - объект '
+        'в формате dumpdata. Прерванную выгрузку можно продолжить '
+        'с --resume.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'output',
+            help='Файл выгрузки; при окончании .gz пишется сжатый поток.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='Сколько строк читать из базы и записывать за раз.',
+        )
+        parser.add_argument(
+            '--resume', nargs='?', const='', default=None,
+            metavar='TOKEN',
+            help='Продолжить выгрузку; без значения токен берётся '
+                 'из файла <output>.resume.',
+        )
+
+    def handle(self, *args, **options):
+        output = options['output']
+        token_path = f'{output}.resume'
+        compress = output.endswith('.gz')
+
+        start_model, last_pk, offset = 0, None, 0
+        if options['resume'] is not None:
+            token = options['resume'] or self._read_token(token_path)
+            start_model, last_pk, offset = decode_token(token)
+
+        mode = 'r+b' if options['resume'] is not None else 'wb'
+        exported = 0
+        with open(output, mode) as stream:
+            # Всё, что записано после последнего токена, выгрузится заново
+            stream.truncate(offset)
+            stream.seek(offset)
+            for index, model in enumerate(EXPORT_MODELS):
+                if index < start_model:
+                    continue
+                after = last_pk if index == start_model else None
+                for chunk in self._chunks(model, after, options['chunk_size']):
+                    self._write(stream, model, chunk, compress)
+                    exported += len(chunk)
+                    self._save_token(
+                        token_path,
+                        encode_token(model, chunk[-1].pk, stream.tell()),
+                    )
+        if os.path.exists(token_path):
+            os.remove(token_path)
+        self.stdout.write(
+            self.style.SUCCESS(f'Выгружено объектов: {exported}')
+        )
+
+    def _chunks(self, model, after, chunk_size):
+        queryset = export_queryset(model)
+        if after is not None:
+            queryset = queryset.filter(pk__gt=after)
+        rows = queryset.iterator(chunk_size=chunk_size)
+        while chunk := list(islice(rows, chunk_size)):
+            yield chunk
+
+    def _write(self, stream, model, chunk, compress):
+        data = ''.join(
+            json.dumps(item, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+            for item in serialize(model, chunk)
+        ).encode()
+        if compress:
+            # Каждая пачка - отдельный gzip-член: файл можно обрезать
+            # по границе пачки и дописать дальше
+            with gzip.GzipFile(fileobj=stream, mode='wb') as member:
+                member.write(data)
+        else:
+            stream.write(data)
+        stream.flush()
+
+    def _read_token(self, token_path):
+        try:
+            with open(token_path) as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            raise CommandError(f'Не найден файл {token_path}.')
+
+    def _save_token(self, token_path, token):
+        temporary = f'{token_path}.tmp'
+        with open(temporary, 'w') as f:
+            f.write(token)
+        os.replace(temporary, token_path)
@@ -0,0 +1,103 @@
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from blog.images import process_image
+from blog.jobs import (
+    claim_jobs, complete_job, fail_job, release_replaced_images,
+    requeue_stale_jobs
+)
+
+
+class InlineExecutor:
+    """Выполняет задачи в текущем процессе (--workers 0)."""
+
+    def submit(self, fn, *args):
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as error:
+            future.set_exception(error)
+        return future
+
+    def shutdown(self):
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Обрабатывает загруженные фото постов из очереди ImageJob: '
+        'поворот по EXIF, удаление метаданных, уменьшение и генерация '
+        'копий для srcset. Работает в пуле процессов, пока не прервут.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Число процессов; 0 - обрабатывать в текущем процессе.',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Обработать готовые к запуску задачи и выйти.',
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=2.0,
+            help='Пауза между проверками пустой очереди, в секундах.',
+        )
+        parser.add_argument(
+            '--stale-after', type=int, default=15 * 60,
+            help='Через сколько секунд задача упавшего воркера '
+                 'возвращается в очередь.',
+        )
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        if workers:
+            # Дочерние процессы не работают с базой, но не должны
+            # унаследовать открытые соединения
+            connections.close_all()
+            executor = ProcessPoolExecutor(workers, initializer=django.setup)
+        else:
+            executor = InlineExecutor()
+        processed = 0
+        try:
+            while True:
+                requeue_stale_jobs(options['stale_after'])
+                release_replaced_images()
+                jobs = claim_jobs(max(workers, 1) * 2)
+                if not jobs:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+                processed += self._run(executor, jobs, options['verbosity'])
+        finally:
+            executor.shutdown()
+        if options['verbosity']:
+            self.stdout.write(
+                self.style.SUCCESS(f'Обработано фото: {processed}')
+            )
+
+    def _run(self, executor, jobs, verbosity):
+        futures = {
+            executor.submit(process_image, job.image): job for job in jobs
+        }
+        done = 0
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                name = future.result()
+            except Exception as error:
+                fail_job(job, error)
+                if verbosity:
+                    self.stderr.write(f'{job.image}: {job.last_error}')
+            else:
+                complete_job(job, name)
+                done += 1
+                if verbosity >= 2:
+                    self.stdout.write(f'{job.image} -> {name}')
+        return done
@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+
+from blog.publishing import next_pub_date, publish_due_posts
+
+
+class Command(BaseCommand):
+    help = (
+        'Выпускает в ленты отложенные посты, когда наступает их pub_date, '
+        'и сбрасывает кэш затронутых страниц. Спит до ближайшей '
+        'публикации и работает, пока не прервут.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выпустить посты с наступившей датой и выйти.',
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=60.0,
+            help='Наибольшая пауза между проверками, в секундах: за это '
+                 'время замечаются посты, запланированные после запуска.',
+        )
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='База данных с постами.',
+        )
+
+    def handle(self, *args, **options):
+        using = options['database']
+        published = 0
+        while True:
+            count = publish_due_posts(using)
+            published += count
+            if count and options['verbosity'] >= 2:
+                self.stdout.write(f'Вышло в ленты: {count}')
+            if options['once']:
+                break
+            time.sleep(self._delay(using, options['poll_interval']))
+        if options['verbosity']:
+            self.stdout.write(
+                self.style.SUCCESS(f'Опубликовано постов: {published}')
+            )
+
+    def _delay(self, using, poll_interval):
+        upcoming = next_pub_date(using)
+        if upcoming is None:
+            return poll_interval
+        seconds = (upcoming - timezone.now()).total_seconds()
+        return min(max(seconds, 0), poll_interval)
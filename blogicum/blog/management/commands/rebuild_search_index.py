@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from blog.search import get_backend
+
+
+class Command(BaseCommand):
+    help = (
+        'Перестраивает поисковый индекс постов движком из '
+        'BLOG_SEARCH_BACKEND (по умолчанию FTS5 на SQLite).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='База данных, индекс которой перестраивается.',
+        )
+
+    def handle(self, *args, **options):
+        backend = get_backend(options['database'])
+        backend.setup()
+        backend.rebuild()
+        if options['verbosity']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Индекс перестроен: {type(backend).__name__}.'
+            ))
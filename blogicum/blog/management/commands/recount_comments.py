@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from blog.models import Comment, Post
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает Post.comment_count по таблице комментариев.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='База данных, в которой пересчитываются счётчики.',
+        )
+
+    def handle(self, *args, **options):
+        using = options['database']
+        counts = Comment.objects.using(using).filter(
+            post=OuterRef('pk')
+        ).order_by().values('post').annotate(total=Count('pk')).values('total')
+        updated = Post.objects.using(using).exclude(
+            comment_count=Coalesce(Subquery(counts), 0)
+        ).update(comment_count=Coalesce(Subquery(counts), 0))
+        if options['verbosity']:
+            self.stdout.write(
+                self.style.SUCCESS(f'Исправлено счётчиков: {updated}')
+            )
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count
+
+from blog.models import ImageBlob, Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает ImageBlob.refcount по ссылкам Post.image, '
+        'например после loaddata, который не отправляет сигналы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='База данных, в которой пересчитываются ссылки.',
+        )
+
+    def handle(self, *args, **options):
+        using = options['database']
+        counts = Post.objects.using(using).exclude(image='').order_by(
+        ).values('image').annotate(total=Count('pk'))
+        with transaction.atomic(using=using):
+            ImageBlob.objects.using(using).all().delete()
+            ImageBlob.objects.using(using).bulk_create(
+                (ImageBlob(name=row['image'], refcount=row['total'])
+                 for row in counts.iterator()),
+                batch_size=1000,
+            )
+        if options['verbosity']:
+            total = ImageBlob.objects.using(using).count()
+            self.stdout.write(self.style.SUCCESS(f'Учтено файлов: {total}'))
@@ -0,0 +1,354 @@
+import fcntl
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+# Метрики в формате Prometheus без сторонних библиотек.
+# Каждый процесс (воркер gunicorn) пишет значения в собственный файл
+# в BLOG_METRICS_DIR, отображённый в память: воркеры не делят между
+# собой ни файлов, ни блокировок. /metrics складывает значения из файлов
+# работающих процессов и общего файла завершившихся: их значения
+# переносятся туда, а собственные файлы удаляются. Без BLOG_METRICS_DIR
+# метрики хранятся в анонимной памяти и видны только своему процессу.
+
+MAGIC = b'BLMT'
+HEADER = struct.Struct('<4sI')  # magic, занято байт
+KEY_LEN = struct.Struct('<I')
+VALUE = struct.Struct('<d')
+INITIAL_SIZE = 1 << 16
+FILE_NAME = 'metrics-{pid}.bin'
+FILE_NAME_RE = re.compile(r'metrics-(\d+)\.bin')
+EXITED_FILE_NAME = 'metrics-exited.bin'
+EXITED_LOCK_NAME = 'metrics-exited.lock'
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+
+class MetricsFile:
+    """Значения метрик одного процесса.
+
+    Записи идут подряд: длина ключа, ключ (JSON), выравнивание до 8 байт,
+    значение double. Заголовок хранит длину заполненной части: запись
+    сначала дописывается целиком и только потом учитывается
+    в заголовке, поэтому читатель никогда не видит её наполовину.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._offsets = {}
+        if path is None:
+            self._file = None
+            self._mmap = mmap.mmap(-1, INITIAL_SIZE)
+            HEADER.pack_into(self._mmap, 0, MAGIC, HEADER.size)
+        else:
+            self._file = open(path, 'a+b')
+            if os.fstat(self._file.fileno()).st_size == 0:
+                self._file.truncate(INITIAL_SIZE)
+            self._mmap = mmap.mmap(self._file.fileno(), 0)
+            if self._mmap[:4] != MAGIC:
+                HEADER.pack_into(self._mmap, 0, MAGIC, HEADER.size)
+            # Процесс с тем же pid продолжает счёт с прежних значений
+            for key, offset, _ in iter_entries(self._mmap):
+                self._offsets[key] = offset
+
+    def _append(self, key):
+        encoded = key.encode()
+        padded = len(encoded) + (-(KEY_LEN.size + len(encoded)) % 8)
+        used = HEADER.unpack_from(self._mmap)[1]
+        end = used + KEY_LEN.size + padded + VALUE.size
+        if end > len(self._mmap):
+            self._grow(end)
+        KEY_LEN.pack_into(self._mmap, used, len(encoded))
+        start = used + KEY_LEN.size
+        self._mmap[start:start + len(encoded)] = encoded
+        offset = start + padded
+        VALUE.pack_into(self._mmap, offset, 0.0)
+        HEADER.pack_into(self._mmap, 0, MAGIC, end)
+        self._offsets[key] = offset
+        return offset
+
+    def _grow(self, needed):
+        size = len(self._mmap)
+        while size < needed:
+            size *= 2
+        if self._file is None:
+            grown = mmap.mmap(-1, size)
+            grown[:len(self._mmap)] = self._mmap[:]
+        else:
+            self._mmap.flush()
+            self._file.truncate(size)
+            grown = mmap.mmap(self._file.fileno(), 0)
+        self._mmap.close()
+        self._mmap = grown
+
+    def increment(self, key, amount=1.0):
+        with self._lock:
+            offset = self._offsets.get(key)
+            if offset is None:
+                offset = self._append(key)
+            value = VALUE.unpack_from(self._mmap, offset)[0]
+            VALUE.pack_into(self._mmap, offset, value + amount)
+
+    def values(self):
+        with self._lock:
+            return {key: value for key, _, value in iter_entries(self._mmap)}
+
+    def close(self):
+        self._mmap.close()
+        if self._file is not None:
+            self._file.close()
+
+
+def iter_entries(buffer):
+    """(ключ, смещение значения, значение) всех записей файла метрик."""
+    magic, used = HEADER.unpack_from(buffer)
+    if magic != MAGIC:
+        return
+    position = HEADER.size
+    while position < used:
+        (length,) = KEY_LEN.unpack_from(buffer, position)
+        start = position + KEY_LEN.size
+        key = bytes(buffer[start:start + length]).decode()
+        offset = start + length + (-(KEY_LEN.size + length) % 8)
+        yield key, offset, VALUE.unpack_from(buffer, offset)[0]
+        position = offset + VALUE.size
+
+
+def _process_alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Процесс есть, но принадлежит другому пользователю
+        return True
+    return True
+
+
+class Registry:
+    """Набор метрик процесса; значения лежат в MetricsFile."""
+
+    def __init__(self):
+        self.metrics = {}
+        self._file = None
+        self._file_pid = None
+        self._file_lock = threading.Lock()
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        metric.registry = self
+        return metric
+
+    @property
+    def file(self):
+        # После fork() воркер gunicorn должен писать в свой файл
+        if self._file_pid != os.getpid():
+            with self._file_lock:
+                if self._file_pid != os.getpid():
+                    self._file = MetricsFile(self._path())
+                    self._file_pid = os.getpid()
+        return self._file
+
+    def reset(self):
+        with self._file_lock:
+            self._file = None
+            self._file_pid = None
+
+    def _path(self):
+        directory = getattr(settings, 'BLOG_METRICS_DIR', None)
+        if directory is None:
+            return None
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, FILE_NAME.format(pid=os.getpid()))
+
+    def collect(self):
+        """Сумма значений по всем процессам: {ключ: значение}."""
+        own = self.file
+        if own.path is None:
+            return own.values()
+        directory = os.path.dirname(own.path)
+        totals = defaultdict(float)
+        exited = []
+        for name in os.listdir(directory):
+            match = FILE_NAME_RE.fullmatch(name)
+            if match is None:
+                continue
+            path = os.path.join(directory, name)
+            if _process_alive(int(match[1])):
+                self._read(path, totals)
+            else:
+                exited.append(path)
+        for key, value in self._merge_exited(directory, exited).items():
+            totals[key] += value
+        return totals
+
+    def _merge_exited(self, directory, paths):
+        """Переносит значения завершившихся процессов в общий файл.
+
+        Без удаления файлы копились бы после каждого перезапуска
+        воркера, а без переноса сумма счётчиков падала бы, и Prometheus
+        видел бы в этом сброс счётчика. Возвращает значения общего файла.
+        """
+        lock_path = os.path.join(directory, EXITED_LOCK_NAME)
+        with open(lock_path, 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            exited = MetricsFile(os.path.join(directory, EXITED_FILE_NAME))
+            try:
+                for path in paths:
+                    values = defaultdict(float)
+                    try:
+                        self._read(path, values)
+                    except FileNotFoundError:
+                        continue  # Уже перенесён другим воркером
+                    for key, value in values.items():
+                        exited.increment(key, value)
+                    os.remove(path)
+                return exited.values()
+            finally:
+                exited.close()
+
+    def _read(self, path, totals):
+        with open(path, 'rb') as f:
+            try:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                return  # Пустой файл только что запущенного воркера
+        with buffer:
+            for key, _, value in iter_entries(buffer):
+                totals[key] += value
+
+    def render(self):
+        """Текстовый формат Prometheus 0.0.4."""
+        samples = defaultdict(dict)
+        for key, value in self.collect().items():
+            name, labels = json.loads(key)
+            samples[name][tuple(map(tuple, labels))] = value
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            lines.extend(metric.render(samples))
+        return '\n'.join(lines) + '\n'
+
+
+def _key(name, labels):
+    return json.dumps([name, sorted(labels.items())], ensure_ascii=False)
+
+
+def _format(name, labels, value):
+    if labels:
+        rendered = ','.join(
+            f'{label}="{_escape(str(text))}"' for label, text in labels
+        )
+        name = f'{name}{{{rendered}}}'
+    return f'{name} {float(value)!r}'
+
+
+def _escape(text):
+    return text.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+class Counter:
+    type = 'counter'
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self.registry = None
+
+    def inc(self, amount=1, **labels):
+        self.registry.file.increment(_key(self.name, labels), amount)
+
+    def render(self, samples):
+        for labels, value in sorted(samples.get(self.name, {}).items()):
+            yield _format(self.name, labels, value)
+
+
+class Histogram:
+    """Гистограмма: в файле хранятся непересекающиеся корзины.
+
+    Накопительные значения le считаются при выводе.
+    """
+
+    type = 'histogram'
+
+    def __init__(self, name, help, buckets):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.registry = None
+
+    def observe(self, value, **labels):
+        increment = self.registry.file.increment
+        for bound in self.buckets:
+            if value <= bound:
+                break
+        else:
+            bound = math.inf
+        bucket = dict(labels, le=str(bound))
+        increment(_key(f'{self.name}_bucket', bucket))
+        increment(_key(f'{self.name}_sum', labels), value)
+        increment(_key(f'{self.name}_count', labels))
+
+    def render(self, samples):
+        buckets = defaultdict(dict)
+        for labels, value in samples.get(f'{self.name}_bucket', {}).items():
+            plain = tuple(item for item in labels if item[0] != 'le')
+            buckets[plain][dict(labels)['le']] = value
+        for labels in sorted(samples.get(f'{self.name}_count', {})):
+            total = 0.0
+            for bound in (*self.buckets, math.inf):
+                total += buckets[labels].get(str(bound), 0.0)
+                le = '+Inf' if bound == math.inf else f'{bound:g}'
+                yield _format(
+                    f'{self.name}_bucket', (*labels, ('le', le)), total
+                )
+            for suffix in ('sum', 'count'):
+                yield _format(
+                    f'{self.name}_{suffix}', labels,
+                    samples[f'{self.name}_{suffix}'][labels],
+                )
+
+
+registry = Registry()
+
+
+@receiver(setting_changed)
+def reset_registry(setting, **kwargs):
+    if setting == 'BLOG_METRICS_DIR':
+        registry.reset()
+
+
+REQUEST_DURATION = registry.register(Histogram(
+    'blog_request_duration_seconds',
+    'Время обработки запроса по представлениям.',
+    LATENCY_BUCKETS,
+))
+REQUEST_QUERIES = registry.register(Histogram(
+    'blog_request_db_queries',
+    'Число SQL-запросов на HTTP-запрос по представлениям.',
+    QUERY_BUCKETS,
+))
+COMMENTS_CREATED = registry.register(Counter(
+    'blog_comments_created_total',
+    'Созданные комментарии; rate(...[1m]) * 60 - комментариев в минуту.',
+))
+CACHE_REQUESTS = registry.register(Counter(
+    'blog_cache_requests_total',
+    'Обращения к кэшу страниц и карточек постов по результату.',
+))
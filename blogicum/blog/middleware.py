@@ -0,0 +1,77 @@
+import json
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .metrics import REQUEST_DURATION, REQUEST_QUERIES
+from .timing import RequestTiming, activate, current_timing, deactivate
+
+logger = logging.getLogger('blog.requests')
+
+
+class ServerTimingMiddleware:
+    """Замеряет каждый запрос и отдаёт замеры в Server-Timing, лог и метрики.
+
+    Должен стоять первым в MIDDLEWARE: тогда его process_template_response
+    вызывается последним, прямо перед рендерингом шаблона. Строка лога
+    пишется в логгер blog.requests с уровнем INFO и ключом view_name.
+    Работает и под ASGI, не заставляя Django переводить
+    async-представления в синхронный поток.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timing = RequestTiming()
+        token = activate(timing)
+        try:
+            response = self.get_response(request)
+        finally:
+            deactivate(token)
+        return self.finish(request, response, timing)
+
+    async def __acall__(self, request):
+        timing = RequestTiming()
+        token = activate(timing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            deactivate(token)
+        return self.finish(request, response, timing)
+
+    def finish(self, request, response, timing):
+        timing.finish()
+
+        match = request.resolver_match
+        view = match.view_name if match else None
+        label = view or 'unresolved'
+        REQUEST_DURATION.observe(timing.total, view=label)
+        REQUEST_QUERIES.observe(timing.db_queries, view=label)
+
+        if getattr(settings, 'BLOG_SERVER_TIMING', True):
+            response['Server-Timing'] = timing.server_timing()
+        if logger.isEnabledFor(logging.INFO):
+            record = {
+                'view': view,
+                'method': request.method,
+                'status': response.status_code,
+                **timing.as_dict(),
+            }
+            logger.info(json.dumps(record), extra={'timing': record})
+        return response
+
+    def process_template_response(self, request, response):
+        timing = current_timing()
+        if timing is not None:
+            timing.template_started()
+            response.add_post_render_callback(timing.template_finished)
+        return response
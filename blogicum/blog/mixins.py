@@ -1,15 +1,295 @@
+import hashlib
+import inspect
+
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.core.cache import cache
+from django.core.paginator import InvalidPage
+from django.http import Http404, HttpResponse
 from django.shortcuts import redirect
 from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import quote_etag
+from django.views.generic.list import BaseListView
 
+from .cache import (
+    apage_cache_key, arender_post_cards, page_cache_key, page_cache_timeout,
+    post_card_version, render_post_cards
+)
 from .models import Comment
+from .paginators import InvalidCursor, KeysetPaginator
+from .timing import record_cache
 
 # Количество постов на странице
 POST_ON_PAGE = 10
+# Количество комментариев, подгружаемых за раз на странице поста
+COMMENT_ON_PAGE = 20
 
 
 class PaginatorMixin:
     paginate_by = POST_ON_PAGE
+    # None - режим берётся из settings.BLOG_KEYSET_PAGINATION
+    keyset_pagination = None
+
+    def use_keyset_pagination(self):
+        if self.keyset_pagination is None:
+            return getattr(settings, 'BLOG_KEYSET_PAGINATION', False)
+        return self.keyset_pagination
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.use_keyset_pagination():
+            return super().paginate_queryset(queryset, page_size)
+        paginator = KeysetPaginator(queryset, page_size)
+        try:
+            page = paginator.page(
+                after=self.request.GET.get('after'),
+                before=self.request.GET.get('before'),
+            )
+        except InvalidCursor:
+            raise Http404('Некорректный курсор страницы.')
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+
+class CommentPaginatorMixin:
+    comments_per_page = COMMENT_ON_PAGE
+
+    def _comment_paginator(self, post):
+        return KeysetPaginator(
+            post.comment.select_related('author'),
+            self.comments_per_page,
+            key='created_at',
+            descending=False,
+        )
+
+    def paginate_comments(self, post):
+        try:
+            return self._comment_paginator(post).page(
+                after=self.request.GET.get('after')
+            )
+        except InvalidCursor:
+            raise Http404('Некорректный курсор страницы.')
+
+    async def apaginate_comments(self, post):
+        try:
+            return await self._comment_paginator(post).apage(
+                after=self.request.GET.get('after')
+            )
+        except InvalidCursor:
+            raise Http404('Некорректный курсор страницы.')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        page = self.paginate_comments(self.object)
+        context['comments_page'] = page
+        context['comments'] = page.object_list
+        return context
+
+
+class PostCardCacheMixin:
+    """Берёт HTML карточек постов текущей страницы из кэша фрагментов."""
+
+    def render_to_response(self, context, **response_kwargs):
+        render_post_cards(context['page_obj'])
+        return super().render_to_response(context, **response_kwargs)
+
+
+class ConditionalGetMixin:
+    """Отвечает 304 Not Modified, не рендеря шаблон, если страница не менялась.
+
+    ETag считается по данным, уже загруженным для контекста. Last-Modified
+    не отдаётся: страница зависит от зрителя, а правки категорий, мест,
+    авторов и пост, выпавший из ленты, не оставляют отметки времени
+    на показанных объектах.
+    """
+
+    def get_etag_parts(self, context):
+        """Возвращает данные страницы, от которых зависит ETag."""
+        raise NotImplementedError
+
+    def render_to_response(self, context, **response_kwargs):
+        etag = quote_etag(hashlib.md5(repr((
+            self.request.user.pk, self.request.GET.urlencode(),
+            *self.get_etag_parts(context),
+        )).encode()).hexdigest())
+
+        response = get_conditional_response(self.request, etag=etag)
+        if response is None:
+            response = super().render_to_response(context, **response_kwargs)
+        response.headers['ETag'] = etag
+        patch_vary_headers(response, ('Cookie',))
+        return response
+
+
+class FeedConditionalGetMixin(ConditionalGetMixin):
+    def get_etag_extra(self, context):
+        """Данные страницы помимо карточек постов."""
+        return ()
+
+    def get_etag_parts(self, context):
+        page = context['page_obj']
+        return (
+            page.has_next(),
+            page.has_previous(),
+            getattr(page.paginator, 'num_pages', None),
+            *self.get_etag_extra(context),
+            *(post_card_version(post) for post in page),
+        )
+
+
+def cached_page_response(request, cached):
+    """Ответ из закэшированной страницы или 304, если она не менялась."""
+    content, headers = cached
+    return get_conditional_response(
+        request,
+        etag=headers.get('ETag'),
+        response=HttpResponse(content, headers=headers),
+    )
+
+
+def cache_page_after_render(response, key):
+    """Сохраняет страницу в кэш, когда шаблон ответа будет отрендерен."""
+    if not hasattr(response, 'add_post_render_callback'):
+        return response
+
+    def store(response):
+        if response.status_code == 200:
+            headers = {
+                header: response.headers[header]
+                for header in ('ETag', 'Vary')
+                if header in response.headers
+            }
+            cache.set(
+                key, (response.content, headers), page_cache_timeout()
+            )
+
+    response.add_post_render_callback(store)
+    return response
+
+
+class AnonymousPageCacheMixin:
+    """Кэширует готовый HTML страницы для анонимных пользователей.
+
+    Страницы сбрасываются сигналами из blog/signals.py.
+    """
+
+    def get_page_cache_scope(self):
+        raise NotImplementedError
+
+    def get(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return super().get(request, *args, **kwargs)
+
+        key = page_cache_key(
+            self.get_page_cache_scope(), request.GET.urlencode()
+        )
+        cached = cache.get(key)
+        record_cache('page', hits=cached is not None, misses=cached is None)
+        if cached is not None:
+            return cached_page_response(request, cached)
+        return cache_page_after_render(
+            super().get(request, *args, **kwargs), key
+        )
+
+
+class PostFeedMixin(
+    AnonymousPageCacheMixin, FeedConditionalGetMixin, PostCardCacheMixin,
+    PaginatorMixin
+):
+    """Общее поведение лент постов: кэш, условные запросы, пагинация."""
+
+
+class AsyncViewMixin:
+    """Асинхронная обработка запроса поверх синхронного представления.
+
+    Подкласс загружает из базы всё нужное странице в async-методах
+    (aget, acount, aiterator), а синхронный код представления затем
+    собирает контекст без обращений к базе. Шаблон Django рендерит
+    сам, в отдельном потоке.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        # Ленивый request.user обратился бы к базе синхронно
+        request.user = await request.auser()
+        response = super().dispatch(request, *args, **kwargs)
+        if inspect.isawaitable(response):
+            response = await response
+        return response
+
+
+class AsyncPostFeedMixin(AsyncViewMixin):
+    """Асинхронная версия ленты на основе PostFeedMixin."""
+
+    async def prepare(self):
+        """Загружает объекты, нужные get_queryset(), до сборки контекста."""
+
+    async def get(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return await self._get_feed(request, *args, **kwargs)
+
+        key = await apage_cache_key(
+            self.get_page_cache_scope(), request.GET.urlencode()
+        )
+        cached = await cache.aget(key)
+        record_cache('page', hits=cached is not None, misses=cached is None)
+        if cached is not None:
+            return cached_page_response(request, cached)
+        return cache_page_after_render(
+            await self._get_feed(request, *args, **kwargs), key
+        )
+
+    async def _get_feed(self, request, *args, **kwargs):
+        await self.prepare()
+        queryset = self.get_queryset()
+        self._page = await self.apaginate_queryset(
+            queryset, self.get_paginate_by(queryset)
+        )
+        await arender_post_cards(self._page[1])
+        # Дальше - обычный ListView.get() без кэша страниц, который
+        # уже проверен выше: данные загружены, и paginate_queryset()
+        # отдаёт готовую страницу
+        return BaseListView.get(self, request, *args, **kwargs)
+
+    def paginate_queryset(self, queryset, page_size):
+        return self._page
+
+    async def apaginate_queryset(self, queryset, page_size):
+        if self.use_keyset_pagination():
+            paginator = KeysetPaginator(queryset, page_size)
+            try:
+                page = await paginator.apage(
+                    after=self.request.GET.get('after'),
+                    before=self.request.GET.get('before'),
+                )
+            except InvalidCursor:
+                raise Http404('Некорректный курсор страницы.')
+            return paginator, page, page.object_list, page.has_other_pages()
+
+        paginator = self.get_paginator(
+            queryset, page_size,
+            orphans=self.get_paginate_orphans(),
+            allow_empty_first_page=self.get_allow_empty(),
+        )
+        # Paginator.count - cached_property: число строк считается заранее
+        paginator.count = await queryset.acount()
+        page = self._offset_page(paginator)
+        page.object_list = [
+            post async for post in page.object_list.aiterator()
+        ]
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    def _offset_page(self, paginator):
+        """Страница по ?page=, как в MultipleObjectMixin.paginate_queryset."""
+        number = (
+            self.kwargs.get(self.page_kwarg)
+            or self.request.GET.get(self.page_kwarg)
+            or 1
+        )
+        if number == 'last':
+            number = paginator.num_pages
+        try:
+            return paginator.page(int(number))
+        except (ValueError, InvalidPage):
+            raise Http404('Некорректный номер страницы.')
 
 
 class AuthorRequiredMixin(UserPassesTestMixin):
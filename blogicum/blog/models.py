@@ -1,8 +1,9 @@
 from django.contrib.auth import get_user_model
-from django.db.models import Count
 from django.utils import timezone
 from django.db import models
 
+from .storage import post_image_storage
+
 User = get_user_model()
 
 
@@ -12,15 +13,29 @@ class PublishedManager(models.Manager):
             'category', 'author', 'location'
         ).filter(
             is_published=True,
-            pub_date__lte=timezone.now(),
+            published_at__isnull=False,
         )
 
         if category:
             return queryset.filter(category=category)
         return queryset.filter(category__is_published=True)
 
+    def visible_to(self, user):
+        """Опубликованные посты и все посты самого пользователя."""
+        queryset = self.select_related('category', 'author', 'location')
+        published = models.Q(
+            is_published=True,
+            published_at__isnull=False,
+            category__is_published=True,
+        )
+        if user.is_authenticated:
+            return queryset.filter(published | models.Q(author=user))
+        return queryset.filter(published)
+
     def published_with_comments(self):
-        return self.published().annotate(comment_count=Count('comment'))
+        # Количество комментариев хранится в Post.comment_count
+        # и обновляется сигналами, см. blog/signals.py
+        return self.published()
     # Думаю это решение будет правильным, т.к.
     # чтобы использовать два метода подряд:
     # return SomeModel.objects.date_since(filter_date).existed_only()
@@ -72,14 +87,37 @@ class Location(models.Model):
         return self.name
 
 
+class ImageStatus(models.TextChoices):
+    NONE = '', 'Нет фото'
+    PENDING = 'pending', 'Обрабатывается'
+    READY = 'ready', 'Готово'
+    FAILED = 'failed', 'Ошибка обработки'
+
+
 class Post(models.Model):
     title = models.CharField(max_length=256, verbose_name='Заголовок')
     text = models.TextField(verbose_name='Текст')
-    image = models.ImageField('Фото', upload_to='images', blank=True)
+    image = models.ImageField(
+        'Фото', upload_to='images', blank=True, storage=post_image_storage)
+    image_status = models.CharField(
+        'Обработка фото',
+        max_length=16,
+        choices=ImageStatus.choices,
+        default=ImageStatus.NONE,
+        blank=True,
+        editable=False)
     pub_date = models.DateTimeField(
         verbose_name='Дата и время публикации',
         help_text='Если установить дату и время в будущем'
         ' — можно делать отложенные публикации.')
+    # Пост попадает в ленты, когда наступает pub_date: отметку ставит
+    # сигнал при сохранении или команда publish_scheduled. Запросы лент
+    # не зависят от текущего времени, и их результат можно кэшировать
+    published_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='Вышел в ленту')
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -101,16 +139,53 @@ class Post(models.Model):
     created_at = models.DateTimeField(
         auto_now_add=True,
         verbose_name='Добавлено')
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Изменено')
+    comment_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество комментариев')
     objects = PublishedManager()
 
     class Meta:
         verbose_name = 'публикация'
         verbose_name_plural = 'Публикации'
         ordering = ['-pub_date']
+        # Индексы повторяют фильтры и сортировку PublishedManager.published().
+        # is_published вынесен в условие частичного индекса: Django сравнивает
+        # булево поле без "= 1", и SQLite не берёт его как колонку индекса.
+        indexes = [
+            models.Index(
+                fields=['-pub_date'],
+                condition=models.Q(
+                    is_published=True, published_at__isnull=False),
+                name='post_published_idx'),
+            models.Index(
+                fields=['category', '-pub_date'],
+                condition=models.Q(
+                    is_published=True, published_at__isnull=False),
+                name='post_category_published_idx'),
+            # Очередь отложенных публикаций для publish_scheduled
+            models.Index(
+                fields=['pub_date'],
+                condition=models.Q(published_at__isnull=True),
+                name='post_scheduled_idx'),
+            models.Index(
+                fields=['author', 'pub_date'],
+                name='post_author_pub_date_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Имя фото из базы: по нему сигналы замечают замену файла
+        instance._loaded_image = instance.__dict__.get('image')
+        return instance
+
 
 '''    @property
     def comment_count(self):
@@ -129,6 +204,10 @@ class Comment(models.Model):
         auto_now_add=True,
         verbose_name='Дата и время публикации',
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Изменено',
+    )
     author = models.ForeignKey(
         User, on_delete=models.CASCADE,
         verbose_name='Автор',
@@ -139,3 +218,78 @@ class Comment(models.Model):
         verbose_name = 'комментарий'
         verbose_name_plural = 'Комментарии'
         ordering = ('-created_at',)
+        indexes = [
+            models.Index(
+                fields=['post', 'created_at'],
+                name='comment_post_created_at_idx'),
+        ]
+
+
+class ImageJob(models.Model):
+    """Задача обработки загруженного фото для команды process_media."""
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'В очереди'
+        RUNNING = 'running', 'Выполняется'
+        DONE = 'done', 'Выполнена'
+        FAILED = 'failed', 'Ошибка'
+
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='image_jobs',
+        verbose_name='Пост')
+    image = models.CharField('Файл', max_length=255)
+    status = models.CharField(
+        'Статус',
+        max_length=16,
+        choices=Status.choices,
+        default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    run_after = models.DateTimeField('Не раньше', default=timezone.now)
+    locked_at = models.DateTimeField('Взята в работу', null=True, blank=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    release_after = models.DateTimeField(
+        'Исходный файл удаляется после',
+        null=True,
+        blank=True,
+        help_text='Пока не истечёт кэш страниц, задача держит ссылку '
+                  'на исходный файл заменённого фото.')
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Добавлено')
+
+    class Meta:
+        verbose_name = 'обработка фото'
+        verbose_name_plural = 'Обработка фото'
+        ordering = ('run_after', 'id')
+        indexes = [
+            models.Index(
+                fields=['run_after', 'id'],
+                condition=models.Q(status='pending'),
+                name='imagejob_pending_idx'),
+            models.Index(
+                fields=['release_after'],
+                condition=models.Q(release_after__isnull=False),
+                name='imagejob_release_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.image} ({self.get_status_display()})'
+
+
+class ImageBlob(models.Model):
+    """Число постов, ссылающихся на файл фото в хранилище."""
+
+    name = models.CharField('Файл', max_length=255, primary_key=True)
+    refcount = models.PositiveIntegerField('Ссылок', default=0)
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Добавлено')
+
+    class Meta:
+        verbose_name = 'файл фото'
+        verbose_name_plural = 'Файлы фото'
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,214 @@
+import base64
+import binascii
+from datetime import datetime
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(obj, key='pub_date'):
+    raw = f'{getattr(obj, key).isoformat()}|{obj.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        value, pk = raw.rsplit('|', 1)
+        return datetime.fromisoformat(value), int(pk)
+    except (ValueError, binascii.Error, UnicodeError):
+        raise InvalidCursor(cursor)
+
+
+class KeysetPage:
+    """Страница курсорной пагинации.
+
+    Повторяет ту часть интерфейса django.core.paginator.Page,
+    которая нужна шаблону includes/paginator.html.
+    """
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<KeysetPage of {len(self.object_list)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next:
+            return None
+        return encode_cursor(self.object_list[-1], self.paginator.key)
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous:
+            return None
+        return encode_cursor(self.object_list[0], self.paginator.key)
+
+
+class KeysetPaginator:
+    """Курсорная пагинация по паре (key, id).
+
+    По умолчанию идёт по pub_date от новых постов к старым.
+    В отличие от offset-пагинации не делает COUNT(*) и не сканирует
+    пропущенные строки: каждая страница — это один запрос с LIMIT.
+    """
+
+    is_keyset = True
+
+    def __init__(self, queryset, per_page, key='pub_date', descending=True):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.key = key
+        self.descending = descending
+
+    def page(self, after=None, before=None):
+        value, pk, forward = self._position(after, before)
+        rows = list(self._rows(value, pk, forward))
+        return self._make_page(rows, value, forward)
+
+    async def apage(self, after=None, before=None):
+        """page() для асинхронных представлений."""
+        value, pk, forward = self._position(after, before)
+        rows = [
+            row async for row in self._rows(value, pk, forward).aiterator()
+        ]
+        return self._make_page(rows, value, forward)
+
+    def _position(self, after, before):
+        if before:
+            return (*decode_cursor(before), False)
+        if after:
+            return (*decode_cursor(after), True)
+        return None, None, True
+
+    def _seek(self, value, pk, forward):
+        # forward - в направлении основной сортировки
+        prefix = '-' if forward == self.descending else ''
+        queryset = self.queryset.order_by(f'{prefix}{self.key}', f'{prefix}id')
+        if value is None:
+            return queryset
+        lookup = 'lt' if forward == self.descending else 'gt'
+        return queryset.filter(
+            Q(**{f'{self.key}__{lookup}': value})
+            | Q(**{self.key: value, f'id__{lookup}': pk})
+        )
+
+    def _rows(self, value, pk, forward):
+        # Лишняя строка показывает, есть ли страница дальше
+        return self._seek(value, pk, forward)[:self.per_page + 1]
+
+    def _make_page(self, rows, value, forward):
+        if forward:
+            return KeysetPage(
+                rows[:self.per_page], self,
+                has_next=len(rows) > self.per_page,
+                has_previous=value is not None,
+            )
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        rows.reverse()
+        return KeysetPage(
+            rows, self, has_next=bool(rows), has_previous=has_previous
+        )
+
+
+def table_row_estimate(model, using):
+    """Число строк таблицы по статистике планировщика или None.
+
+    На SQLite статистику собирает ANALYZE (или PRAGMA optimize),
+    на PostgreSQL - autovacuum.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            try:
+                cursor.execute(
+                    'SELECT stat FROM sqlite_stat1 WHERE tbl = %s', [table]
+                )
+            except DatabaseError:
+                return None  # ANALYZE ещё ни разу не запускался
+            # Первое число - строк в индексе; у частичных индексов
+            # их меньше, чем в таблице, поэтому берётся максимум
+            return max(
+                (int(stat.split()[0]) for stat, in cursor.fetchall()),
+                default=None,
+            )
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                [table],
+            )
+            row = cursor.fetchone()
+            # -1 - таблица ещё не анализировалась
+            return int(row[0]) if row and row[0] >= 0 else None
+    return None
+
+
+def plan_row_estimate(queryset):
+    """Число строк выборки по плану запроса (только PostgreSQL) или None."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        return int(cursor.fetchone()[0][0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator без точного COUNT(*) по большим таблицам.
+
+    Выборка без фильтров считается по статистике таблицы, если та
+    больше settings.BLOG_ESTIMATED_COUNT_THRESHOLD строк. Выборка
+    с фильтрами сначала считается с LIMIT: небольшая получает точное
+    число, большая - оценку по плану запроса. Без оценки (нет
+    статистики, SQLite с фильтром) число строк считается точно.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return super().count
+        threshold = settings.BLOG_ESTIMATED_COUNT_THRESHOLD
+        if queryset.query.has_filters():
+            capped = queryset.order_by()[:threshold + 1].count()
+            if capped <= threshold:
+                return capped
+            estimate = plan_row_estimate(queryset)
+        else:
+            estimate = table_row_estimate(queryset.model, queryset.db)
+        if estimate is not None and estimate > threshold:
+            return estimate
+        return super().count
@@ -0,0 +1,37 @@
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils import timezone
+
+from .cache import invalidate_pages, scopes_for_posts
+from .models import Post
+
+
+def publish_due_posts(using=DEFAULT_DB_ALIAS):
+    """Выпускает в ленты посты, чья pub_date наступила.
+
+    Отметка ставится условным UPDATE, поэтому пост, выпущенный
+    параллельным процессом, не считается дважды. Кэш страниц
+    сбрасывается после фиксации транзакции. Возвращает число постов.
+    """
+    now = timezone.now()
+    due = Post.objects.using(using).filter(
+        published_at__isnull=True, pub_date__lte=now
+    )
+    pks = list(due.values_list('pk', flat=True))
+    if not pks:
+        return 0
+    with transaction.atomic(using=using):
+        published = due.filter(pk__in=pks).update(published_at=now)
+        scopes = scopes_for_posts(
+            Post.objects.using(using).filter(pk__in=pks)
+        )
+        transaction.on_commit(
+            lambda: invalidate_pages(*scopes), using=using
+        )
+    return published
+
+
+def next_pub_date(using=DEFAULT_DB_ALIAS):
+    """Дата ближайшей отложенной публикации или None."""
+    return Post.objects.using(using).filter(
+        published_at__isnull=True, pub_date__gt=timezone.now()
+    ).order_by('pub_date').values_list('pub_date', flat=True).first()
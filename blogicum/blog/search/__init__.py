@@ -0,0 +1,3 @@
+from .base import SearchBackend, get_backend, search_posts
+
+__all__ = ['SearchBackend', 'get_backend', 'search_posts']
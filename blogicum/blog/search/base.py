@@ -0,0 +1,72 @@
+import re
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+WORD_RE = re.compile(r'\w+')
+
+# Движок по умолчанию, если BLOG_SEARCH_BACKEND не задан
+DEFAULT_BACKENDS = {
+    'sqlite': 'blog.search.fts5.SQLiteFTSBackend',
+}
+FALLBACK_BACKEND = 'blog.search.inverted.InvertedIndexBackend'
+
+_backends = {}
+
+
+class SearchBackend:
+    """Интерфейс поискового движка для постов.
+
+    Представления и админка работают только с ним и не знают,
+    какой индекс стоит за поиском.
+    """
+
+    def __init__(self, using=DEFAULT_DB_ALIAS):
+        self.using = using
+
+    def setup(self):
+        """Готовит хранилище индекса после migrate."""
+
+    def rebuild(self):
+        """Строит индекс заново по всем постам."""
+        raise NotImplementedError
+
+    def index_post(self, post):
+        raise NotImplementedError
+
+    def remove_post(self, post):
+        raise NotImplementedError
+
+    def filter(self, queryset, text):
+        """Queryset постов, подходящих под запрос, без сортировки."""
+        raise NotImplementedError
+
+    def search(self, queryset, text):
+        """Подходящие посты от самых релевантных.
+
+        Возвращает queryset или последовательность постов,
+        которую можно передать в Paginator.
+        """
+        raise NotImplementedError
+
+
+def get_backend(using=DEFAULT_DB_ALIAS):
+    if using not in _backends:
+        path = getattr(settings, 'BLOG_SEARCH_BACKEND', None) or (
+            DEFAULT_BACKENDS.get(connections[using].vendor, FALLBACK_BACKEND)
+        )
+        _backends[using] = import_string(path)(using)
+    return _backends[using]
+
+
+@receiver(setting_changed)
+def reset_backends(setting, **kwargs):
+    if setting.startswith('BLOG_SEARCH_') or setting == 'DATABASES':
+        _backends.clear()
+
+
+def search_posts(queryset, text):
+    return get_backend(queryset.db).search(queryset, text)
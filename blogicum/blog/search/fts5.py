@@ -0,0 +1,76 @@
+from django.db import connections
+from django.db.models.expressions import RawSQL
+
+from .base import WORD_RE, SearchBackend
+
+FTS_TABLE = 'blog_post_fts'
+
+
+def fts_query(text):
+    """Превращает ввод пользователя в запрос FTS5: все слова, по префиксу.
+
+    Кавычки не дают спецсимволам FTS5 (AND, NEAR, * и т.п.) из ввода
+    попасть в синтаксис запроса.
+    """
+    return ' '.join(f'"{word}"*' for word in WORD_RE.findall(text))
+
+
+class SQLiteFTSBackend(SearchBackend):
+    """Поиск по виртуальной таблице FTS5 с ранжированием bm25."""
+
+    def setup(self):
+        """Создаёт таблицу FTS5 и заполняет её, если её ещё не было."""
+        connection = connections[self.using]
+        with connection.cursor() as cursor:
+            if FTS_TABLE in connection.introspection.table_names(cursor):
+                return
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5('
+                'title, text, tokenize="unicode61 remove_diacritics 2")'
+            )
+        self.rebuild()
+
+    def rebuild(self):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, text) '
+                'SELECT id, title, text FROM blog_post'
+            )
+
+    def index_post(self, post):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk]
+            )
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, text) '
+                'VALUES (%s, %s, %s)',
+                [post.pk, post.title, post.text],
+            )
+
+    def remove_post(self, post):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk]
+            )
+
+    def filter(self, queryset, text):
+        if not fts_query(text):
+            return queryset.none()
+        return queryset.filter(id__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            [fts_query(text)],
+        ))
+
+    def search(self, queryset, text):
+        # Заголовок весит больше текста
+        rank = RawSQL(
+            f'SELECT bm25({FTS_TABLE}, 10.0, 1.0) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s '
+            f'AND {FTS_TABLE}.rowid = blog_post.id',
+            [fts_query(text)],
+        )
+        return self.filter(queryset, text).annotate(
+            search_rank=rank
+        ).order_by('search_rank', '-pub_date')
@@ -0,0 +1,375 @@
+import fcntl
+import json
+import math
+import mmap
+import os
+import struct
+import threading
+from array import array
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from functools import lru_cache
+
+import snowballstemmer
+from django.conf import settings
+from django.db import transaction
+
+from .base import WORD_RE, SearchBackend
+
+# Формат файла индекса (все числа little-endian):
+#   заголовок: magic, версия, число термов, число документов;
+#   таблица термов, отсортированная по байтам терма: смещение и длина
+#   терма, смещение и длина списка постингов;
+#   постинги: id постов (int64, по возрастанию), затем веса (uint16),
+#   каждый список выровнен на 8 байт;
+#   строки термов в UTF-8.
+MAGIC = b'BLIX'
+VERSION = 1
+HEADER = struct.Struct('<4sIII')
+ENTRY = struct.Struct('<QIQI')
+
+# Как у FTS5: слово в заголовке весит как десять в тексте
+TITLE_WEIGHT = 10
+MAX_WEIGHT = 0xFFFF
+
+_stemmer = snowballstemmer.stemmer('russian')
+
+
+@lru_cache(maxsize=100_000)
+def stem(word):
+    return _stemmer.stemWord(word)
+
+
+def tokenize(text):
+    return [stem(word) for word in WORD_RE.findall(text.lower())]
+
+
+def post_weights(title, text):
+    """Вес терма в посте: вхождения в заголовок считаются весомее."""
+    weights = Counter(tokenize(text))
+    for term in tokenize(title):
+        weights[term] += TITLE_WEIGHT
+    return weights
+
+
+def write_index(path, documents):
+    """Записывает индекс по (id, title, text), отсортированным по id."""
+    postings = defaultdict(lambda: (array('q'), array('H')))
+    n_docs = 0
+    for pk, title, text in documents:
+        n_docs += 1
+        for term, weight in post_weights(title, text).items():
+            ids, weights = postings[term]
+            ids.append(pk)
+            weights.append(min(weight, MAX_WEIGHT))
+
+    terms = sorted(postings, key=str.encode)
+    postings_start = HEADER.size + ENTRY.size * len(terms)
+    entries, blobs, term_blobs = [], [], []
+    offset = postings_start
+    term_offset = 0
+    for term in terms:
+        ids, weights = postings[term]
+        blob = ids.tobytes() + weights.tobytes()
+        blob += b'\0' * (-len(blob) % 8)
+        encoded = term.encode()
+        entries.append((term_offset, len(encoded), offset, len(ids)))
+        blobs.append(blob)
+        term_blobs.append(encoded)
+        offset += len(blob)
+        term_offset += len(encoded)
+
+    temporary = f'{path}.tmp'
+    with open(temporary, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(terms), n_docs))
+        for term_start, term_len, postings_offset, count in entries:
+            f.write(ENTRY.pack(
+                offset + term_start, term_len, postings_offset, count
+            ))
+        f.writelines(blobs)
+        f.writelines(term_blobs)
+    os.replace(temporary, path)
+
+
+class InvertedIndex:
+    """Индекс, отображённый в память (mmap) только для чтения."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            self.version = (stat.st_ino, stat.st_mtime_ns)
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.n_terms, self.n_docs = HEADER.unpack_from(
+            self._mmap
+        )
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{path} - не файл индекса поиска.')
+        self._view = memoryview(self._mmap)
+
+    def _entry(self, index):
+        return ENTRY.unpack_from(self._mmap, HEADER.size + ENTRY.size * index)
+
+    def _term(self, index):
+        term_offset, term_len, _, _ = self._entry(index)
+        return self._mmap[term_offset:term_offset + term_len]
+
+    def postings(self, term):
+        """Возвращает (ids, weights) терма без копирования данных."""
+        encoded = term.encode()
+        index = bisect_left(range(self.n_terms), encoded, key=self._term)
+        if index == self.n_terms or self._term(index) != encoded:
+            return (), ()
+        _, _, offset, count = self._entry(index)
+        ids_end = offset + 8 * count
+        return (
+            self._view[offset:ids_end].cast('q'),
+            self._view[ids_end:ids_end + 2 * count].cast('H'),
+        )
+
+
+class DeltaLog:
+    """Журнал изменений постов после построения файла индекса.
+
+    Файл path + '.delta' общий для всех процессов: строка JSON
+    [id, {терм: вес}] для добавленного или изменённого поста и [id, null]
+    для удалённого. Строки дописываются под flock целиком, читатели
+    подбирают новые строки по смещению. rebuild_search_index переносит
+    в новый журнал только строки, дописанные во время перестройки.
+    """
+
+    def __init__(self, path):
+        self.path = f'{path}.delta'
+
+    @contextmanager
+    def _locked(self):
+        # Журнал могли подменить, пока мы ждали блокировку: тогда
+        # писать надо уже в новый файл
+        while True:
+            f = open(self.path, 'ab')
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                current = os.stat(self.path).st_ino
+            except FileNotFoundError:
+                current = None
+            if current == os.fstat(f.fileno()).st_ino:
+                break
+            f.close()
+        try:
+            yield f
+        finally:
+            f.close()
+
+    def append(self, pk, weights):
+        line = json.dumps([pk, weights], ensure_ascii=False) + '\n'
+        with self._locked() as f:
+            f.write(line.encode())
+
+    def size(self):
+        try:
+            return os.stat(self.path).st_size
+        except FileNotFoundError:
+            return 0
+
+    def truncate_before(self, offset):
+        """Оставляет в журнале только строки начиная с offset."""
+        with self._locked():
+            with open(self.path, 'rb') as old:
+                old.seek(offset)
+                tail = old.read()
+            temporary = f'{self.path}.tmp'
+            with open(temporary, 'wb') as new:
+                new.write(tail)
+            os.replace(temporary, self.path)
+
+    def open(self):
+        try:
+            return open(self.path, 'rb')
+        except FileNotFoundError:
+            return None
+
+
+class InvertedIndexBackend(SearchBackend):
+    """Собственный инвертированный индекс в файле BLOG_SEARCH_INDEX_PATH.
+
+    Подходит для баз без встроенного полнотекстового поиска.
+    Изменения постов после фиксации транзакции дописываются в общий
+    журнал (DeltaLog), и каждый процесс накладывает их поверх файла.
+    Команда rebuild_search_index перестраивает файл и сокращает журнал.
+    """
+
+    def __init__(self, using):
+        super().__init__(using)
+        self.path = str(settings.BLOG_SEARCH_INDEX_PATH)
+        self.max_results = getattr(settings, 'BLOG_SEARCH_MAX_RESULTS', 1000)
+        self.delta = DeltaLog(self.path)
+        # Экземпляр на процесс делят потоки: состояние обновляется
+        # под блокировкой, иначе два потока прочитают журнал с одного
+        # смещения и оба сдвинут его
+        self._lock = threading.Lock()
+        self._index = None
+        self._delta_inode = None
+        self._reset_delta()
+
+    def _reset_delta(self):
+        # Посты, изменённые после построения файла: их постинги в файле
+        # устарели, актуальные веса лежат в _added. Множество и словарь
+        # не меняются на месте, а заменяются, поэтому поиск читает их
+        # без блокировки
+        self._stale = frozenset()
+        self._added = {}
+        self._delta_offset = 0
+
+    def _get_index(self):
+        """Индекс, устаревшие посты и веса из журнала на текущий момент."""
+        with self._lock:
+            self._refresh()
+            return self._index, self._stale, self._added
+
+    def _refresh(self):
+        # Журнал открывается раньше, чем проверяется файл индекса:
+        # rebuild подменяет индекс до журнала, поэтому к новому журналу
+        # всегда прилагается новый индекс
+        delta = self.delta.open()
+        try:
+            inode = delta and os.fstat(delta.fileno()).st_ino
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                stat = None
+            # os.replace подменяет файл целиком, поэтому меняется и inode
+            version = stat and (stat.st_ino, stat.st_mtime_ns)
+            index_changed = version != (self._index and self._index.version)
+            if index_changed:
+                # Старый mmap закроется сборщиком мусора, когда на его
+                # постинги не останется ссылок
+                self._index = version and InvertedIndex(self.path)
+            if index_changed or inode != self._delta_inode:
+                self._reset_delta()
+                self._delta_inode = inode
+            if delta is not None:
+                self._read_delta(delta)
+        finally:
+            if delta is not None:
+                delta.close()
+
+    def _read_delta(self, delta):
+        delta.seek(self._delta_offset)
+        lines = []
+        for line in delta:
+            if not line.endswith(b'\n'):
+                # Строку ещё дописывают - прочитаем её в следующий раз
+                break
+            lines.append(line)
+        if not lines:
+            return
+        stale, added = set(self._stale), dict(self._added)
+        for line in lines:
+            pk, weights = json.loads(line)
+            stale.add(pk)
+            if weights is None:
+                added.pop(pk, None)
+            else:
+                added[pk] = weights
+        self._stale, self._added = frozenset(stale), added
+        self._delta_offset += sum(map(len, lines))
+
+    def setup(self):
+        if not os.path.exists(self.path):
+            self.rebuild()
+
+    def rebuild(self):
+        from blog.models import Post
+
+        # Строки журнала до этого места уже зафиксированы в базе
+        # и попадут в новый файл; остальные допишутся во время чтения
+        start = self.delta.size()
+        write_index(self.path, Post.objects.using(self.using).order_by(
+            'id'
+        ).values_list('id', 'title', 'text').iterator(chunk_size=2000))
+        self.delta.truncate_before(start)
+        self._get_index()
+
+    def index_post(self, post):
+        pk, weights = post.pk, post_weights(post.title, post.text)
+        transaction.on_commit(
+            lambda: self.delta.append(pk, weights), using=self.using
+        )
+
+    def remove_post(self, post):
+        pk = post.pk
+        transaction.on_commit(
+            lambda: self.delta.append(pk, None), using=self.using
+        )
+
+    def _term_scores(self, index, stale, added, term):
+        scores = {}
+        if index is not None:
+            ids, weights = index.postings(term)
+            for pk, weight in zip(ids, weights):
+                if pk not in stale:
+                    scores[pk] = weight
+        for pk, weights in added.items():
+            if term in weights:
+                scores[pk] = weights[term]
+        return scores
+
+    def ranked_ids(self, text):
+        """Id постов со всеми словами запроса, от самых релевантных."""
+        terms = set(tokenize(text))
+        if not terms:
+            return []
+        index, stale, added = self._get_index()
+        n_docs = (index.n_docs if index else 0) + len(added)
+        totals = None
+        # Начинаем с самого редкого терма, чтобы пересечение было меньше
+        for term_scores in sorted(
+            (self._term_scores(index, stale, added, term) for term in terms),
+            key=len,
+        ):
+            idf = math.log(1 + n_docs / max(len(term_scores), 1))
+            if totals is None:
+                totals = {pk: w * idf for pk, w in term_scores.items()}
+            else:
+                totals = {
+                    pk: score + term_scores[pk] * idf
+                    for pk, score in totals.items() if pk in term_scores
+                }
+            if not totals:
+                return []
+        return sorted(totals, key=totals.__getitem__, reverse=True)
+
+    def filter(self, queryset, text):
+        ranked = self.ranked_ids(text)[:self.max_results]
+        return queryset.filter(id__in=ranked)
+
+    def search(self, queryset, text):
+        ranked = self.ranked_ids(text)[:self.max_results]
+        visible = set(
+            queryset.filter(id__in=ranked).values_list('id', flat=True)
+        )
+        return RankedPosts(
+            queryset, [pk for pk in ranked if pk in visible]
+        )
+
+
+class RankedPosts:
+    """Ленивая последовательность постов в порядке релевантности.
+
+    Paginator запрашивает срез, и из базы загружается только он.
+    """
+
+    def __init__(self, queryset, ids):
+        self.queryset = queryset
+        self.ids = ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            ids = self.ids[index]
+            posts = self.queryset.in_bulk(ids)
+            return [posts[pk] for pk in ids if pk in posts]
+        return self.queryset.get(pk=self.ids[index])
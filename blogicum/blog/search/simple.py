@@ -0,0 +1,27 @@
+from django.db.models import Q
+
+from .base import SearchBackend
+
+
+class IContainsBackend(SearchBackend):
+    """Поиск через LIKE/ILIKE без индекса. Подходит для маленьких баз."""
+
+    def rebuild(self):
+        pass
+
+    def index_post(self, post):
+        pass
+
+    def remove_post(self, post):
+        pass
+
+    def filter(self, queryset, text):
+        text = text.strip()
+        if not text:
+            return queryset.none()
+        return queryset.filter(
+            Q(title__icontains=text) | Q(text__icontains=text)
+        )
+
+    def search(self, queryset, text):
+        return self.filter(queryset, text).order_by('-pub_date')
@@ -0,0 +1,219 @@
+from django.db.models import F, QuerySet
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.contrib.auth import get_user_model
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache import (
+    category_scope, index_scope, invalidate_pages, profile_scope,
+    scopes_for_posts,
+)
+from .jobs import enqueue_image
+from .metrics import COMMENTS_CREATED
+from .models import (
+    Category, Comment, ImageJob, ImageStatus, Location, Post
+)
+from .search import get_backend
+from .storage import acquire_image, release_image
+
+User = get_user_model()
+
+PAGE_CACHE_MODELS = (Post, Comment, Category, Location)
+# Поля пользователя, которые видны в лентах и на странице профиля
+USER_PAGE_FIELDS = ('username', 'first_name', 'last_name', 'is_staff')
+
+
+def _deleted_with_post(origin):
+    if isinstance(origin, QuerySet):
+        return origin.model is Post
+    return isinstance(origin, Post)
+
+
+@receiver(pre_save, sender=Post)
+@receiver(pre_save, sender=Comment)
+def fill_missing_updated_at(sender, instance, raw, **kwargs):
+    # В старых фикстурах (db.json) нет updated_at, а loaddata
+    # сохраняет объекты как есть, без auto_now
+    if raw and instance.updated_at is None:
+        instance.updated_at = instance.created_at or timezone.now()
+
+
+@receiver(pre_save, sender=Post)
+def mark_published(sender, instance, **kwargs):
+    # Пост с наступившей pub_date сразу виден в лентах; пост с датой
+    # в будущем ждёт команду publish_scheduled
+    now = timezone.now()
+    if instance.pub_date is not None and instance.pub_date <= now:
+        instance.published_at = instance.published_at or now
+    else:
+        instance.published_at = None
+
+
+@receiver(post_save, sender=Comment)
+def increment_comment_count(sender, instance, created, raw, **kwargs):
+    # При loaddata (raw) счётчик приходит из фикстуры
+    # или пересчитывается командой recount_comments
+    if created and not raw:
+        Post.objects.filter(pk=instance.post_id).update(
+            comment_count=F('comment_count') + 1
+        )
+        COMMENTS_CREATED.inc()
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_comment_count(sender, instance, origin=None, **kwargs):
+    if _deleted_with_post(origin):
+        return
+    Post.objects.filter(pk=instance.post_id, comment_count__gt=0).update(
+        comment_count=F('comment_count') - 1
+    )
+
+
+def setup_search_index(sender, using, **kwargs):
+    # Подключается к post_migrate в BlogConfig.ready()
+    get_backend(using).setup()
+
+
+@receiver(post_save, sender=Post)
+def update_search_index(sender, instance, using, **kwargs):
+    get_backend(using).index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def remove_from_search_index(sender, instance, using, **kwargs):
+    get_backend(using).remove_post(instance)
+
+
+@receiver(pre_save, sender=Post)
+def mark_image_upload(sender, instance, raw, **kwargs):
+    if raw:
+        return
+    if not instance.image:
+        instance.image_status = ImageStatus.NONE
+    elif not instance.image._committed:
+        # Новый файл: обработкой займётся process_media
+        instance.image_status = ImageStatus.PENDING
+        instance._image_uploaded = True
+        # Содержимое понадобится, если файл с тем же хэшем удалят
+        # раньше, чем count_image_references учтёт ссылку
+        instance._image_content = instance.image.file
+
+
+@receiver(post_save, sender=Post)
+def enqueue_image_processing(sender, instance, raw, **kwargs):
+    if not raw and getattr(instance, '_image_uploaded', False):
+        instance._image_uploaded = False
+        enqueue_image(instance)
+
+
+@receiver(post_save, sender=Post)
+def count_image_references(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    old = '' if created else getattr(instance, '_loaded_image', None)
+    if old is None:
+        # Пост загружен без поля image: прежнее имя неизвестно
+        return
+    new = instance.image.name or ''
+    content = getattr(instance, '_image_content', None)
+    instance._image_content = None
+    if new != old:
+        if new:
+            acquire_image(new, content)
+        if old:
+            release_image(old)
+    instance._loaded_image = new
+
+
+@receiver(post_delete, sender=Post)
+def release_post_image(sender, instance, **kwargs):
+    if instance.image:
+        release_image(instance.image.name)
+
+
+@receiver(post_delete, sender=ImageJob)
+def release_held_image(sender, instance, **kwargs):
+    # Задачу удалили вместе с постом, пока она держала исходный файл
+    if instance.release_after is not None:
+        release_image(instance.image)
+
+
+def _affected_page_scopes(instance):
+    if isinstance(instance, Post):
+        return scopes_for_posts(Post.objects.filter(pk=instance.pk))
+    if isinstance(instance, Comment):
+        return scopes_for_posts(Post.objects.filter(pk=instance.post_id))
+    if isinstance(instance, Category):
+        scopes = scopes_for_posts(Post.objects.filter(category=instance.pk))
+        scopes.update(
+            category_scope(slug) for slug in Category.objects.filter(
+                pk=instance.pk
+            ).values_list('slug', flat=True)
+        )
+        return scopes
+    return scopes_for_posts(Post.objects.filter(location=instance.pk))
+
+
+def remember_page_scopes(sender, instance, raw=False, **kwargs):
+    # Запоминаем страницы, где объект виден до изменения:
+    # после сохранения пост может оказаться в другой категории,
+    # а после удаления связи с ним уже не найти
+    if raw or instance.pk is None or sender is Comment:
+        return
+    instance._page_cache_scopes = _affected_page_scopes(instance)
+
+
+def invalidate_page_cache(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    if sender is Comment and _deleted_with_post(kwargs.get('origin')):
+        return
+    scopes = getattr(instance, '_page_cache_scopes', set())
+    if 'created' in kwargs:
+        scopes = scopes | _affected_page_scopes(instance)
+    elif sender is Comment:
+        scopes = _affected_page_scopes(instance)
+    invalidate_pages(*scopes)
+    instance._page_cache_scopes = set()
+
+
+for model in PAGE_CACHE_MODELS:
+    pre_save.connect(remember_page_scopes, sender=model)
+    pre_delete.connect(remember_page_scopes, sender=model)
+    post_save.connect(invalidate_page_cache, sender=model)
+    post_delete.connect(invalidate_page_cache, sender=model)
+
+
+@receiver(pre_save, sender=User)
+def remember_user_page_scopes(sender, instance, raw, update_fields=None,
+                              **kwargs):
+    # Вход на сайт сохраняет только last_login - ленты не меняются
+    instance._page_cache_scopes = set()
+    if raw or instance.pk is None or (
+        update_fields is not None
+        and not set(update_fields) & set(USER_PAGE_FIELDS)
+    ):
+        return
+    old = User.objects.filter(pk=instance.pk).values(*USER_PAGE_FIELDS)
+    old = old.first()
+    if old is None or all(
+        old[field] == getattr(instance, field) for field in USER_PAGE_FIELDS
+    ):
+        return
+    scopes = scopes_for_posts(Post.objects.filter(author=instance.pk))
+    scopes.update((
+        index_scope(),
+        profile_scope(old['username']),
+        profile_scope(instance.username),
+    ))
+    instance._page_cache_scopes = scopes
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_pages(sender, instance, raw, **kwargs):
+    if raw:
+        return
+    invalidate_pages(*getattr(instance, '_page_cache_scopes', ()))
+    instance._page_cache_scopes = set()
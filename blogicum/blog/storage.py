@@ -0,0 +1,160 @@
+import hashlib
+import os
+import posixpath
+import tempfile
+
+from django.core.files.storage import FileSystemStorage, storages
+from django.db import transaction
+from django.db.models import F
+
+POST_IMAGES_STORAGE = 'post_images'
+
+
+def post_image_storage():
+    """Хранилище Post.image; задаётся в STORAGES['post_images']."""
+    return storages[POST_IMAGES_STORAGE]
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранит каждый уникальный файл один раз под именем из его SHA-256.
+
+    Имя, предложенное при загрузке, влияет только на расширение:
+    photo.JPG превращается в images/3f/a2/3fa2....jpg. Повторная
+    загрузка того же файла возвращает уже сохранённое имя. Ссылки
+    на файлы считает модель ImageBlob.
+    """
+
+    def __init__(self, directory='images', **kwargs):
+        super().__init__(**kwargs)
+        self.directory = directory
+
+    def get_available_name(self, name, max_length=None):
+        # Итоговое имя определяет содержимое файла, см. _save()
+        return name
+
+    def hashed_name(self, digest, extension):
+        return posixpath.join(
+            self.directory, digest[:2], digest[2:4], digest + extension
+        )
+
+    def _save(self, name, content):
+        os.makedirs(self.location, exist_ok=True)
+        # Хэш считается на лету, пока файл пишется во временный:
+        # загрузка читается один раз и не держится в памяти целиком
+        digest = hashlib.sha256()
+        fd, temporary = tempfile.mkstemp(prefix='.upload-', dir=self.location)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in content.chunks():
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    digest.update(chunk)
+                    f.write(chunk)
+            extension = posixpath.splitext(name)[1].lower()
+            name = self.hashed_name(digest.hexdigest(), extension)
+            full_path = self.path(name)
+            if os.path.exists(full_path):
+                return name
+            if self.file_permissions_mode is not None:
+                os.chmod(temporary, self.file_permissions_mode)
+            while True:
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                try:
+                    # Содержимое совпадает по определению, поэтому
+                    # одновременная загрузка того же файла может спокойно
+                    # его перезаписать
+                    os.replace(temporary, full_path)
+                    return name
+                except FileNotFoundError:
+                    # Каталог удалили вместе с последним файлом в нём
+                    continue
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+    def delete(self, name):
+        super().delete(name)
+        remove_empty_parents(self, name, self.directory)
+
+
+def remove_empty_parents(storage, name, top):
+    """Удаляет опустевшие каталоги над name вплоть до top (не включая)."""
+    directory = posixpath.dirname(name)
+    while directory and directory != top:
+        try:
+            os.rmdir(storage.path(directory))
+        except OSError:
+            # Каталог не пуст или его уже удалили
+            return
+        directory = posixpath.dirname(directory)
+
+
+def _lock_blob(name):
+    """Блокирует строку ImageBlob до конца транзакции.
+
+    UPDATE без изменений вместо select_for_update(): SQLite игнорирует
+    FOR UPDATE, а запись берёт блокировку базы. Возвращает False,
+    если строки нет.
+    """
+    from .models import ImageBlob
+
+    return bool(
+        ImageBlob.objects.filter(name=name).update(refcount=F('refcount'))
+    )
+
+
+def acquire_image(name, content=None):
+    """Учитывает ещё одну ссылку на файл фото.
+
+    content - загруженный файл. Если файл с тем же содержимым удалили,
+    пока загрузка получала его имя, он сохраняется заново.
+    """
+    from .models import ImageBlob
+
+    with transaction.atomic():
+        # UPDATE ждёт delete_image_file(), если тот уже держит строку
+        if not ImageBlob.objects.filter(name=name).update(
+            refcount=F('refcount') + 1
+        ):
+            blob, created = ImageBlob.objects.get_or_create(
+                name=name, defaults={'refcount': 1}
+            )
+            if not created:
+                ImageBlob.objects.filter(pk=blob.pk).update(
+                    refcount=F('refcount') + 1
+                )
+        storage = post_image_storage()
+        if content is not None and not storage.exists(name):
+            storage.save(name, content)
+
+
+def release_image(name):
+    """Снимает ссылку на файл и удаляет его, если ссылок не осталось.
+
+    Файлы без записи ImageBlob (загруженные до появления подсчёта
+    ссылок) не удаляются, пока recount_images их не учтёт.
+    """
+    from .models import ImageBlob
+
+    released = ImageBlob.objects.filter(name=name, refcount__gt=0).update(
+        refcount=F('refcount') - 1
+    )
+    # Строка с нулём ссылок остаётся до удаления файла: её блокировка
+    # не даёт acquire_image() и delete_image_file() разминуться
+    if released and ImageBlob.objects.filter(name=name, refcount=0).exists():
+        transaction.on_commit(lambda: delete_image_file(name))
+
+
+def delete_image_file(name):
+    from .images import delete_variants
+    from .models import ImageBlob
+
+    with transaction.atomic():
+        # Файл могли загрузить заново, пока удалялась последняя ссылка
+        if _lock_blob(name) and ImageBlob.objects.filter(
+            name=name, refcount__gt=0
+        ).exists():
+            return
+        post_image_storage().delete(name)
+        delete_variants(name)
+        ImageBlob.objects.filter(name=name).delete()
@@ -0,0 +1,16 @@
+from django import template
+
+from blog.images import srcset as build_srcset
+
+register = template.Library()
+
+
+@register.filter
+def srcset(image, extension):
+    """Значение srcset из уменьшенных копий изображения в формате extension.
+
+    Копии, которых ещё нет, создаёт ImageVariantView при первом запросе.
+    """
+    if not image:
+        return ''
+    return build_srcset(image.name, extension)
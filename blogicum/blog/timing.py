@@ -0,0 +1,119 @@
+from contextvars import ContextVar
+from time import perf_counter
+
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from .metrics import CACHE_REQUESTS
+
+_current = ContextVar('request_timing', default=None)
+
+
+class RequestTiming:
+    """Замеры одного запроса: SQL, рендеринг шаблона и обращения к кэшу.
+
+    Запросы к базе считает execute_wrapper() ниже, в том числе запросы
+    из сигналов и из потоков, где async-представления обращаются к ORM.
+    """
+
+    __slots__ = (
+        'started', 'total', 'db_queries', 'db_time', 'template_time',
+        'cache_hits', 'cache_misses', '_template_started',
+    )
+
+    def __init__(self):
+        self.started = perf_counter()
+        self.total = 0.0
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.template_time = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._template_started = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += perf_counter() - start
+            self.db_queries += 1
+
+    def template_started(self):
+        self._template_started = perf_counter()
+
+    def template_finished(self, response):
+        if self._template_started is not None:
+            self.template_time = perf_counter() - self._template_started
+
+    def finish(self):
+        self.total = perf_counter() - self.started
+
+    def server_timing(self):
+        """Значение заголовка Server-Timing, длительности в миллисекундах."""
+        metrics = [
+            f'total;dur={self.total * 1000:.1f}',
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.db_queries} SQL"',
+        ]
+        if self.template_time is not None:
+            metrics.append(f'tpl;dur={self.template_time * 1000:.1f}')
+        if self.cache_hits or self.cache_misses:
+            metrics.append(
+                f'cache;desc="hit {self.cache_hits}, '
+                f'miss {self.cache_misses}"'
+            )
+        return ', '.join(metrics)
+
+    def as_dict(self):
+        return {
+            'total_ms': round(self.total * 1000, 2),
+            'db_queries': self.db_queries,
+            'db_ms': round(self.db_time * 1000, 2),
+            'template_ms': (
+                None if self.template_time is None
+                else round(self.template_time * 1000, 2)
+            ),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+        }
+
+
+def activate(timing):
+    return _current.set(timing)
+
+
+def deactivate(token):
+    _current.reset(token)
+
+
+def current_timing():
+    return _current.get()
+
+
+def execute_wrapper(execute, sql, params, many, context):
+    timing = _current.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    return timing(execute, sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_execute_wrapper(connection, **kwargs):
+    # Обёртка стоит на соединении постоянно и находит замеры текущего
+    # запроса через contextvar. Async-представления выполняют SQL
+    # в потоке со своим соединением, но sync_to_async копирует туда
+    # контекст, поэтому их запросы тоже учитываются.
+    if execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(execute_wrapper)
+
+
+def record_cache(name, hits=0, misses=0):
+    """Учитывает обращения к кэшу name в метриках и замерах запроса."""
+    if hits:
+        CACHE_REQUESTS.inc(hits, cache=name, result='hit')
+    if misses:
+        CACHE_REQUESTS.inc(misses, cache=name, result='miss')
+    timing = _current.get()
+    if timing is not None:
+        timing.cache_hits += hits
+        timing.cache_misses += misses
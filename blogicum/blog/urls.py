@@ -3,20 +3,37 @@ from django.conf.urls.static import static
 from django.conf import settings
 
 from . import views
+from .images import VARIANTS_DIR
 
 app_name = 'blog'
 
+# Под ASGI ленты и страница поста обслуживаются асинхронными версиями
+if getattr(settings, 'BLOG_ASYNC_VIEWS', False):
+    PostListView = views.AsyncPostListView
+    PostDetailView = views.AsyncPostDetailView
+    CategoryListView = views.AsyncCategoryListView
+    ProfileView = views.AsyncProfileView
+else:
+    PostListView = views.PostListView
+    PostDetailView = views.PostDetailView
+    CategoryListView = views.CategoryListView
+    ProfileView = views.ProfileView
+
 urlpatterns = [
     path('',
-         views.PostListView.as_view(),
+         PostListView.as_view(),
          name='index'
          ),
+    path('search/',
+         views.PostSearchView.as_view(),
+         name='search'
+         ),
     path('posts/create/',
          views.PostCreateView.as_view(),
          name='create_post'
          ),
     path('posts/<int:post_id>/',
-         views.PostDetailView.as_view(),
+         PostDetailView.as_view(),
          name='post_detail'
          ),
     path('posts/<int:post_id>/edit/',
@@ -27,6 +44,10 @@ urlpatterns = [
          views.PostDeleteView.as_view(),
          name='delete_post'
          ),
+    path('posts/<int:post_id>/comments/',
+         views.CommentListView.as_view(),
+         name='comments'
+         ),
     path('posts/<int:post_id>/comments/create/',
          views.CommentCreateView.as_view(),
          name='add_comment'
@@ -40,7 +61,7 @@ urlpatterns = [
          name='delete_comment'
          ),
     path('category/<slug:category_slug>/',
-         views.CategoryListView.as_view(),
+         CategoryListView.as_view(),
          name='category_posts'
          ),
     path('profile/edit/',
@@ -48,9 +69,17 @@ urlpatterns = [
          name='edit_profile'
          ),
     path('profile/<str:username>/',
-         views.ProfileView.as_view(),
+         ProfileView.as_view(),
          name='profile'
          ),
+    path('metrics/',
+         views.MetricsView.as_view(),
+         name='metrics'
+         ),
+    path(f'{settings.MEDIA_URL.strip("/")}/{VARIANTS_DIR}/<path:variant>',
+         views.ImageVariantView.as_view(),
+         name='image_variant'
+         ),
 ]
 
 if settings.DEBUG:
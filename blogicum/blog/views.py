@@ -1,19 +1,36 @@
-from django.shortcuts import get_object_or_404
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse
+from django.shortcuts import aget_object_or_404, get_object_or_404
+from django.utils.cache import patch_cache_control
 from django.views.generic import (
-    CreateView, DeleteView, DetailView, ListView, UpdateView
+    CreateView, DeleteView, DetailView, ListView, UpdateView, View
 )
 from django.contrib.auth.models import User
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.urls import reverse
+from django.utils.crypto import constant_time_compare
+from django.utils.http import urlencode
+from PIL import Image
 
+from .cache import (
+    category_scope, index_scope, post_card_version, profile_scope
+)
+from .images import VARIANT_FORMATS, generate_variant, parse_variant_name
+from .metrics import registry
 from .models import Post, Category, Comment
 from .forms import PostForm, CommentForm
 from .mixins import (
-    AuthRedirectToPostMixin, AuthorRequiredMixin, CommentMixin, PaginatorMixin
+    AsyncPostFeedMixin, AsyncViewMixin, AuthRedirectToPostMixin,
+    AuthorRequiredMixin, CommentMixin, CommentPaginatorMixin,
+    ConditionalGetMixin, PaginatorMixin, PostCardCacheMixin, PostFeedMixin
 )
+from .search import search_posts
+from .storage import post_image_storage
 
 
-class ProfileView(PaginatorMixin, ListView):
+class ProfileView(PostFeedMixin, ListView):
     model = Post
     template_name = 'blog/profile.html'
     context_object_name = 'posts'
@@ -29,8 +46,13 @@ class ProfileView(PaginatorMixin, ListView):
             self._profile_user = get_object_or_404(User, username=username)
         return self._profile_user
 
+    def get_page_cache_scope(self):
+        return profile_scope(self.kwargs['username'])
+
     def get_queryset(self):
-        queryset = Post.objects.filter(author=self.profile_user)
+        queryset = Post.objects.select_related(
+            'category', 'author', 'location'
+        ).filter(author=self.profile_user)
 
         if not self.request.user == self.profile_user:
             queryset = Post.objects.published_with_comments().filter(
@@ -43,6 +65,15 @@ class ProfileView(PaginatorMixin, ListView):
         context['profile'] = self.profile_user
         return context
 
+    def get_etag_extra(self, context):
+        profile = context['profile']
+        return (
+            profile.username,
+            profile.get_full_name(),
+            profile.is_staff,
+            profile.date_joined,
+        )
+
 
 class ProfileEditView(LoginRequiredMixin, UpdateView):
     model = User
@@ -75,10 +106,13 @@ class PostCreateView(LoginRequiredMixin, CreateView):
         )
 
 
-class PostListView(PaginatorMixin, ListView):
+class PostListView(PostFeedMixin, ListView):
     model = Post
     template_name = 'blog/index.html'
 
+    def get_page_cache_scope(self):
+        return index_scope()
+
     def get_queryset(self):
         return Post.objects.published_with_comments().order_by('-pub_date')
 
@@ -88,7 +122,7 @@ class PostListView(PaginatorMixin, ListView):
         return context
 
 
-class CategoryListView(PaginatorMixin, LoginRequiredMixin, ListView):
+class CategoryListView(PostFeedMixin, LoginRequiredMixin, ListView):
     template_name = 'blog/category.html'
     context_object_name = 'posts'
     slug_url_kwarg = 'category_slug'
@@ -107,6 +141,9 @@ class CategoryListView(PaginatorMixin, LoginRequiredMixin, ListView):
             )
         return self._category
 
+    def get_page_cache_scope(self):
+        return category_scope(self.kwargs['category_slug'])
+
     def get_queryset(self):
         return Post.objects.published(
             category=self.category
@@ -117,27 +154,101 @@ class CategoryListView(PaginatorMixin, LoginRequiredMixin, ListView):
         context['category'] = self.category
         return context
 
+    def get_etag_extra(self, context):
+        return (self.category.title, self.category.description)
+
+
+class PostSearchView(PostCardCacheMixin, PaginatorMixin, ListView):
+    template_name = 'blog/search.html'
+    # Результаты упорядочены по релевантности, а не по дате
+    keyset_pagination = False
+
+    @property
+    def search_query(self):
+        return self.request.GET.get('q', '').strip()
+
+    def get_queryset(self):
+        return search_posts(Post.objects.published(), self.search_query)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['query'] = self.search_query
+        # Ссылки пагинатора должны сохранять поисковый запрос
+        context['query_prefix'] = urlencode({'q': self.search_query}) + '&'
+        return context
+
 
-class PostDetailView(DetailView):
+class PostDetailView(ConditionalGetMixin, CommentPaginatorMixin, DetailView):
     model = Post
     template_name = 'blog/detail.html'
     pk_url_kwarg = 'post_id'
 
     def get_queryset(self):
-        queryset = super().get_queryset()
-        post = get_object_or_404(Post, pk=self.kwargs['post_id'])
-
-        if post.author != self.request.user:
-            queryset = Post.objects.published()
-        return queryset
+        return Post.objects.visible_to(self.request.user)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['form'] = CommentForm()
-        context['comments'] = self.object.comment.select_related(
-            'author'
-        ).order_by('created_at')
+        return context
+
+    def get_etag_parts(self, context):
+        return (
+            post_card_version(self.object),
+            context['comments_page'].has_next(),
+            *((comment.pk, comment.updated_at)
+              for comment in context['comments']),
+        )
+
+
+# Асинхронные версии страниц только для чтения, для запуска под ASGI
+# (settings.BLOG_ASYNC_VIEWS). Контекст, шаблоны и кэширование у них
+# те же, что у синхронных представлений.
+
+class AsyncPostListView(AsyncPostFeedMixin, PostListView):
+    pass
+
+
+class AsyncCategoryListView(AsyncPostFeedMixin, CategoryListView):
+    async def prepare(self):
+        self._category = await aget_object_or_404(
+            Category.objects.filter(is_published=True),
+            slug=self.kwargs['category_slug'],
+        )
 
+
+class AsyncProfileView(AsyncPostFeedMixin, ProfileView):
+    async def prepare(self):
+        self._profile_user = await aget_object_or_404(
+            User, username=self.kwargs['username']
+        )
+
+
+class AsyncPostDetailView(AsyncViewMixin, PostDetailView):
+    async def get(self, request, *args, **kwargs):
+        self.object = await aget_object_or_404(
+            self.get_queryset(), pk=self.kwargs[self.pk_url_kwarg]
+        )
+        self._comments_page = await self.apaginate_comments(self.object)
+        context = self.get_context_data(object=self.object)
+        return self.render_to_response(context)
+
+    def paginate_comments(self, post):
+        return self._comments_page
+
+
+class CommentListView(CommentPaginatorMixin, DetailView):
+    """Следующая порция комментариев поста без остальной страницы."""
+
+    model = Post
+    template_name = 'includes/comments.html'
+    pk_url_kwarg = 'post_id'
+
+    def get_queryset(self):
+        return Post.objects.visible_to(self.request.user)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['comments_fragment'] = True
         return context
 
 
@@ -192,3 +303,61 @@ class CommentUpdateView(CommentMixin, UpdateView):
 
 class CommentDeleteView(CommentMixin, DeleteView):
     pass
+
+
+class ImageVariantView(View):
+    """Отдаёт уменьшенную копию изображения, создавая её при первом запросе.
+
+    В продакшене веб-сервер отдаёт готовые файлы из MEDIA_ROOT сам
+    и передаёт сюда только запросы к ещё не созданным копиям.
+    """
+
+    def get(self, request, variant):
+        parsed = parse_variant_name(variant)
+        if parsed is None:
+            raise Http404
+        name, width, extension = parsed
+        upload_to = Post._meta.get_field('image').upload_to
+        if (
+            not name.startswith(f'{upload_to}/')
+            or not post_image_storage().exists(name)
+        ):
+            raise Http404
+        try:
+            variant = generate_variant(name, width, extension)
+        except (OSError, Image.DecompressionBombError):
+            # Файл есть, но Pillow не может его прочитать
+            # (UnidentifiedImageError - подкласс OSError)
+            raise Http404
+        response = FileResponse(
+            default_storage.open(variant),
+            content_type=VARIANT_FORMATS[extension][1],
+        )
+        # Имя копии однозначно задаёт её содержимое
+        patch_cache_control(
+            response, public=True, max_age=60 * 60 * 24 * 365, immutable=True
+        )
+        return response
+
+
+class MetricsView(View):
+    """Метрики в формате Prometheus для персонала сайта.
+
+    Сборщик без сессии передаёт заголовок
+    Authorization: Bearer <BLOG_METRICS_TOKEN>.
+    """
+
+    def get(self, request):
+        if not (request.user.is_staff or self._has_token(request)):
+            raise PermissionDenied
+        return HttpResponse(
+            registry.render(),
+            content_type='text/plain; version=0.0.4; charset=utf-8',
+        )
+
+    def _has_token(self, request):
+        token = getattr(settings, 'BLOG_METRICS_TOKEN', None)
+        header = request.headers.get('Authorization', '')
+        return bool(token) and constant_time_compare(
+            header, f'Bearer {token}'
+        )
@@ -44,6 +44,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'blog.middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -143,6 +144,20 @@ LOGIN_URL = 'login'
 MEDIA_ROOT = BASE_DIR / 'media'  # Папка для загружаемых файлов
 MEDIA_URL = '/media/'  # URL-префикс для медиафайлов
 
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+    # Фото постов: один файл на уникальное содержимое, имя - его SHA-256
+    'post_images': {
+        'BACKEND': 'blog.storage.ContentAddressedStorage',
+        'OPTIONS': {'directory': 'images'},
+    },
+}
+
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
 
@@ -150,3 +165,72 @@ ALLOWED_HOSTS = [
     'localhost',
     '127.0.0.1',
 ]
+
+# Курсорная пагинация лент вместо постраничной (?after=/?before=)
+BLOG_KEYSET_PAGINATION = False
+
+# Списки в админке больше этого числа строк не считаются через COUNT(*):
+# число берётся из статистики планировщика (blog.paginators)
+BLOG_ESTIMATED_COUNT_THRESHOLD = 10_000
+
+# Время жизни закэшированных страниц лент для анонимов, в секундах.
+# Сигналы сбрасывают страницы при изменениях, но LocMemCache (кэш
+# по умолчанию) сбрасывается только в процессе, где изменили пост:
+# остальные воркеры отдают старую страницу до истечения таймаута.
+# None - без ограничения, допустимо только с общим для процессов
+# кэшем в CACHES (см. settings_production и проверку blog.E001).
+BLOG_PAGE_CACHE_TIMEOUT = 60
+
+# Время хранения HTML карточек постов. Версия карточки меняется
+# при изменении поста, поэтому таймаут нужен только для очистки кэша.
+BLOG_POST_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Поисковый движок: путь к подклассу blog.search.SearchBackend.
+# None - FTS5 на SQLite и собственный инвертированный индекс
+# (blog.search.inverted.InvertedIndexBackend) на остальных базах.
+BLOG_SEARCH_BACKEND = None
+
+# Файл инвертированного индекса и предел числа результатов поиска по нему
+BLOG_SEARCH_INDEX_PATH = BASE_DIR / 'search_index.bin'
+BLOG_SEARCH_MAX_RESULTS = 1000
+
+# Ширины уменьшенных копий Post.image для srcset (WebP и JPEG)
+BLOG_IMAGE_WIDTHS = (320, 640, 1280)
+
+# Загруженные фото обрабатывает команда process_media: больший размер
+# уменьшается до BLOG_IMAGE_MAX_SIZE пикселей. Неудачная попытка
+# повторяется через BLOG_IMAGE_JOB_RETRY_DELAY секунд, с удвоением
+# задержки, но не больше BLOG_IMAGE_JOB_ATTEMPTS раз.
+BLOG_IMAGE_MAX_SIZE = 2560
+BLOG_IMAGE_JOB_ATTEMPTS = 5
+BLOG_IMAGE_JOB_RETRY_DELAY = 60
+
+# Замеры запросов (blog.middleware.ServerTimingMiddleware): заголовок
+# Server-Timing в ответах и JSON-строки в логгере blog.requests
+BLOG_SERVER_TIMING = True
+
+# Метрики Prometheus на /metrics/ (blog.metrics). Каталог общий для всех
+# воркеров gunicorn; при None метрики видны только своему процессу.
+# Токен позволяет сборщику обращаться к /metrics/ без входа на сайт.
+BLOG_METRICS_DIR = None
+BLOG_METRICS_TOKEN = None
+
+# Асинхронные ленты и страница поста (blog.views.Async*). Включается
+# вместе с запуском под ASGI (uvicorn blogicum.asgi:application):
+# под WSGI каждый такой запрос обходится дороже синхронного.
+BLOG_ASYNC_VIEWS = False
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'blog.requests': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
@@ -0,0 +1,124 @@
+"""Настройки для боевого сервера.
+
+Подключение: DJANGO_SETTINGS_MODULE=blogicum.settings_production
+
+Значения, зависящие от окружения, читаются из переменных окружения:
+
+    DJANGO_SECRET_KEY      обязательна
+    DJANGO_ALLOWED_HOSTS   хосты через запятую
+    DJANGO_DB_PATH         файл базы SQLite
+    DJANGO_CONN_MAX_AGE    время жизни соединения с базой, в секундах
+    DJANGO_SQLITE_MMAP_SIZE, DJANGO_SQLITE_CACHE_SIZE,
+    DJANGO_SQLITE_BUSY_TIMEOUT   прагмы SQLite, см. ниже
+    DJANGO_CACHE_BACKEND, DJANGO_CACHE_LOCATION   общий кэш, см. ниже
+    BLOG_METRICS_DIR, BLOG_METRICS_TOKEN   см. blogicum.settings
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR, INSTALLED_APPS, MIDDLEWARE, TEMPLATES
+
+
+def env(name, default=None):
+    value = os.environ.get(name, default)
+    if value is None:
+        raise ImproperlyConfigured(f'Задайте переменную окружения {name}.')
+    return value
+
+
+DEBUG = False
+
+SECRET_KEY = env('DJANGO_SECRET_KEY')
+
+ALLOWED_HOSTS = [
+    host.strip()
+    for host in env('DJANGO_ALLOWED_HOSTS', 'localhost,127.0.0.1').split(',')
+    if host.strip()
+]
+
+# Панель отладки нужна только при разработке
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app != 'debug_toolbar']
+MIDDLEWARE = [
+    middleware for middleware in MIDDLEWARE
+    if not middleware.startswith('debug_toolbar.')
+]
+INTERNAL_IPS = []
+
+# Прагмы выполняются при открытии каждого соединения:
+# - WAL: читатели не ждут писателя, комментарий не блокирует ленты;
+# - synchronous=NORMAL: в режиме WAL fsync только при checkpoint,
+#   база остаётся целой при сбое, теряются лишь последние транзакции;
+# - mmap_size и cache_size (в КиБ при отрицательном значении):
+#   горячие страницы читаются из памяти без лишних системных вызовов;
+# - busy_timeout: занятая база ждёт, а не падает с «database is locked».
+# BEGIN IMMEDIATE берёт блокировку записи в начале transaction.atomic(),
+# иначе повышение блокировки посреди транзакции не ждёт busy_timeout.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': int(env('DJANGO_SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+    'cache_size': int(env('DJANGO_SQLITE_CACHE_SIZE', -64 * 1024)),
+    'busy_timeout': int(env('DJANGO_SQLITE_BUSY_TIMEOUT', 5000)),
+}
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': env('DJANGO_DB_PATH', str(BASE_DIR / 'db.sqlite3')),
+        # Соединение переживает запрос и переиспользуется потоком
+        # воркера; перед повторным использованием оно проверяется
+        'CONN_MAX_AGE': int(env('DJANGO_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': ';'.join(
+                f'PRAGMA {name}={value}'
+                for name, value in SQLITE_PRAGMAS.items()
+            ),
+            'transaction_mode': 'IMMEDIATE',
+        },
+    }
+}
+
+# Кэш страниц, карточек постов и поколений для сброса кэша должен
+# быть общим для всех воркеров и команд (publish_scheduled,
+# process_media): LocMemCache сбрасывается только в своём процессе.
+# По умолчанию - файловый кэш, общий для процессов одного сервера;
+# для нескольких серверов - например, RedisCache с адресом
+# redis://host:6379 в DJANGO_CACHE_LOCATION.
+CACHES = {
+    'default': {
+        'BACKEND': env(
+            'DJANGO_CACHE_BACKEND',
+            'django.core.cache.backends.filebased.FileBasedCache',
+        ),
+        'LOCATION': env('DJANGO_CACHE_LOCATION', str(BASE_DIR / 'cache')),
+    }
+}
+
+BLOG_METRICS_DIR = os.environ.get('BLOG_METRICS_DIR')
+BLOG_METRICS_TOKEN = os.environ.get('BLOG_METRICS_TOKEN')
+
+# Скомпилированные шаблоны хранятся в памяти процесса и не
+# перечитываются с диска. Django включает cached.Loader и сам, если
+# loaders не заданы; явный список фиксирует это поведение
+# и избавляет от контекстного процессора debug.
+TEMPLATES = [{
+    **TEMPLATES[0],
+    'APP_DIRS': False,
+    'OPTIONS': {
+        **TEMPLATES[0]['OPTIONS'],
+        'context_processors': [
+            processor
+            for processor in TEMPLATES[0]['OPTIONS']['context_processors']
+            if processor != 'django.template.context_processors.debug'
+        ],
+        'loaders': [
+            ('django.template.loaders.cached.Loader', [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ]),
+        ],
+    },
+}]
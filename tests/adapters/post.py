@@ -30,6 +30,7 @@ class PostModelAdapter(StudentModelAdapter):
             "title",
             "text",
             "pub_date",
+            "published_at",
             "author",
             "category",
             "location",
@@ -97,6 +97,29 @@ def post_with_published_location(
     return post
 
 
+@pytest.fixture
+def make_published_post(
+        mixer: Mixer, user, published_location, published_category):
+    """Создаёт опубликованный пост с датой публикации в прошлом.
+
+    С count возвращает список из count постов; поля можно переопределить.
+    """
+    def make(count=None, **fields):
+        params = dict(
+            author=user,
+            category=published_category,
+            location=published_location,
+            is_published=True,
+            pub_date=timezone.now() - timedelta(days=1),
+        )
+        params.update(fields)
+        if count is None:
+            return mixer.blend("blog.Post", **params)
+        return mixer.cycle(count).blend("blog.Post", **params)
+
+    return make
+
+
 @pytest.fixture
 def many_posts_with_published_locations(
     mixer: Mixer, user, published_locations, published_category
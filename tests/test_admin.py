@@ -0,0 +1,57 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+# Сессия и пользователь, категории и места для фильтров, статистика
+# таблицы и COUNT пагинатора, строки страницы и два запроса
+# date_hierarchy. Не зависит от числа постов на странице.
+CHANGELIST_QUERY_BUDGET = 9
+
+
+def _changelist_queries(admin_client, url="/admin/blog/post/"):
+    with CaptureQueriesContext(connection) as queries:
+        response = admin_client.get(url)
+    assert response.status_code == HTTPStatus.OK
+    return [query["sql"] for query in queries.captured_queries]
+
+
+def _blend_posts(mixer, make_published_post, count):
+    posts = make_published_post(count)
+    for post in posts:
+        mixer.cycle(2).blend("blog.Comment", post=post)
+    return posts
+
+
+@pytest.mark.django_db
+def test_post_changelist_query_count_is_constant(
+        admin_client, mixer, make_published_post):
+    _blend_posts(mixer, make_published_post, 2)
+    few = _changelist_queries(admin_client)
+    _blend_posts(mixer, make_published_post, 30)
+    many = _changelist_queries(admin_client)
+
+    assert len(many) == len(few), (
+        "Убедитесь, что число SQL-запросов списка постов в админке"
+        " не растёт вместе с числом постов:\n" + "\n".join(many)
+    )
+    assert len(many) <= CHANGELIST_QUERY_BUDGET, (
+        f"Список постов в админке выполнил {len(many)} SQL-запросов при"
+        f" бюджете {CHANGELIST_QUERY_BUDGET}:\n" + "\n".join(many)
+    )
+
+
+@pytest.mark.django_db
+def test_post_changelist_sorted_by_comment_count(
+        admin_client, mixer, make_published_post):
+    posts = _blend_posts(mixer, make_published_post, 3)
+    mixer.cycle(5).blend("blog.Comment", post=posts[1])
+    # Колонка get_comment_count - восьмая в list_display
+    response = admin_client.get("/admin/blog/post/?o=-8")
+    assert response.status_code == HTTPStatus.OK
+    result = list(response.context["cl"].result_list)
+    assert result[0] == posts[1], (
+        "Убедитесь, что список постов в админке можно отсортировать"
+        " по количеству комментариев."
+    )
@@ -0,0 +1,130 @@
+import importlib
+from datetime import timedelta
+from http import HTTPStatus
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from django.urls import clear_url_caches
+from django.utils import timezone
+
+from blog import views
+
+ASYNC_VIEWS = {
+    "blog:index": views.AsyncPostListView,
+    "blog:post_detail": views.AsyncPostDetailView,
+    "blog:category_posts": views.AsyncCategoryListView,
+    "blog:profile": views.AsyncProfileView,
+}
+
+
+def _reload_urls():
+    importlib.reload(importlib.import_module("blog.urls"))
+    importlib.reload(importlib.import_module("blogicum.urls"))
+    clear_url_caches()
+
+
+@pytest.fixture
+def async_views(settings):
+    settings.BLOG_ASYNC_VIEWS = True
+    _reload_urls()
+    yield
+    settings.BLOG_ASYNC_VIEWS = False
+    _reload_urls()
+
+
+@pytest.fixture
+def feed_posts(make_published_post):
+    return make_published_post(15, pub_date=(
+        timezone.now() - timedelta(days=day) for day in range(1, 16)
+    ))
+
+
+@pytest.fixture
+def async_user_client(user):
+    client = AsyncClient()
+    async_to_sync(client.aforce_login)(user)
+    return client
+
+
+def _urls(post):
+    return {
+        "blog:index": "/?page=2",
+        "blog:post_detail": f"/posts/{post.id}/",
+        "blog:category_posts": f"/category/{post.category.slug}/",
+        "blog:profile": f"/profile/{post.author.username}/",
+    }
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("url_name", sorted(ASYNC_VIEWS))
+def test_async_views_match_sync(request, url_name, user_client,
+                                async_user_client, feed_posts, mixer):
+    mixer.cycle(3).blend("blog.Comment", post=feed_posts[0])
+    url = _urls(feed_posts[0])[url_name]
+    expected = user_client.get(url)
+
+    request.getfixturevalue("async_views")
+    response = async_to_sync(async_user_client.get)(url)
+    assert response.status_code == HTTPStatus.OK
+    assert isinstance(
+        response.resolver_match.func.view_class(), ASYNC_VIEWS[url_name]
+    ), f"Убедитесь, что {url_name} обслуживает асинхронное представление."
+    assert response["ETag"] == expected["ETag"], (
+        f"Убедитесь, что асинхронная версия {url_name} показывает"
+        " те же данные, что и синхронная."
+    )
+    db_queries = response["Server-Timing"].split('desc="')[1].split()[0]
+    assert int(db_queries) > 0, (
+        "Убедитесь, что Server-Timing учитывает SQL-запросы"
+        " асинхронных представлений."
+    )
+
+
+@pytest.mark.django_db
+def test_async_feed_pagination(async_views, async_user_client, feed_posts,
+                               settings):
+    get = async_to_sync(async_user_client.get)
+    page = get("/?page=2").context["page_obj"]
+    assert [post.id for post in page] == [post.id for post in feed_posts[10:]]
+    assert get("/?page=last").context["page_obj"].number == 2
+    assert get("/?page=3").status_code == HTTPStatus.NOT_FOUND
+
+    settings.BLOG_KEYSET_PAGINATION = True
+    first = get("/").context["page_obj"]
+    second = get(f"/?after={first.next_cursor}").context["page_obj"]
+    assert [post.id for post in second] == [
+        post.id for post in feed_posts[10:]
+    ]
+
+
+@pytest.mark.django_db
+def test_async_feed_cached_for_anonymous(async_views, feed_posts):
+    client = AsyncClient()
+    assert async_to_sync(client.get)("/").context is not None
+    response = async_to_sync(client.get)("/")
+    assert response.status_code == HTTPStatus.OK
+    assert response.context is None, (
+        "Убедитесь, что асинхронная лента отдаёт анонимам страницу из кэша."
+    )
+
+
+@pytest.mark.django_db
+def test_async_views_access(async_views, async_user_client, feed_posts,
+                            mixer):
+    unpublished_category = mixer.blend("blog.Category", is_published=False)
+    client = AsyncClient()
+    category_url = f"/category/{feed_posts[0].category.slug}/"
+    response = async_to_sync(client.get)(category_url)
+    assert response.status_code == HTTPStatus.FOUND
+    assert response["Location"].startswith("/auth/login/")
+
+    get = async_to_sync(async_user_client.get)
+    for url in (
+        "/profile/nobody/",
+        f"/category/{unpublished_category.slug}/",
+        "/posts/0/",
+    ):
+        assert get(url).status_code == HTTPStatus.NOT_FOUND, (
+            f"Убедитесь, что {url} отвечает 404."
+        )
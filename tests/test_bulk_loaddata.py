@@ -0,0 +1,39 @@
+import io
+import json
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+
+from blog.management.commands.bulk_loaddata import iter_json_array
+from blog.models import Category, Location, Post
+
+
+def test_iter_json_array_across_chunks():
+    objects = [{"pk": i, "text": "ё" * i + "]}," * i} for i in range(50)]
+    stream = io.StringIO(json.dumps(objects, ensure_ascii=False, indent=2))
+    assert list(iter_json_array(stream, chunk_size=7)) == objects
+
+
+@pytest.mark.django_db
+def test_bulk_loaddata_loads_db_json(capsys):
+    fixture = settings.BASE_DIR / "db.json"
+    with open(fixture, encoding="utf-8") as f:
+        expected = json.load(f)
+    call_command("bulk_loaddata", str(fixture), "--batch-size", "5")
+
+    for model, label in (
+        (Post, "blog.post"),
+        (Category, "blog.category"),
+        (Location, "blog.location"),
+    ):
+        rows = [obj for obj in expected if obj["model"] == label]
+        assert model.objects.count() == len(rows)
+
+    post_row = next(obj for obj in expected if obj["model"] == "blog.post")
+    post = Post.objects.get(pk=post_row["pk"])
+    assert post.title == post_row["fields"]["title"]
+    assert post.created_at.isoformat().startswith(
+        post_row["fields"]["created_at"][:19]
+    ), "Убедитесь, что загрузчик сохраняет created_at из фикстуры."
+    assert "в секунду" in capsys.readouterr().out
@@ -0,0 +1,59 @@
+from http import HTTPStatus
+
+import pytest
+
+from blog.mixins import COMMENT_ON_PAGE
+
+
+@pytest.fixture
+def post_with_many_comments(mixer, make_published_post):
+    post = make_published_post()
+    comments = mixer.cycle(COMMENT_ON_PAGE * 2 + 3).blend(
+        "blog.Comment", post=post
+    )
+    return post, comments
+
+
+@pytest.mark.django_db
+def test_detail_page_shows_first_comment_page(
+        client, post_with_many_comments, django_assert_num_queries):
+    post, comments = post_with_many_comments
+    with django_assert_num_queries(2):
+        response = client.get(f"/posts/{post.id}/")
+    assert response.status_code == HTTPStatus.OK
+    assert len(response.context["comments"]) == COMMENT_ON_PAGE, (
+        "Убедитесь, что на странице поста выводится только первая порция"
+        " комментариев."
+    )
+    assert response.context["comments_page"].has_next()
+
+
+@pytest.mark.django_db
+def test_comment_fragments_load_all_comments(client, post_with_many_comments):
+    post, comments = post_with_many_comments
+    page = client.get(f"/posts/{post.id}/").context["comments_page"]
+    seen = [comment.id for comment in page]
+    while page.has_next():
+        response = client.get(
+            f"/posts/{post.id}/comments/?after={page.next_cursor}"
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert "<form" not in response.content.decode()
+        page = response.context["comments_page"]
+        seen.extend(comment.id for comment in page)
+    expected = [
+        comment.id for comment in sorted(
+            comments, key=lambda c: (c.created_at, c.id)
+        )
+    ]
+    assert seen == expected
+
+
+@pytest.mark.django_db
+def test_comment_fragment_hidden_for_unpublished_post(
+        another_user_client, post_with_many_comments):
+    post, _ = post_with_many_comments
+    post.is_published = False
+    post.save()
+    response = another_user_client.get(f"/posts/{post.id}/comments/")
+    assert response.status_code == HTTPStatus.NOT_FOUND
@@ -0,0 +1,75 @@
+from datetime import timedelta
+from http import HTTPStatus
+
+import pytest
+from django.utils import timezone
+from django.utils.http import http_date
+
+
+@pytest.fixture
+def etag_post(make_published_post):
+    return make_published_post()
+
+
+def _urls(post):
+    return [
+        "/",
+        f"/profile/{post.author.username}/",
+        f"/category/{post.category.slug}/",
+        f"/posts/{post.id}/",
+    ]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("client_name", ["unlogged_client", "user_client"])
+def test_not_modified_without_rendering(request, client_name, etag_post):
+    client = request.getfixturevalue(client_name)
+    for url in _urls(etag_post):
+        response = client.get(url)
+        if response.status_code != HTTPStatus.OK:
+            continue
+        etag = response.headers["ETag"]
+        repeated = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert repeated.status_code == HTTPStatus.NOT_MODIFIED, (
+            f"Убедитесь, что страница `{url}` отвечает 304 на запрос"
+            " с актуальным If-None-Match."
+        )
+        assert not repeated.templates
+
+
+@pytest.mark.django_db
+def test_etag_changes_with_content(user_client, mixer, etag_post):
+    for url in _urls(etag_post):
+        etag = user_client.get(url).headers["ETag"]
+        mixer.blend("blog.Comment", post=etag_post)
+        response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            f"Убедитесь, что ETag страницы `{url}` меняется после"
+            " добавления комментария."
+        )
+
+
+@pytest.mark.django_db
+def test_etag_depends_on_viewer(user_client, another_user_client, etag_post):
+    url = f"/posts/{etag_post.id}/"
+    etag = user_client.get(url).headers["ETag"]
+    response = another_user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK
+
+
+@pytest.mark.django_db
+def test_pages_have_no_last_modified(unlogged_client, user_client,
+                                     etag_post):
+    # Страница зависит от зрителя, а правки места, категории и автора
+    # не сдвигают отметки времени поста: проверка только по ETag
+    future = http_date((timezone.now() + timedelta(days=1)).timestamp())
+    for client in (unlogged_client, user_client):
+        for url in _urls(etag_post):
+            response = client.get(url, HTTP_IF_MODIFIED_SINCE=future)
+            assert response.status_code != HTTPStatus.NOT_MODIFIED, (
+                f"Убедитесь, что страница `{url}` не отвечает 304 на запрос"
+                " только с If-Modified-Since."
+            )
+            assert "Last-Modified" not in response.headers, (
+                f"Убедитесь, что страница `{url}` не отдаёт Last-Modified."
+            )
@@ -0,0 +1,79 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from blog.models import Comment, Post
+from blog.paginators import EstimatedCountPaginator, table_row_estimate
+
+
+def _analyze():
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+
+
+@pytest.fixture
+def posts(mixer, user):
+    return mixer.cycle(6).blend("blog.Post", author=user)
+
+
+@pytest.mark.django_db
+def test_large_table_count_is_estimated(settings, mixer, posts):
+    settings.BLOG_ESTIMATED_COUNT_THRESHOLD = 3
+    _analyze()
+    assert table_row_estimate(Post, "default") == len(posts)
+    mixer.cycle(4).blend("blog.Post")
+
+    paginator = EstimatedCountPaginator(Post.objects.all(), 2)
+    assert paginator.count == len(posts), (
+        "Убедитесь, что число строк большой таблицы без фильтров"
+        " берётся из статистики, а не из COUNT(*)."
+    )
+
+
+@pytest.mark.django_db
+def test_small_or_filtered_count_is_exact(settings, mixer, posts, user):
+    settings.BLOG_ESTIMATED_COUNT_THRESHOLD = 100
+    _analyze()
+    mixer.cycle(4).blend("blog.Post")
+    assert EstimatedCountPaginator(Post.objects.all(), 2).count == 10
+
+    settings.BLOG_ESTIMATED_COUNT_THRESHOLD = 3
+    filtered = Post.objects.exclude(author=user)
+    assert EstimatedCountPaginator(filtered, 2).count == 4, (
+        "Убедитесь, что выборка с фильтрами считается точно."
+    )
+    assert EstimatedCountPaginator(Comment.objects.all(), 2).count == 0
+
+
+@pytest.mark.django_db
+def test_count_without_statistics_is_exact(settings, posts):
+    settings.BLOG_ESTIMATED_COUNT_THRESHOLD = 3
+    with connection.cursor() as cursor:
+        cursor.execute("DROP TABLE IF EXISTS sqlite_stat1")
+    assert EstimatedCountPaginator(Post.objects.all(), 2).count == len(posts)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("url, table", [
+    ("/admin/blog/post/", "blog_post"),
+    ("/admin/blog/comment/", "blog_comment"),
+])
+def test_admin_changelist_skips_count(admin_client, settings, mixer, posts,
+                                      url, table):
+    mixer.cycle(6).blend("blog.Comment", post=posts[0])
+    settings.BLOG_ESTIMATED_COUNT_THRESHOLD = 3
+    _analyze()
+    with CaptureQueriesContext(connection) as queries:
+        response = admin_client.get(url)
+    assert response.status_code == HTTPStatus.OK
+    assert response.context["cl"].result_count == 6
+    counts = [
+        query["sql"] for query in queries.captured_queries
+        if "COUNT(" in query["sql"] and f'"{table}"' in query["sql"]
+    ]
+    assert not counts, (
+        "Убедитесь, что список в админке не считает COUNT(*) по большой"
+        " таблице:\n" + "\n".join(counts)
+    )
@@ -0,0 +1,126 @@
+import gzip
+import json
+from unittest import mock
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+
+from blog.management.commands import export_blog
+from blog.models import Category, Comment, Location, Post
+
+User = get_user_model()
+
+
+@pytest.fixture
+def exported_content(mixer, post_with_published_location):
+    mixer.cycle(5).blend("blog.Comment", post=post_with_published_location)
+    return post_with_published_location
+
+
+def _read_lines(path):
+    opener = gzip.open if str(path).endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("name", ["blog.jsonl", "blog.jsonl.gz"])
+def test_export_blog_writes_json_lines(tmp_path, exported_content, name):
+    output = tmp_path / name
+    call_command("export_blog", str(output), "--chunk-size", "2")
+    items = _read_lines(output)
+    assert [item["model"] for item in items].count("blog.comment") == 5
+    assert [item["model"] for item in items].count("blog.post") == 1
+    assert not (tmp_path / f"{name}.resume").exists()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("name", ["blog.jsonl", "blog.jsonl.gz"])
+def test_export_blog_resumes_after_interruption(
+        tmp_path, exported_content, name):
+    output = tmp_path / name
+    write = export_blog.Command._write
+    calls = []
+
+    def failing_write(self, stream, model, chunk, compress):
+        calls.append(chunk)
+        if len(calls) == 4:
+            stream.write(b"partial garbage")
+            raise KeyboardInterrupt
+        write(self, stream, model, chunk, compress)
+
+    with mock.patch.object(export_blog.Command, "_write", failing_write):
+        with pytest.raises(KeyboardInterrupt):
+            call_command("export_blog", str(output), "--chunk-size", "2")
+    assert (tmp_path / f"{name}.resume").exists()
+
+    call_command("export_blog", str(output), "--resume", "--chunk-size", "2")
+    items = _read_lines(output)
+    keys = [(item["model"], item["pk"]) for item in items]
+    assert len(keys) == len(set(keys)), (
+        "Убедитесь, что после продолжения выгрузки объекты не дублируются."
+    )
+    assert len(keys) == sum(
+        export_blog.export_queryset(model).count()
+        for model in export_blog.EXPORT_MODELS
+    )
+
+
+@pytest.mark.django_db
+def test_export_blog_output_loads_back(tmp_path, exported_content):
+    output = tmp_path / "blog.jsonl.gz"
+    call_command("export_blog", str(output))
+    Comment.objects.all().delete()
+    Post.objects.filter(pk=exported_content.pk).update(title="Другое")
+    call_command("bulk_loaddata", str(output))
+    exported_content.refresh_from_db()
+    assert exported_content.title != "Другое"
+    assert exported_content.comment_count == 5
+
+
+@pytest.mark.django_db
+def test_export_blog_includes_authors_without_passwords(
+        tmp_path, exported_content):
+    output = tmp_path / "blog.jsonl"
+    call_command("export_blog", str(output))
+    users = [item for item in _read_lines(output)
+             if item["model"] == "auth.user"]
+    authors = set(
+        Post.objects.values_list("author", flat=True)
+    ) | set(Comment.objects.values_list("author", flat=True))
+    assert {item["pk"] for item in users} == authors, (
+        "Убедитесь, что выгружаются авторы постов и комментариев."
+    )
+    for item in users:
+        assert set(item["fields"]) == {
+            "username", "first_name", "last_name", "date_joined", "password"
+        }, "Убедитесь, что пароли и права пользователей не выгружаются."
+        assert item["fields"]["password"].startswith("!")
+
+    # Выгрузка загружается в пустую базу
+    for model in (Comment, Post, Category, Location, User):
+        model.objects.all().delete()
+    call_command("bulk_loaddata", str(output))
+    assert Comment.objects.count() == 5
+    assert set(User.objects.values_list("pk", flat=True)) == authors
+    assert not any(
+        user.has_usable_password() for user in User.objects.all()
+    )
+
+
+@pytest.mark.django_db
+def test_bulk_loaddata_keeps_existing_users(tmp_path, exported_content):
+    output = tmp_path / "blog.jsonl"
+    call_command("export_blog", str(output))
+    author = exported_content.author
+    author.set_password("secret")
+    author.first_name = "Другое"
+    author.save()
+    call_command("bulk_loaddata", str(output))
+    author.refresh_from_db()
+    assert author.check_password("secret"), (
+        "Убедитесь, что загрузка выгрузки не сбрасывает пароли"
+        " существующих пользователей."
+    )
+    assert author.first_name == "Другое"
@@ -0,0 +1,117 @@
+import hashlib
+from unittest import mock
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+
+from blog import signals
+from blog.models import ImageBlob, Post
+from blog.storage import post_image_storage
+
+CONTENT = b"GIF89a same photo"
+
+
+@pytest.fixture
+def storage(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    return post_image_storage()
+
+
+@pytest.fixture
+def make_post(mixer, user, published_category, storage):
+    def make(content=CONTENT, name="photo.GIF"):
+        return mixer.blend(
+            "blog.Post", author=user, category=published_category,
+            image=ContentFile(content, name=name),
+        )
+
+    return make
+
+
+@pytest.mark.django_db
+def test_same_upload_is_stored_once(make_post, storage, tmp_path):
+    first = make_post(name="first.GIF")
+    second = make_post(name="second.gif")
+
+    digest = hashlib.sha256(CONTENT).hexdigest()
+    expected = f"images/{digest[:2]}/{digest[2:4]}/{digest}.gif"
+    assert first.image.name == second.image.name == expected, (
+        "Убедитесь, что одинаковые файлы сохраняются один раз под именем"
+        " из хэша содержимого."
+    )
+    assert ImageBlob.objects.get(name=expected).refcount == 2
+    assert [p.name for p in tmp_path.rglob("*") if p.is_file()] == [
+        f"{digest}.gif"
+    ], "Убедитесь, что временные файлы не остаются в MEDIA_ROOT."
+
+
+@pytest.mark.django_db
+def test_file_removed_with_last_reference(
+        make_post, storage, django_capture_on_commit_callbacks):
+    first = make_post()
+    second = make_post()
+    name = first.image.name
+
+    with django_capture_on_commit_callbacks(execute=True):
+        first.delete()
+    assert storage.exists(name), (
+        "Убедитесь, что файл остаётся, пока на него ссылается другой пост."
+    )
+
+    with django_capture_on_commit_callbacks(execute=True):
+        second.image = ContentFile(b"GIF89a another photo", name="new.gif")
+        second.save()
+    assert not storage.exists(name), (
+        "Убедитесь, что файл удаляется вместе с последней ссылкой на него."
+    )
+    assert not ImageBlob.objects.filter(name=name).exists()
+
+
+@pytest.mark.django_db
+def test_recount_images(make_post):
+    post = make_post()
+    make_post()
+    ImageBlob.objects.all().delete()
+    Post.objects.filter(pk=post.pk).update(image="images/legacy.jpg")
+
+    call_command("recount_images", verbosity=0)
+
+    assert dict(ImageBlob.objects.values_list("name", "refcount")) == {
+        "images/legacy.jpg": 1,
+        post.image.name: 1,
+    }
+
+
+@pytest.mark.django_db
+def test_reused_file_survives_pending_delete(
+        make_post, storage, tmp_path, django_capture_on_commit_callbacks):
+    first = make_post()
+    name = first.image.name
+    with django_capture_on_commit_callbacks() as pending:
+        first.delete()
+
+    # Загрузка того же файла получила готовое имя, и удаление
+    # последней ссылки срабатывает раньше, чем она учтена
+    acquire_image = signals.acquire_image
+
+    def acquire_after_delete(*args):
+        for callback in pending:
+            callback()
+        acquire_image(*args)
+
+    with mock.patch.object(signals, "acquire_image", acquire_after_delete):
+        second = make_post()
+    assert second.image.name == name
+    assert storage.exists(name), (
+        "Убедитесь, что отложенное удаление файла не ломает пост,"
+        " загрузивший тот же файл."
+    )
+    assert ImageBlob.objects.get(name=name).refcount == 1
+
+    with django_capture_on_commit_callbacks(execute=True):
+        second.delete()
+    assert not storage.exists(name)
+    assert [p for p in tmp_path.rglob("*") if p.name != "images"] == [], (
+        "Убедитесь, что после удаления файла не остаются пустые каталоги."
+    )
@@ -0,0 +1,95 @@
+from http import HTTPStatus
+from io import BytesIO
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.images import ImageFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from PIL import Image
+
+from blog.images import variant_name
+
+
+@pytest.fixture
+def image_settings(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    settings.BLOG_IMAGE_WIDTHS = (320, 1280)
+    return settings
+
+
+@pytest.fixture
+def post_with_image(mixer, user, published_category, image_settings):
+    buffer = BytesIO()
+    Image.new("RGB", (1000, 500), color=(73, 109, 137)).save(buffer, "JPEG")
+    post = mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        is_published=True, image=ImageFile(buffer, name="photo.jpg"),
+    )
+    call_command("process_media", once=True, workers=0, verbosity=0)
+    post.refresh_from_db()
+    return post
+
+
+def _size(name):
+    with default_storage.open(name) as f:
+        return Image.open(f).size
+
+
+@pytest.mark.django_db
+def test_variants_generated_by_worker(post_with_image):
+    name = post_with_image.image.name
+    assert _size(variant_name(name, 320, "webp")) == (320, 160), (
+        "Убедитесь, что при обработке фото создаются уменьшенные копии"
+        " изображения с сохранением пропорций."
+    )
+    assert _size(variant_name(name, 320, "jpg")) == (320, 160)
+    assert _size(variant_name(name, 1280, "jpg")) == (1000, 500), (
+        "Убедитесь, что копии не бывают больше оригинала."
+    )
+
+
+@pytest.mark.django_db
+def test_card_has_srcset(client, post_with_image):
+    content = client.get("/").content.decode()
+    url = default_storage.url(
+        variant_name(post_with_image.image.name, 320, "webp")
+    )
+    assert f"{url} 320w" in content, (
+        "Убедитесь, что карточка поста содержит srcset из уменьшенных копий."
+    )
+
+
+@pytest.mark.django_db
+def test_missing_variant_generated_on_request(client, post_with_image):
+    variant = variant_name(post_with_image.image.name, 320, "webp")
+    default_storage.delete(variant)
+
+    response = client.get(default_storage.url(variant))
+    assert response.status_code == HTTPStatus.OK
+    assert response["Content-Type"] == "image/webp"
+    assert "immutable" in response["Cache-Control"]
+    assert default_storage.exists(variant), (
+        "Убедитесь, что недостающая копия создаётся при первом запросе."
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("width, extension", [(500, "webp"), (320, "png")])
+def test_unknown_variant_not_found(client, post_with_image, width,
+                                   extension):
+    variant = variant_name(post_with_image.image.name, width, extension)
+    response = client.get(default_storage.url(variant))
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert not default_storage.exists(variant)
+
+
+@pytest.mark.django_db
+def test_variant_of_broken_image_not_found(client, image_settings):
+    name = default_storage.save(
+        "images/br/ok/broken.jpg", ContentFile(b"not an image")
+    )
+    response = client.get(default_storage.url(variant_name(name, 320, "webp")))
+    assert response.status_code == HTTPStatus.NOT_FOUND, (
+        "Убедитесь, что копия нечитаемого файла отвечает 404, а не 500."
+    )
@@ -0,0 +1,85 @@
+from datetime import timedelta
+from http import HTTPStatus
+
+import pytest
+from django.test import override_settings
+from django.utils import timezone
+
+from conftest import N_PER_PAGE
+
+
+@pytest.fixture
+def keyset_posts(mixer, user, published_category):
+    now = timezone.now()
+    # Часть постов с одинаковой датой, чтобы проверить разрешение по id
+    dates = [now - timedelta(hours=i // 3) for i in range(N_PER_PAGE * 2 + 5)]
+    return mixer.cycle(len(dates)).blend(
+        "blog.Post",
+        author=user,
+        category=published_category,
+        is_published=True,
+        pub_date=(d for d in dates),
+    )
+
+
+def _walk(client, url):
+    seen, pages = [], []
+    query = ""
+    while True:
+        response = client.get(url + query)
+        assert response.status_code == HTTPStatus.OK
+        page = response.context["page_obj"]
+        pages.append(page)
+        seen.extend(post.id for post in page)
+        if not page.has_next():
+            return seen, pages
+        query = f"?after={page.next_cursor}"
+
+
+@pytest.mark.django_db
+@override_settings(BLOG_KEYSET_PAGINATION=True)
+def test_keyset_pagination_walks_all_posts(client, keyset_posts):
+    seen, pages = _walk(client, "/")
+    expected = [
+        post.id for post in sorted(
+            keyset_posts, key=lambda p: (p.pub_date, p.id), reverse=True
+        )
+    ]
+    assert seen == expected, (
+        "Убедитесь, что курсорная пагинация выдаёт все посты ровно один раз"
+        " в порядке убывания даты публикации."
+    )
+    assert all(len(page) <= N_PER_PAGE for page in pages)
+    assert not pages[0].has_previous()
+    assert pages[-1].has_previous()
+
+
+@pytest.mark.django_db
+@override_settings(BLOG_KEYSET_PAGINATION=True)
+def test_keyset_pagination_previous_page(client, keyset_posts):
+    first = client.get("/").context["page_obj"]
+    second = client.get(f"/?after={first.next_cursor}").context["page_obj"]
+    back = client.get(
+        f"/?before={second.previous_cursor}"
+    ).context["page_obj"]
+    assert [p.id for p in back] == [p.id for p in first]
+    assert not back.has_previous()
+
+
+@pytest.mark.django_db
+@override_settings(BLOG_KEYSET_PAGINATION=True)
+def test_keyset_pagination_skips_count(
+        client, keyset_posts, django_assert_max_num_queries):
+    with django_assert_max_num_queries(2) as captured:
+        response = client.get("/")
+    assert response.status_code == HTTPStatus.OK
+    assert not any(
+        "COUNT(" in query["sql"] for query in captured.captured_queries
+    ), "Убедитесь, что курсорная пагинация не считает общее число постов."
+
+
+@pytest.mark.django_db
+@override_settings(BLOG_KEYSET_PAGINATION=True)
+def test_keyset_pagination_invalid_cursor(client, keyset_posts):
+    response = client.get("/?after=not-a-cursor")
+    assert response.status_code == HTTPStatus.NOT_FOUND
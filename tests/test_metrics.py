@@ -0,0 +1,108 @@
+import multiprocessing
+from http import HTTPStatus
+
+import pytest
+from django.test import Client
+
+from blog.metrics import INITIAL_SIZE, MetricsFile, registry
+
+
+@pytest.fixture
+def metrics_dir(settings, tmp_path):
+    settings.BLOG_METRICS_DIR = tmp_path
+    return tmp_path
+
+
+@pytest.fixture
+def staff_client(django_user_model):
+    staff = django_user_model.objects.create_user(
+        "staff", password="pass", is_staff=True
+    )
+    client = Client()
+    client.force_login(staff)
+    return client
+
+
+def _increment_in_child(ready, done):
+    registry.metrics["blog_comments_created_total"].inc(2)
+    ready.set()
+    done.wait()
+
+
+def test_values_are_summed_across_processes(metrics_dir):
+    registry.metrics["blog_comments_created_total"].inc()
+    context = multiprocessing.get_context("fork")
+    ready, done = context.Event(), context.Event()
+    child = context.Process(
+        target=_increment_in_child, args=(ready, done)
+    )
+    child.start()
+    assert ready.wait(10)
+
+    assert len(list(metrics_dir.glob("metrics-[0-9]*.bin"))) == 2, (
+        "Убедитесь, что каждый процесс пишет метрики в свой файл."
+    )
+    assert "blog_comments_created_total 3.0" in registry.render(), (
+        "Убедитесь, что /metrics складывает значения всех процессов."
+    )
+
+    done.set()
+    child.join()
+    for _ in range(2):
+        assert "blog_comments_created_total 3.0" in registry.render(), (
+            "Убедитесь, что значения завершившихся процессов не пропадают"
+            " из суммы и не учитываются дважды."
+        )
+    assert not (metrics_dir / f"metrics-{child.pid}.bin").exists(), (
+        "Убедитесь, что файлы метрик завершившихся процессов удаляются."
+    )
+
+
+def test_metrics_file_grows(tmp_path):
+    path = tmp_path / "metrics.bin"
+    metrics = MetricsFile(str(path))
+    keys = [f'["metric", [["n", "{i}"]]]' for i in range(INITIAL_SIZE // 16)]
+    for key in keys:
+        metrics.increment(key, 2)
+    assert path.stat().st_size > INITIAL_SIZE
+    reopened = MetricsFile(str(path))
+    reopened.increment(keys[0])
+    assert reopened.values()[keys[0]] == 3
+    assert len(reopened.values()) == len(keys)
+
+
+@pytest.mark.django_db
+def test_metrics_endpoint(client, staff_client, metrics_dir, mixer,
+                          post_with_published_location):
+    client.get("/")
+    client.get("/")
+    mixer.blend("blog.Comment", post=post_with_published_location)
+
+    response = staff_client.get("/metrics/")
+    assert response.status_code == HTTPStatus.OK
+    assert response["Content-Type"].startswith("text/plain; version=0.0.4")
+    text = response.content.decode()
+    for line in (
+        'blog_request_duration_seconds_bucket{view="blog:index",le="+Inf"}'
+        " 2.0",
+        'blog_request_duration_seconds_count{view="blog:index"} 2.0',
+        'blog_request_db_queries_count{view="blog:index"} 2.0',
+        "blog_comments_created_total 1.0",
+        'blog_cache_requests_total{cache="page",result="hit"} 1.0',
+        'blog_cache_requests_total{cache="page",result="miss"} 1.0',
+    ):
+        assert line in text, f"Убедитесь, что в /metrics есть `{line}`."
+
+
+@pytest.mark.django_db
+def test_metrics_require_staff_or_token(client, user_client, settings):
+    assert client.get("/metrics/").status_code == HTTPStatus.FORBIDDEN
+    assert user_client.get("/metrics/").status_code == HTTPStatus.FORBIDDEN, (
+        "Убедитесь, что метрики доступны только персоналу сайта."
+    )
+
+    settings.BLOG_METRICS_TOKEN = "secret"
+    response = client.get("/metrics/", HTTP_AUTHORIZATION="Bearer secret")
+    assert response.status_code == HTTPStatus.OK
+    response = client.get("/metrics/", HTTP_AUTHORIZATION="Bearer wrong")
+    assert response.status_code == HTTPStatus.FORBIDDEN
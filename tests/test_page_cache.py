@@ -0,0 +1,115 @@
+import pytest
+from django.core.checks import run_checks
+from django.test import override_settings
+from django.utils import timezone
+
+
+@pytest.fixture
+def cached_post(make_published_post):
+    return make_published_post()
+
+
+def _get(client, url):
+    response = client.get(url)
+    assert response.status_code == 200
+    return response.content.decode()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("url_of", [
+    lambda post: "/",
+    lambda post: f"/profile/{post.author.username}/",
+])
+def test_anonymous_page_is_cached(client, cached_post, url_of):
+    url = url_of(cached_post)
+    _get(client, url)
+    response = client.get(url)
+    assert response.context is None, (
+        "Убедитесь, что повторный запрос анонимного пользователя к ленте"
+        " отдаётся из кэша без рендеринга шаблона."
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("url_of", [
+    lambda post: "/",
+    lambda post: f"/profile/{post.author.username}/",
+])
+def test_page_cache_invalidated_on_changes(
+        client, mixer, cached_post, url_of):
+    url = url_of(cached_post)
+    assert cached_post.title in _get(client, url)
+
+    cached_post.title = "Новый заголовок"
+    cached_post.save()
+    assert "Новый заголовок" in _get(client, url)
+
+    mixer.blend("blog.Comment", post=cached_post)
+    assert "Комментарии (1)" in _get(client, url)
+
+    cached_post.location.name = "Новое место"
+    cached_post.location.save()
+    assert "Новое место" in _get(client, url)
+
+    cached_post.category.is_published = False
+    cached_post.category.save()
+    assert "Новый заголовок" not in _get(client, url)
+
+
+@pytest.mark.django_db
+def test_authenticated_pages_not_cached(user_client, cached_post):
+    user_client.get("/")
+    assert user_client.get("/").context is not None
+
+
+@pytest.mark.django_db
+def test_page_cache_invalidated_on_user_changes(client, cached_post):
+    author = cached_post.author
+    old_profile = f"/profile/{author.username}/"
+    assert author.username in _get(client, "/")
+    _get(client, old_profile)
+
+    author.first_name = "Новое имя"
+    author.save()
+    assert "Новое имя" in _get(client, old_profile), (
+        "Убедитесь, что кэш профиля сбрасывается при изменении имени."
+    )
+
+    author.username = "renamed"
+    author.save()
+    assert client.get(old_profile).status_code == 404, (
+        "Убедитесь, что после смены username старый профиль"
+        " не отдаётся из кэша."
+    )
+    assert "@renamed" in _get(client, "/"), (
+        "Убедитесь, что лента показывает новый username автора."
+    )
+    assert "renamed" in _get(client, "/profile/renamed/")
+
+
+@pytest.mark.django_db
+def test_login_keeps_page_cache(client, cached_post):
+    _get(client, "/")
+    cached_post.author.last_login = timezone.now()
+    cached_post.author.save(update_fields=["last_login"])
+    assert client.get("/").context is None
+
+
+@pytest.mark.django_db
+@override_settings(BLOG_PAGE_CACHE_TIMEOUT=None)
+def test_unlimited_page_cache_requires_shared_cache(client, cached_post):
+    errors = [error.id for error in run_checks()]
+    assert "blog.E001" in errors, (
+        "Убедитесь, что бессрочный кэш страниц с LocMemCache"
+        " не проходит проверку при запуске."
+    )
+    _get(client, "/")
+    assert client.get("/").context is not None, (
+        "Убедитесь, что бессрочные страницы не кэшируются в кэше,"
+        " который виден только одному процессу."
+    )
+
+    with override_settings(CACHES={"default": {
+        "BACKEND": "django.core.cache.backends.dummy.DummyCache",
+    }}):
+        assert "blog.E001" not in [error.id for error in run_checks()]
@@ -0,0 +1,39 @@
+import pytest
+
+from conftest import N_PER_FIXTURE
+
+CARD_TEMPLATE = "includes/post_card.html"
+
+
+@pytest.fixture
+def card_posts(make_published_post):
+    return make_published_post(N_PER_FIXTURE)
+
+
+def _rendered_cards(client, url):
+    response = client.get(url)
+    assert response.status_code == 200
+    return [t.name for t in response.templates].count(CARD_TEMPLATE)
+
+
+@pytest.mark.django_db
+def test_post_cards_served_from_cache(user_client, card_posts):
+    assert _rendered_cards(user_client, "/") == N_PER_FIXTURE
+    assert _rendered_cards(user_client, "/") == 0, (
+        "Убедитесь, что карточки постов при повторном показе берутся"
+        " из кэша, а не рендерятся заново."
+    )
+
+
+@pytest.mark.django_db
+def test_post_card_rerendered_after_change(user_client, mixer, card_posts):
+    url = f"/profile/{card_posts[0].author.username}/"
+    _rendered_cards(user_client, url)
+
+    mixer.blend("blog.Comment", post=card_posts[0])
+    assert _rendered_cards(user_client, url) == 1
+
+    card_posts[0].category.title = "Другая категория"
+    card_posts[0].category.save()
+    response = user_client.get(url)
+    assert "Другая категория" in response.content.decode()
@@ -0,0 +1,44 @@
+from http import HTTPStatus
+
+import pytest
+
+from conftest import N_PER_FIXTURE
+
+# Сессия и пользователь для авторизованного клиента
+AUTH_QUERIES = 2
+# Пост вместе с категорией, местом и автором + комментарии
+DETAIL_QUERIES = 2
+
+
+@pytest.fixture
+def commented_post(mixer, another_user, make_published_post):
+    post = make_published_post()
+    mixer.cycle(N_PER_FIXTURE).blend(
+        "blog.Comment", post=post, author=another_user
+    )
+    return post
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("client_name, extra_queries", [
+    ("unlogged_client", 0),
+    ("another_user_client", AUTH_QUERIES),
+    ("user_client", AUTH_QUERIES),
+])
+def test_post_detail_query_count(
+        request, client_name, extra_queries, commented_post,
+        django_assert_num_queries):
+    client = request.getfixturevalue(client_name)
+    with django_assert_num_queries(DETAIL_QUERIES + extra_queries):
+        response = client.get(f"/posts/{commented_post.id}/")
+    assert response.status_code == HTTPStatus.OK
+
+
+@pytest.mark.django_db
+def test_unpublished_post_detail_only_for_author(
+        user_client, another_user_client, commented_post):
+    commented_post.is_published = False
+    commented_post.save()
+    url = f"/posts/{commented_post.id}/"
+    assert user_client.get(url).status_code == HTTPStatus.OK
+    assert another_user_client.get(url).status_code == HTTPStatus.NOT_FOUND
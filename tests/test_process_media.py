@@ -0,0 +1,198 @@
+from datetime import timedelta
+from io import BytesIO
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.utils import timezone
+from PIL import Image
+
+from blog.jobs import claim_jobs, release_replaced_images, requeue_stale_jobs
+from blog.models import ImageJob, ImageStatus
+
+EXIF_ORIENTATION = 0x0112
+EXIF_MAKE = 0x010F
+
+
+@pytest.fixture
+def media_settings(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    settings.BLOG_IMAGE_WIDTHS = (320,)
+    settings.BLOG_IMAGE_MAX_SIZE = 1000
+    return settings
+
+
+@pytest.fixture
+def make_post(mixer, user, published_category, media_settings):
+    def make(content, name="upload.jpg"):
+        return mixer.blend(
+            "blog.Post", author=user, category=published_category,
+            image=ContentFile(content, name=name),
+        )
+
+    return make
+
+
+def _photo_with_exif(color=(10, 20, 30)):
+    image = Image.new("RGB", (3000, 1500), color=color)
+    exif = Image.Exif()
+    exif[EXIF_ORIENTATION] = 6  # Повёрнуто на 90° по часовой стрелке
+    exif[EXIF_MAKE] = "Phone"
+    buffer = BytesIO()
+    image.save(buffer, "JPEG", exif=exif)
+    return buffer.getvalue()
+
+
+@pytest.mark.django_db
+def test_upload_is_queued_not_processed(make_post):
+    post = make_post(_photo_with_exif())
+    assert post.image_status == ImageStatus.PENDING
+    job = ImageJob.objects.get()
+    assert (job.post, job.image, job.status) == (
+        post, post.image.name, ImageJob.Status.PENDING
+    ), "Убедитесь, что загрузка фото ставит задачу в очередь."
+
+
+@pytest.fixture
+def shared_cache(settings):
+    settings.CACHES = {"default": {
+        "BACKEND": "django.core.cache.backends.dummy.DummyCache",
+    }}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("workers", [0, 2])
+def test_worker_normalizes_photo(make_post, workers, shared_cache,
+                                 django_capture_on_commit_callbacks):
+    post = make_post(_photo_with_exif())
+    original = post.image.name
+
+    with django_capture_on_commit_callbacks(execute=True):
+        call_command(
+            "process_media", once=True, workers=workers, verbosity=0
+        )
+
+    post.refresh_from_db()
+    assert post.image_status == ImageStatus.READY
+    assert post.image.name != original
+    assert not default_storage.exists(original), (
+        "Убедитесь, что исходный файл удаляется после обработки."
+    )
+    with default_storage.open(post.image.name) as f:
+        image = Image.open(f)
+        assert image.size == (500, 1000), (
+            "Убедитесь, что фото поворачивается по EXIF и уменьшается"
+            " до BLOG_IMAGE_MAX_SIZE."
+        )
+        assert not image.getexif(), "Убедитесь, что EXIF удаляется."
+    assert ImageJob.objects.get().status == ImageJob.Status.DONE
+
+
+@pytest.mark.django_db
+def test_original_kept_while_process_cache_lives(
+        make_post, django_capture_on_commit_callbacks):
+    post = make_post(_photo_with_exif())
+    original = post.image.name
+
+    with django_capture_on_commit_callbacks(execute=True):
+        call_command("process_media", once=True, workers=0, verbosity=0)
+    post.refresh_from_db()
+    assert post.image.name != original
+    assert default_storage.exists(original), (
+        "Убедитесь, что исходный файл не удаляется, пока страницы в кэше"
+        " веб-воркеров могут на него ссылаться."
+    )
+
+    with django_capture_on_commit_callbacks(execute=True):
+        assert release_replaced_images() == 0
+    assert default_storage.exists(original)
+
+    ImageJob.objects.update(release_after=timezone.now())
+    with django_capture_on_commit_callbacks(execute=True):
+        assert release_replaced_images() == 1
+    assert not default_storage.exists(original), (
+        "Убедитесь, что исходный файл удаляется, когда кэш страниц истёк."
+    )
+    assert default_storage.exists(post.image.name)
+
+
+@pytest.mark.django_db
+def test_held_original_released_with_post(
+        make_post, django_capture_on_commit_callbacks):
+    post = make_post(_photo_with_exif())
+    original = post.image.name
+    with django_capture_on_commit_callbacks(execute=True):
+        call_command("process_media", once=True, workers=0, verbosity=0)
+    assert ImageJob.objects.get().release_after is not None
+
+    with django_capture_on_commit_callbacks(execute=True):
+        post.delete()
+    assert not default_storage.exists(original)
+
+
+@pytest.mark.django_db
+def test_clean_photo_is_kept(make_post):
+    buffer = BytesIO()
+    Image.new("RGB", (200, 100)).save(buffer, "PNG")
+    post = make_post(buffer.getvalue(), name="clean.png")
+    original = post.image.name
+
+    call_command("process_media", once=True, workers=0, verbosity=0)
+
+    post.refresh_from_db()
+    assert post.image.name == original
+    assert post.image_status == ImageStatus.READY
+
+
+@pytest.mark.django_db
+def test_failed_job_is_retried_then_given_up(make_post, media_settings):
+    media_settings.BLOG_IMAGE_JOB_ATTEMPTS = 2
+    post = make_post(b"not an image")
+
+    call_command("process_media", once=True, workers=0, verbosity=0)
+    job = ImageJob.objects.get()
+    assert job.status == ImageJob.Status.PENDING
+    assert job.attempts == 1
+    assert job.run_after > timezone.now(), (
+        "Убедитесь, что повторная попытка откладывается."
+    )
+    assert "UnidentifiedImageError" in job.last_error
+
+    ImageJob.objects.update(run_after=timezone.now())
+    call_command("process_media", once=True, workers=0, verbosity=0)
+    job.refresh_from_db()
+    post.refresh_from_db()
+    assert job.status == ImageJob.Status.FAILED
+    assert post.image_status == ImageStatus.FAILED
+
+
+@pytest.mark.django_db
+def test_jobs_are_claimed_once(make_post):
+    make_post(_photo_with_exif())
+    assert len(claim_jobs(10)) == 1
+    assert claim_jobs(10) == [], (
+        "Убедитесь, что задача в работе не достаётся другому воркеру."
+    )
+
+    ImageJob.objects.update(locked_at=timezone.now() - timedelta(hours=1))
+    assert requeue_stale_jobs(60) == 1
+    assert len(claim_jobs(10)) == 1
+
+
+@pytest.mark.django_db
+def test_replaced_photo_is_not_overwritten(make_post):
+    post = make_post(_photo_with_exif())
+    post.image = ContentFile(_photo_with_exif((200, 0, 0)), name="2.jpg")
+    post.save()
+
+    call_command("process_media", once=True, workers=0, verbosity=0)
+
+    post.refresh_from_db()
+    with default_storage.open(post.image.name) as f:
+        red, _, _ = Image.open(f).getpixel((0, 0))
+    assert red > 150, (
+        "Убедитесь, что результат обработки заменённого фото не попадает"
+        " в пост."
+    )
+    assert ImageJob.objects.filter(status=ImageJob.Status.DONE).count() == 2
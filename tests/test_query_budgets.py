@@ -0,0 +1,151 @@
+from http import HTTPStatus
+from io import BytesIO
+
+import pytest
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver
+from PIL import Image
+
+from blog.images import variant_name
+
+# Максимум SQL-запросов на один запрос к странице. Бюджет не зависит
+# от объёма данных: рост числа запросов вместе с числом постов или
+# комментариев (N+1) ломает тест на больших наборах данных.
+# Авторизованный клиент тратит 2 запроса на сессию и пользователя.
+QUERY_BUDGETS = {
+    "blog:index": 4,
+    "blog:search": 4,
+    "blog:create_post": 4,
+    "blog:post_detail": 4,
+    "blog:edit_post": 7,
+    "blog:delete_post": 7,
+    "blog:comments": 4,
+    "blog:add_comment": 6,
+    "blog:edit_comment": 5,
+    "blog:delete_comment": 5,
+    "blog:category_posts": 5,
+    "blog:edit_profile": 2,
+    "blog:profile": 5,
+    "blog:metrics": 2,
+    "blog:image_variant": 0,
+}
+
+DATASET_SIZES = (1, 5, 25)
+
+
+@pytest.fixture(params=DATASET_SIZES, ids=lambda size: f"{size}_items")
+def dataset(request, mixer, user, another_user, make_published_post,
+            settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    size = request.param
+    buffer = BytesIO()
+    Image.new("RGB", (64, 32)).save(buffer, "PNG")
+    posts = make_published_post(size, title="Марсианские хроники")
+    post = posts[0]
+    post.image = ContentFile(buffer.getvalue(), name="photo.png")
+    post.save()
+    comments = mixer.cycle(size).blend(
+        "blog.Comment", post=post, author=user
+    )
+    return {
+        "post": post,
+        "comment": comments[0],
+        "category": post.category,
+        "username": user.username,
+    }
+
+
+@pytest.fixture
+def staff_client(django_user_model):
+    client = Client()
+    client.force_login(django_user_model.objects.create_user(
+        "staff", is_staff=True
+    ))
+    return client
+
+
+def _requests(data):
+    """URL-имя: (клиент, метод, URL, данные формы)."""
+    post = data["post"]
+    comment = data["comment"]
+    return {
+        "blog:index": ("user_client", "get", "/", None),
+        "blog:search": ("user_client", "get", "/search/?q=марсианские", None),
+        "blog:create_post": ("user_client", "get", "/posts/create/", None),
+        "blog:post_detail": (
+            "user_client", "get", f"/posts/{post.id}/", None
+        ),
+        "blog:edit_post": (
+            "user_client", "get", f"/posts/{post.id}/edit/", None
+        ),
+        "blog:delete_post": (
+            "user_client", "get", f"/posts/{post.id}/delete/", None
+        ),
+        "blog:comments": (
+            "user_client", "get", f"/posts/{post.id}/comments/", None
+        ),
+        "blog:add_comment": (
+            "user_client", "post", f"/posts/{post.id}/comments/create/",
+            {"text": "Новый комментарий"},
+        ),
+        "blog:edit_comment": (
+            "user_client", "get",
+            f"/posts/{post.id}/edit_comment/{comment.id}/", None,
+        ),
+        "blog:delete_comment": (
+            "user_client", "get",
+            f"/posts/{post.id}/delete_comment/{comment.id}/", None,
+        ),
+        "blog:category_posts": (
+            "user_client", "get", f"/category/{data['category'].slug}/",
+            None,
+        ),
+        "blog:edit_profile": ("user_client", "get", "/profile/edit/", None),
+        "blog:profile": (
+            "user_client", "get", f"/profile/{data['username']}/", None
+        ),
+        "blog:metrics": ("staff_client", "get", "/metrics/", None),
+        "blog:image_variant": (
+            "unlogged_client", "get",
+            "/media/" + variant_name(post.image.name, 320, "webp"), None,
+        ),
+    }
+
+
+def _blog_url_names():
+    resolver = get_resolver()
+    return {
+        f"blog:{name}"
+        for name in resolver.namespace_dict["blog"][1].reverse_dict
+        if isinstance(name, str)
+    }
+
+
+def test_every_blog_url_has_budget():
+    missing = _blog_url_names() - set(QUERY_BUDGETS)
+    assert not missing, (
+        f"Добавьте бюджет SQL-запросов для {sorted(missing)}"
+        " в QUERY_BUDGETS."
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("url_name", sorted(QUERY_BUDGETS))
+def test_query_budget(request, url_name, dataset):
+    client_name, method, url, form = _requests(dataset)[url_name]
+    client = request.getfixturevalue(client_name)
+    with CaptureQueriesContext(connection) as queries:
+        response = getattr(client, method)(url, form)
+    assert response.status_code in (HTTPStatus.OK, HTTPStatus.FOUND)
+    assert response.resolver_match.view_name == url_name
+
+    budget = QUERY_BUDGETS[url_name]
+    executed = [query["sql"] for query in queries.captured_queries]
+    assert len(executed) <= budget, (
+        f"{url_name} выполнил {len(executed)} SQL-запросов при бюджете"
+        f" {budget}:\n"
+        + "\n".join(f"{n}. {sql}" for n, sql in enumerate(executed, 1))
+    )
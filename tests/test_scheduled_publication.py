@@ -0,0 +1,102 @@
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+
+from blog.cache import page_cache_timeout
+from blog.models import Post
+
+
+@pytest.fixture
+def scheduled_post(mixer, user, published_category, published_location):
+    return mixer.blend(
+        "blog.Post",
+        title="Отложенный пост",
+        author=user,
+        category=published_category,
+        location=published_location,
+        is_published=True,
+        pub_date=timezone.now() + timedelta(hours=1),
+    )
+
+
+def _index(client):
+    response = client.get("/")
+    assert response.status_code == 200
+    return response.content.decode()
+
+
+@pytest.mark.django_db
+def test_published_at_set_on_save(scheduled_post):
+    assert scheduled_post.published_at is None, (
+        "Убедитесь, что пост с pub_date в будущем не получает published_at."
+    )
+    scheduled_post.pub_date = timezone.now() - timedelta(minutes=1)
+    scheduled_post.save()
+    published_at = scheduled_post.published_at
+    assert published_at is not None, (
+        "Убедитесь, что при сохранении поста с наступившей pub_date"
+        " заполняется published_at."
+    )
+    scheduled_post.save()
+    assert scheduled_post.published_at == published_at
+
+    scheduled_post.pub_date = timezone.now() + timedelta(days=1)
+    scheduled_post.save()
+    assert scheduled_post.published_at is None, (
+        "Убедитесь, что перенос pub_date в будущее снимает пост с публикации."
+    )
+
+
+@pytest.mark.django_db
+def test_publish_scheduled_invalidates_cached_feed(
+        client, scheduled_post, django_capture_on_commit_callbacks):
+    assert "Отложенный пост" not in _index(client)
+    assert client.get("/").context is None
+
+    # Время публикации наступило: сигналы при этом не срабатывают
+    Post.objects.filter(pk=scheduled_post.pk).update(
+        pub_date=timezone.now() - timedelta(seconds=1)
+    )
+    assert "Отложенный пост" not in _index(client), (
+        "Убедитесь, что пост не попадает в ленту до запуска"
+        " publish_scheduled."
+    )
+
+    with django_capture_on_commit_callbacks(execute=True):
+        call_command("publish_scheduled", once=True, verbosity=0)
+    scheduled_post.refresh_from_db()
+    assert scheduled_post.published_at is not None
+    assert "Отложенный пост" in _index(client), (
+        "Убедитесь, что publish_scheduled сбрасывает кэш ленты,"
+        " когда отложенный пост выходит в ленту."
+    )
+
+
+@pytest.mark.django_db
+@override_settings(BLOG_PAGE_CACHE_TIMEOUT=24 * 60 * 60)
+def test_page_cache_timeout_capped_by_next_publication(scheduled_post):
+    assert 60 * 59 <= page_cache_timeout() <= 60 * 60, (
+        "Убедитесь, что страница в кэше процесса живёт не дольше, чем"
+        " до ближайшей отложенной публикации: сброс кэша командой"
+        " publish_scheduled до веб-воркеров не доходит."
+    )
+    Post.objects.filter(pk=scheduled_post.pk).update(
+        pub_date=timezone.now() - timedelta(seconds=1)
+    )
+    assert page_cache_timeout() == 1
+
+    with override_settings(CACHES={"default": {
+        "BACKEND": "django.core.cache.backends.dummy.DummyCache",
+    }}):
+        assert page_cache_timeout() == 24 * 60 * 60
+
+
+def test_feed_query_does_not_depend_on_time():
+    sql = str(Post.objects.published().query)
+    assert "pub_date" not in sql.split("WHERE")[1].split("ORDER BY")[0], (
+        "Убедитесь, что запрос ленты не сравнивает pub_date с текущим"
+        " временем."
+    )
@@ -0,0 +1,245 @@
+from datetime import timedelta
+from http import HTTPStatus
+from unittest import mock
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from blog.search.fts5 import fts_query
+
+
+@pytest.fixture
+def searchable_posts(mixer, user, published_category):
+    past = timezone.now() - timedelta(days=1)
+
+    def blend(**kwargs):
+        params = dict(
+            author=user, category=published_category, is_published=True,
+            pub_date=past,
+        )
+        params.update(kwargs)
+        return mixer.blend("blog.Post", **params)
+
+    return {
+        "title": blend(title="Марсианские хроники", text="Про космос"),
+        "text": blend(title="Заметки", text="Видел марсианские каналы"),
+        "other": blend(title="Рецепт", text="Борщ со сметаной"),
+        "hidden": blend(
+            title="Марсианские тайны", text="Черновик", is_published=False
+        ),
+        "future": blend(
+            title="Марсианские планы", text="Скоро",
+            pub_date=timezone.now() + timedelta(days=1),
+        ),
+    }
+
+
+def _found(client, query):
+    response = client.get("/search/", {"q": query})
+    assert response.status_code == HTTPStatus.OK
+    return [post.id for post in response.context["page_obj"]]
+
+
+@pytest.mark.django_db
+def test_search_ranks_and_respects_visibility(client, searchable_posts):
+    found = _found(client, "марсианские")
+    assert found == [
+        searchable_posts["title"].id, searchable_posts["text"].id
+    ], (
+        "Убедитесь, что поиск находит только опубликованные посты и выше"
+        " ставит совпадения в заголовке."
+    )
+
+
+@pytest.mark.django_db
+def test_search_index_follows_post_changes(client, searchable_posts):
+    post = searchable_posts["other"]
+    post.text = "Марсианские пельмени"
+    post.save()
+    assert post.id in _found(client, "пельмени")
+
+    post.delete()
+    assert _found(client, "пельмени") == []
+
+
+@pytest.mark.django_db
+def test_search_query_is_escaped(client, searchable_posts):
+    assert fts_query('NEAR("x" AND') == '"NEAR"* "x"* "AND"*'
+    assert _found(client, '"*) OR (') == []
+
+
+@pytest.mark.django_db
+def test_admin_search_uses_index(client, searchable_posts):
+    admin = get_user_model().objects.create_superuser("admin", "", "pass")
+    client.force_login(admin)
+    response = client.get("/admin/blog/post/", {"q": "борщ"})
+    assert response.status_code == HTTPStatus.OK
+    result = list(response.context["cl"].result_list)
+    assert result == [searchable_posts["other"]]
+
+
+@pytest.fixture
+def inverted_index(settings, tmp_path, searchable_posts):
+    from blog.search import get_backend
+
+    settings.BLOG_SEARCH_BACKEND = (
+        "blog.search.inverted.InvertedIndexBackend"
+    )
+    settings.BLOG_SEARCH_INDEX_PATH = tmp_path / "index.bin"
+    backend = get_backend()
+    backend.rebuild()
+    return backend
+
+
+@pytest.mark.django_db
+def test_inverted_index_ranks_and_stems(client, inverted_index,
+                                        searchable_posts):
+    found = _found(client, "марсианский")
+    assert found == [
+        searchable_posts["title"].id, searchable_posts["text"].id
+    ], (
+        "Убедитесь, что инвертированный индекс учитывает словоформы,"
+        " видимость постов и вес заголовка."
+    )
+    assert _found(client, "марсианские борщ") == [], (
+        "Убедитесь, что в результат попадают только посты со всеми словами"
+        " запроса."
+    )
+
+
+@pytest.mark.django_db
+def test_inverted_index_follows_post_changes(
+        client, inverted_index, searchable_posts,
+        django_capture_on_commit_callbacks):
+    post = searchable_posts["other"]
+    post.text = "Марсианские пельмени"
+    with django_capture_on_commit_callbacks(execute=True):
+        post.save()
+    assert _found(client, "пельмени") == [post.id]
+    assert _found(client, "борщ") == []
+
+    with django_capture_on_commit_callbacks(execute=True):
+        post.delete()
+    assert _found(client, "пельмени") == []
+
+    # Новый файл индекса подхватывается вместо накопленных изменений
+    inverted_index.rebuild()
+    assert _found(client, "пельмени") == []
+    assert len(_found(client, "марсианские")) == 2
+
+
+@pytest.mark.django_db
+def test_inverted_index_in_admin(client, inverted_index, searchable_posts):
+    admin = get_user_model().objects.create_superuser("admin", "", "pass")
+    client.force_login(admin)
+    response = client.get("/admin/blog/post/", {"q": "борщом"})
+    assert response.status_code == HTTPStatus.OK
+    result = list(response.context["cl"].result_list)
+    assert result == [searchable_posts["other"]]
+
+
+@pytest.mark.django_db
+def test_inverted_index_changes_shared_between_processes(
+        inverted_index, searchable_posts, django_capture_on_commit_callbacks):
+    from blog.search.inverted import InvertedIndexBackend
+
+    # Отдельный экземпляр движка - как в другом воркере
+    other_worker = InvertedIndexBackend("default")
+    assert other_worker.ranked_ids("борщ") == [searchable_posts["other"].id]
+
+    post = searchable_posts["other"]
+    post.text = "Марсианские пельмени"
+    with django_capture_on_commit_callbacks(execute=True):
+        post.save()
+    new_post = searchable_posts["title"]
+    new_post.pk = None
+    new_post.title = "Пельмени по-марсиански"
+    with django_capture_on_commit_callbacks(execute=True):
+        new_post.save()
+    assert other_worker.ranked_ids("борщ") == [], (
+        "Убедитесь, что изменения постов видны всем процессам."
+    )
+    assert other_worker.ranked_ids("пельмени") == [new_post.id, post.id]
+
+    # Пост удалён, когда посты для нового файла уже прочитаны:
+    # удаление должно пережить перестройку
+    from blog.search import inverted
+
+    write_index = inverted.write_index
+
+    def write_index_during_delete(path, documents):
+        documents = list(documents)
+        with django_capture_on_commit_callbacks(execute=True):
+            new_post.delete()
+        write_index(path, documents)
+
+    with mock.patch.object(
+        inverted, "write_index", write_index_during_delete
+    ):
+        inverted_index.rebuild()
+    assert other_worker.ranked_ids("пельмени") == [post.id], (
+        "Убедитесь, что перестройка индекса не теряет изменения,"
+        " сделанные во время неё."
+    )
+    inverted_index.rebuild()
+    assert other_worker.ranked_ids("пельмени") == [post.id]
+
+
+@pytest.mark.django_db
+def test_inverted_index_refresh_is_thread_safe(
+        inverted_index, searchable_posts, django_capture_on_commit_callbacks):
+    import threading
+    import time
+
+    from blog.search import inverted
+
+    other_worker = inverted.InvertedIndexBackend("default")
+    other_worker.ranked_ids("борщ")
+    post = searchable_posts["other"]
+    post.text = "Марсианские пельмени"
+    with django_capture_on_commit_callbacks(execute=True):
+        post.save()
+
+    open_delta = inverted.DeltaLog.open
+
+    class SlowDelta:
+        # Поток засыпает посреди чтения журнала, пропуская вперёд другой
+        def __init__(self, f):
+            self.f = f
+
+        def seek(self, offset):
+            self.f.seek(offset)
+
+        def __iter__(self):
+            for line in self.f:
+                time.sleep(0.05)
+                yield line
+
+        def fileno(self):
+            return self.f.fileno()
+
+        def close(self):
+            self.f.close()
+
+    def slow_open(self):
+        f = open_delta(self)
+        return f and SlowDelta(f)
+
+    with mock.patch.object(inverted.DeltaLog, "open", slow_open):
+        threads = [
+            threading.Thread(target=other_worker.ranked_ids, args=("щи",))
+            for _ in range(2)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    post.title = "Щи"
+    with django_capture_on_commit_callbacks(execute=True):
+        post.save()
+    assert other_worker.ranked_ids("щи") == [post.id], (
+        "Убедитесь, что одновременный поиск в нескольких потоках"
+        " не пропускает строки журнала изменений."
+    )
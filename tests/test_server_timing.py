@@ -0,0 +1,63 @@
+import json
+import logging
+import re
+
+import pytest
+
+
+def _metrics(response):
+    return {
+        match["name"]: match
+        for match in re.finditer(
+            r'(?P<name>\w+)(;dur=(?P<dur>[\d.]+))?(;desc="(?P<desc>[^"]*)")?',
+            response["Server-Timing"],
+        )
+    }
+
+
+@pytest.fixture
+def request_log(caplog, monkeypatch):
+    monkeypatch.setattr(logging.getLogger("blog.requests"), "propagate", True)
+    caplog.set_level(logging.INFO, logger="blog.requests")
+    return caplog
+
+
+@pytest.mark.django_db
+def test_server_timing_header(client, many_posts_with_published_locations):
+    metrics = _metrics(client.get("/"))
+    assert {"total", "db", "tpl", "cache"} <= set(metrics), (
+        "Убедитесь, что заголовок Server-Timing содержит общее время,"
+        " время SQL, рендеринга шаблона и статистику кэша."
+    )
+    queries = int(metrics["db"]["desc"].split()[0])
+    assert queries > 0
+    assert float(metrics["total"]["dur"]) >= float(metrics["db"]["dur"])
+    assert metrics["cache"]["desc"].startswith("hit 0,")
+
+    # Второй анонимный запрос отдаётся из кэша страниц без шаблона
+    metrics = _metrics(client.get("/"))
+    assert metrics["cache"]["desc"] == "hit 1, miss 0"
+    assert "tpl" not in metrics
+
+
+@pytest.mark.django_db
+def test_request_is_logged_by_view_name(client, post_with_published_location,
+                                        request_log):
+    post = post_with_published_location
+    client.get(f"/posts/{post.id}/")
+    records = [
+        json.loads(record.getMessage()) for record in request_log.records
+    ]
+    assert records and records[-1]["view"] == "blog:post_detail", (
+        "Убедитесь, что каждый запрос пишется в лог blog.requests"
+        " с именем представления."
+    )
+    assert records[-1]["status"] == 200
+    assert records[-1]["db_queries"] > 0
+    assert request_log.records[-1].timing == records[-1]
+
+
+@pytest.mark.django_db
+def test_server_timing_can_be_disabled(client, settings):
+    settings.BLOG_SERVER_TIMING = False
+    assert "Server-Timing" not in client.get("/")
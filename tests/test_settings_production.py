@@ -0,0 +1,74 @@
+import importlib
+import sqlite3
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+
+
+def _load(monkeypatch, **environ):
+    monkeypatch.delenv("DJANGO_SECRET_KEY", raising=False)
+    for name, value in environ.items():
+        monkeypatch.setenv(name, value)
+    from blogicum import settings_production
+
+    return importlib.reload(settings_production)
+
+
+def test_secret_key_required(monkeypatch):
+    with pytest.raises(ImproperlyConfigured):
+        _load(monkeypatch)
+
+
+def test_production_settings_from_environment(monkeypatch, tmp_path):
+    database = tmp_path / "db.sqlite3"
+    production = _load(
+        monkeypatch,
+        DJANGO_SECRET_KEY="secret",
+        DJANGO_ALLOWED_HOSTS="blog.example.com, www.blog.example.com",
+        DJANGO_DB_PATH=str(database),
+    )
+    assert production.SECRET_KEY == "secret"
+    assert production.ALLOWED_HOSTS == [
+        "blog.example.com", "www.blog.example.com"
+    ]
+    assert "debug_toolbar" not in production.INSTALLED_APPS
+    assert not any(
+        "debug_toolbar" in middleware for middleware in production.MIDDLEWARE
+    ), "Убедитесь, что в боевых настройках нет панели отладки."
+
+    db = production.DATABASES["default"]
+    assert db["NAME"] == str(database)
+    assert db["CONN_MAX_AGE"] > 0 and db["CONN_HEALTH_CHECKS"], (
+        "Убедитесь, что боевые настройки переиспользуют соединения с базой."
+    )
+    connection = sqlite3.connect(db["NAME"])
+    try:
+        for statement in db["OPTIONS"]["init_command"].split(";"):
+            connection.execute(statement)
+        pragmas = {
+            name: connection.execute(f"PRAGMA {name}").fetchone()[0]
+            for name in ("journal_mode", "synchronous", "busy_timeout")
+        }
+    finally:
+        connection.close()
+    assert pragmas == {
+        "journal_mode": "wal", "synchronous": 1, "busy_timeout": 5000
+    }, "Убедитесь, что соединения с SQLite открываются в режиме WAL."
+
+
+def test_production_cache_shared_between_processes(monkeypatch, tmp_path):
+    production = _load(monkeypatch, DJANGO_SECRET_KEY="secret")
+    assert "LocMemCache" not in production.CACHES["default"]["BACKEND"], (
+        "Убедитесь, что в боевых настройках кэш общий для всех процессов."
+    )
+
+    production = _load(
+        monkeypatch,
+        DJANGO_SECRET_KEY="secret",
+        DJANGO_CACHE_BACKEND="django.core.cache.backends.redis.RedisCache",
+        DJANGO_CACHE_LOCATION="redis://cache:6379",
+    )
+    assert production.CACHES["default"] == {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": "redis://cache:6379",
+    }